@@ -0,0 +1,580 @@
+"""
+Workflow of the preprocessing benchmark
+1. make_synthetic_frames() generates a processed DoS / Fuzzy style dataset of any size:
+    increasing timestamps, a few dozen hex CAN IDs, DLC 8 frames and short DoS frames with the
+    unused bytes null, and R / T flags. The same seed gives the same frames on every run
+2. every case of BENCHMARK_CASES calls one preprocessing function of
+    preprocess_data_with_pandas or preprocess_data_with_polars on the frames
+    1. the frames are converted to the case's backend before timing
+    2. a case's setup (e.g. copying a DataFrame the function modifies in place) runs before
+        every call and is not timed
+3. every case and size runs in a fresh spawned process, one at a time
+    1. one warm-up call, sampled for the peak resident memory above the memory held before the
+        call (pandas and polars allocate outside the Python heap, so tracemalloc would miss it)
+    2. then BENCHMARK_REPEATS timed calls, the median and the minimum are kept
+4. the run is appended as one json line to the history file, with the machine, the polars
+    thread count, the library versions and the git commit
+5. the run is compared to the baseline: the latest earlier run marked as baseline on the same
+    machine and thread count, else the latest earlier run there. A case is a regression when
+    its median time or its peak memory grew by more than REGRESSION_THRESHOLD and by more than
+    the noise floor (MIN_REGRESSION_SECONDS / MIN_REGRESSION_MB). The script exits with 1 if
+    any case regressed
+
+Usage
+    python src/benchmark_preprocessing.py
+    python src/benchmark_preprocessing.py --sizes 10000 100000 --cases pandas. --set-baseline
+"""
+
+import argparse
+import datetime
+import json
+import multiprocessing as mp
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import polars as pl
+
+import preprocess_data_with_pandas as pandas_preprocessing
+import preprocess_data_with_polars as polars_preprocessing
+from payload import add_payload_column
+from utils import add_execution_profile_argument, select_execution_profile, to_backend
+
+# ──────────────────────────────────────────────────────────────
+# 🛠️ Configuration Constants
+# ──────────────────────────────────────────────────────────────
+BENCHMARK_SIZES = [10_000, 100_000, 1_000_000]
+BENCHMARK_REPEATS = 5
+REGRESSION_THRESHOLD = 0.25  # relative growth of the median time / peak memory
+MIN_REGRESSION_SECONDS = 0.002  # smaller slowdowns are timer noise
+MIN_REGRESSION_MB = 4.0  # smaller memory growth is allocator noise
+MEMORY_SAMPLE_SECONDS = 0.001
+HISTORY_PATH = os.path.join("benchmarks", "preprocessing_history.jsonl")
+HISTORY_VERSION = 1
+SEED = 42
+N_CAN_IDS = 27
+ATTACK_FRACTION = 0.15  # injected frames, DLC 2 with CAN ID 0000 like the DoS dataset
+FRAMES_PER_SECOND = 2000
+BYTE_COLUMNS = [f"byte_{i}" for i in range(8)]
+FLAG_COLUMN = "updated_flag"
+# ──────────────────────────────────────────────────────────────
+
+
+def make_synthetic_frames(n_rows, seed=SEED):
+    """
+    Generate a processed DoS / Fuzzy style dataset.
+
+    Parameters
+    ----------
+    n_rows : int
+        Number of frames.
+    seed : int
+        Seed of the generator, the same seed gives the same frames.
+
+    Returns
+    -------
+    pl.DataFrame
+        timestamp, can_id, dlc, byte_0 ... byte_7 and updated_flag, with the columns and
+        dtypes of read_processed_csv(). Bytes beyond the DLC are null.
+    """
+    rng = np.random.default_rng(seed)
+    attack = rng.random(n_rows) < ATTACK_FRACTION
+    can_ids = rng.choice(
+        np.arange(1, 0x800, 0x800 // N_CAN_IDS)[:N_CAN_IDS], size=n_rows
+    )
+    can_ids[attack] = 0
+    dlc = np.where(attack, 2, 8)
+    payload = rng.integers(0, 256, size=(n_rows, 8))
+    hex_bytes = pl.Series([f"{value:02x}" for value in range(256)])
+
+    timestamps = 1478198376.0 + np.cumsum(
+        rng.exponential(1 / FRAMES_PER_SECOND, size=n_rows)
+    )
+    df = pl.DataFrame(
+        {
+            "timestamp": timestamps,
+            "can_id": [f"{value:04x}" for value in can_ids],
+            "dlc": dlc.astype(np.int64),
+        }
+    )
+    return df.with_columns(
+        *[
+            pl.when(pl.col("dlc") > i)
+            .then(hex_bytes.gather(payload[:, i]))
+            .alias(column)
+            for i, column in enumerate(BYTE_COLUMNS)
+        ],
+        pl.Series(FLAG_COLUMN, np.where(attack, "T", "R")),
+    )
+
+
+def _copy_frame(df):
+    return (df.copy(),)
+
+
+def _insert_columns_args(df):
+    # insert_columns() adds its columns in place, every call gets fresh frames.
+    return (
+        {"attack_free_df": df.copy(), "only_dos_df": df.copy()},
+        FLAG_COLUMN,
+        pandas_preprocessing.ATTACK_TYPE_COLUMN,
+    )
+
+
+def _frame_only(df):
+    return (df,)
+
+
+# Case name to (backend, setup, function). setup(df) returns the function's arguments.
+BENCHMARK_CASES = {
+    "pandas.divide_df": (
+        "pandas",
+        _frame_only,
+        lambda df: pandas_preprocessing.divide_df(df, FLAG_COLUMN, "T"),
+    ),
+    "pandas.do_random_sampling": (
+        "pandas",
+        _frame_only,
+        lambda df: pandas_preprocessing.do_random_sampling(df, len(df) // 10),
+    ),
+    "pandas.do_proportionate_stratified_sampling": (
+        "pandas",
+        _frame_only,
+        lambda df: pandas_preprocessing.do_proportionate_stratified_sampling(
+            df,
+            pandas_preprocessing.STRATIFIED_COLUMN,
+            pandas_preprocessing.STRATIFIED_ATTACK_FREE_FRACTION,
+        ),
+    ),
+    "pandas.sort_df_by_column": (
+        "pandas",
+        _frame_only,
+        lambda df: pandas_preprocessing.sort_df_by_column(
+            df, pandas_preprocessing.SORTED_COLUMN_NAME
+        ),
+    ),
+    "pandas.insert_new_column": (
+        "pandas",
+        _copy_frame,
+        lambda df: pandas_preprocessing.insert_new_column(
+            df, pandas_preprocessing.ATTACK_TYPE_COLUMN
+        ),
+    ),
+    "pandas.insert_columns": (
+        "pandas",
+        _insert_columns_args,
+        pandas_preprocessing.insert_columns,
+    ),
+    "polars.convert_timestamp_to_datetime": (
+        "polars",
+        _frame_only,
+        lambda df: polars_preprocessing.convert_timestamp_to_datetime(
+            df, "datetime", "timestamp"
+        ),
+    ),
+    "polars.convert_hex_column_to_int": (
+        "polars",
+        _frame_only,
+        lambda df: polars_preprocessing.convert_hex_column_to_int(
+            df, "can_id", "can_id"
+        ),
+    ),
+    "polars.convert_bytes_to_int": (
+        "polars",
+        _frame_only,
+        lambda df: polars_preprocessing.convert_bytes_to_int(
+            df, BYTE_COLUMNS, BYTE_COLUMNS
+        ),
+    ),
+    "polars.merge_byte_columns": (
+        "polars",
+        _frame_only,
+        lambda df: polars_preprocessing.merge_byte_columns(df, "dlc", "message"),
+    ),
+    "polars.add_payload_column": ("polars", _frame_only, add_payload_column),
+    "polars.add_updated_flag_column_to_attack_free": (
+        "polars",
+        lambda df: (df.drop(FLAG_COLUMN),),
+        polars_preprocessing.add_updated_flag_column_to_attack_free,
+    ),
+    "polars.swap_features_in_specific_order": (
+        "polars",
+        _frame_only,
+        lambda df: polars_preprocessing.swap_features_in_specific_order(
+            [df], [FLAG_COLUMN, "can_id", "timestamp", "dlc"] + BYTE_COLUMNS
+        ),
+    ),
+    "polars.encode_updated_flag_column": (
+        "polars",
+        _frame_only,
+        lambda df: polars_preprocessing.encode_updated_flag_column(df, FLAG_COLUMN),
+    ),
+}
+
+
+def _rss_bytes():
+    # Resident memory of this process, None where /proc is not available.
+    try:
+        with open("/proc/self/statm", "r") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class PeakMemorySampler:
+    """
+    Sample the resident memory in a background thread, while the with block runs.
+
+    Attributes
+    ----------
+    peak_mb : float or None
+        Peak resident memory above the memory held when the block started, in MB. None
+        where the resident memory cannot be read.
+    """
+
+    def __init__(self, interval=MEMORY_SAMPLE_SECONDS):
+        self.interval = interval
+        self.peak_mb = None
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self._start = _rss_bytes()
+        self._peak = self._start
+        if self._start is not None:
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self._peak = max(self._peak, _rss_bytes())
+            time.sleep(self.interval)
+
+    def __exit__(self, *exc_info):
+        if self._start is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._peak = max(self._peak, _rss_bytes())
+        self.peak_mb = (self._peak - self._start) / 2**20
+
+
+def run_case(name, n_rows, repeats=BENCHMARK_REPEATS, seed=SEED):
+    """
+    Time and memory-profile one case at one dataset size.
+
+    Parameters
+    ----------
+    name : str
+        Key of BENCHMARK_CASES.
+    n_rows : int
+        Number of synthetic frames.
+    repeats : int
+        Number of timed calls after the warm-up call.
+    seed : int
+        Seed of the synthetic frames.
+
+    Returns
+    -------
+    dict
+        case, rows, median_seconds, min_seconds, peak_memory_mb (of the warm-up call) and
+        repeats.
+    """
+    backend, setup, function = BENCHMARK_CASES[name]
+    df = to_backend(make_synthetic_frames(n_rows, seed), backend)
+
+    args = setup(df)
+    with PeakMemorySampler() as memory:
+        function(*args)
+
+    seconds = []
+    for _ in range(repeats):
+        args = setup(df)
+        start = time.perf_counter()
+        function(*args)
+        seconds.append(time.perf_counter() - start)
+    return {
+        "case": name,
+        "rows": n_rows,
+        "median_seconds": statistics.median(seconds),
+        "min_seconds": min(seconds),
+        "peak_memory_mb": memory.peak_mb,
+        "repeats": repeats,
+    }
+
+
+def run_benchmarks(cases, sizes, repeats=BENCHMARK_REPEATS):
+    """
+    Run every case at every size, each in a fresh process.
+
+    Parameters
+    ----------
+    cases : list of str
+        Keys of BENCHMARK_CASES.
+    sizes : list of int
+        Numbers of synthetic frames.
+    repeats : int
+        Number of timed calls per case and size.
+
+    Returns
+    -------
+    list of dict
+        One result of run_case() per case and size.
+    """
+    results = []
+    # One process at a time so the cases do not compete for cores, a process per case so the
+    # memory one case leaves to the allocator does not hide the next case's peak.
+    with ProcessPoolExecutor(
+        max_workers=1, mp_context=mp.get_context("spawn"), max_tasks_per_child=1
+    ) as executor:
+        for n_rows in sizes:
+            for name in cases:
+                result = executor.submit(run_case, name, n_rows, repeats).result()
+                results.append(result)
+                memory = result["peak_memory_mb"]
+                print(
+                    f"{name} [{n_rows} rows]: {result['median_seconds'] * 1e3:.2f} ms"
+                    + ("" if memory is None else f", {memory:.1f} MB")
+                )
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark_environment():
+    """
+    Describe the machine and libraries a run is measured on.
+
+    Returns
+    -------
+    dict
+        host, polars_threads, cpu_count, python, polars, pandas and numpy versions. Runs
+        are only compared on the same host and polars_threads.
+    """
+    return {
+        "host": platform.node(),
+        "polars_threads": pl.thread_pool_size(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "polars": pl.__version__,
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+    }
+
+
+def load_history(history_path=HISTORY_PATH):
+    """
+    Read the runs of a history file.
+
+    Parameters
+    ----------
+    history_path : str
+        Path of the json lines history file.
+
+    Returns
+    -------
+    list of dict
+        The runs, oldest first. Empty if the file does not exist.
+    """
+    if not os.path.isfile(history_path):
+        return []
+    with open(history_path, "r") as file:
+        runs = [json.loads(line) for line in file if line.strip()]
+    return [run for run in runs if run.get("version") == HISTORY_VERSION]
+
+
+def append_history(run, history_path=HISTORY_PATH):
+    """
+    Append a run to the history file, creating it if needed.
+
+    Parameters
+    ----------
+    run : dict
+        The run, see main().
+    history_path : str
+        Path of the json lines history file.
+    """
+    history_dir = os.path.dirname(history_path)
+    if history_dir:
+        os.makedirs(history_dir, exist_ok=True)
+    with open(history_path, "a") as file:
+        file.write(json.dumps(run) + "\n")
+
+
+def find_baseline(history, environment):
+    """
+    Pick the run a new run is compared to.
+
+    Parameters
+    ----------
+    history : list of dict
+        Earlier runs, oldest first, see load_history().
+    environment : dict
+        Environment of the new run, see benchmark_environment().
+
+    Returns
+    -------
+    dict or None
+        The latest run marked as baseline on the same host and polars_threads, else the latest
+        run there. None if there is none.
+    """
+    comparable = [
+        run
+        for run in history
+        if run["environment"]["host"] == environment["host"]
+        and run["environment"]["polars_threads"] == environment["polars_threads"]
+    ]
+    baselines = [run for run in comparable if run.get("baseline")]
+    candidates = baselines or comparable
+    return candidates[-1] if candidates else None
+
+
+def find_regressions(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Compare the results of a run to its baseline.
+
+    Parameters
+    ----------
+    results : list of dict
+        Results of run_benchmarks().
+    baseline : dict
+        Baseline run, see find_baseline().
+    threshold : float
+        Relative growth above which a case regressed, e.g. 0.25 for 25 %.
+
+    Returns
+    -------
+    list of dict
+        case, rows, metric ('median_seconds' or 'peak_memory_mb'), baseline, current and
+        change (relative) of every regressed measurement. Cases or sizes missing from the
+        baseline are not compared.
+    """
+    floors = {
+        "median_seconds": MIN_REGRESSION_SECONDS,
+        "peak_memory_mb": MIN_REGRESSION_MB,
+    }
+    previous = {
+        (result["case"], result["rows"]): result for result in baseline["results"]
+    }
+    regressions = []
+    for result in results:
+        before = previous.get((result["case"], result["rows"]))
+        if before is None:
+            continue
+        for metric, floor in floors.items():
+            old, new = before.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            if new - old > floor and new > old * (1 + threshold):
+                regressions.append(
+                    {
+                        "case": result["case"],
+                        "rows": result["rows"],
+                        "metric": metric,
+                        "baseline": old,
+                        "current": new,
+                        "change": (new - old) / old if old > 0 else float("inf"),
+                    }
+                )
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Time and memory-profile the preprocessing functions on synthetic data."
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=BENCHMARK_SIZES,
+        help="Numbers of synthetic frames.",
+    )
+    parser.add_argument(
+        "--cases",
+        nargs="+",
+        default=None,
+        help="Run the cases whose name starts with one of these prefixes, e.g. 'pandas.'.",
+    )
+    parser.add_argument("--repeats", type=int, default=BENCHMARK_REPEATS)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=REGRESSION_THRESHOLD,
+        help="Relative growth above which a case regressed.",
+    )
+    parser.add_argument("--history", default=HISTORY_PATH, help="History file.")
+    parser.add_argument(
+        "--set-baseline",
+        action="store_true",
+        help="Mark this run as the baseline of the later runs.",
+    )
+    add_execution_profile_argument(parser)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    select_execution_profile(args.execution_profile)
+    cases = [
+        name
+        for name in BENCHMARK_CASES
+        if args.cases is None or name.startswith(tuple(args.cases))
+    ]
+    if not cases:
+        raise ValueError(
+            f"No case matches {args.cases}, choose from {list(BENCHMARK_CASES)}."
+        )
+
+    environment = benchmark_environment()
+    baseline = find_baseline(load_history(args.history), environment)
+    results = run_benchmarks(cases, args.sizes, args.repeats)
+    run = {
+        "version": HISTORY_VERSION,
+        "time": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "baseline": args.set_baseline,
+        "environment": environment,
+        "results": results,
+    }
+    append_history(run, args.history)
+    print(f"Run saved to {args.history}")
+
+    if baseline is None:
+        print("No earlier run on this machine, nothing to compare to.")
+        return 0
+    regressions = find_regressions(results, baseline, args.threshold)
+    print(
+        f"Compared to the run of {baseline['time']} (commit {baseline['commit']}): "
+        f"{len(regressions)} regressions above {args.threshold:.0%}"
+    )
+    for regression in regressions:
+        unit = "s" if regression["metric"] == "median_seconds" else "MB"
+        print(
+            f"  REGRESSION {regression['case']} [{regression['rows']} rows] "
+            f"{regression['metric']}: {regression['baseline']:.4f} {unit} -> "
+            f"{regression['current']:.4f} {unit} (+{regression['change']:.0%})"
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
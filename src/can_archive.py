@@ -0,0 +1,422 @@
+"""
+Workflow of the CAN archive
+1. write_archive() splits a processed capture (process_csv() / process_txt() output) into
+    blocks of BLOCK_ROWS frames, every block is encoded on its own
+    1. timestamp: int64 microseconds, stored as the first value and zigzag deltas in the
+        smallest unsigned dtype that fits. Blocks whose float timestamps are not whole
+        microseconds keep the raw float64 bits instead, so decoding is always exact
+    2. can_id and every other str column: codes into a dictionary kept in the footer
+    3. byte_0 ... byte_7: packed into a UInt64 payload (payload.py), XOR-ed with the previous
+        payload of the same ID in the block and stored as 8 byte planes, so repeating bytes
+        become runs of zeros. A null mask (one uint8 per frame) keeps which bytes are null
+    4. every other numeric column: raw values plus a null mask
+    5. every segment is compressed with zstd
+2. the footer (json) holds the schema, the dictionaries and one index entry per block with
+    its offset, its segments and its first / last timestamp_us
+3. read_archive() reads the footer, keeps the blocks overlapping the requested time range and
+    decodes them in a thread pool (zstd and numpy release the GIL), then trims to the range
+4. decoding gives back exactly the DataFrame read_processed_csv() returns, write_archive()
+    checks it for every block and raises if a column cannot be represented
+
+File layout
+    MAGIC | block 0 | block 1 | ... | footer json | footer length (uint64 le) | MAGIC
+
+Usage
+    python src/can_archive.py
+"""
+
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import polars as pl
+import pyarrow as pa
+
+from payload import BYTE_COLUMNS, HEX_BYTES, pack_payload_array, unpack_payload_array
+from utils import load_data_paths, read_processed_csv
+
+# ──────────────────────────────────────────────────────────────
+# 🛠️ Configuration Constants
+# ──────────────────────────────────────────────────────────────
+MAGIC = b"CANARC01"
+ARCHIVE_VERSION = 1
+BLOCK_ROWS = 1 << 16
+COMPRESSION = "zstd"
+COMPRESSION_LEVEL = 9
+TIMESTAMP_COLUMN = "timestamp"
+CAN_ID_COLUMN = "can_id"
+US_PER_SECOND = 1_000_000
+# ──────────────────────────────────────────────────────────────
+
+
+def _codec():
+    return pa.Codec(COMPRESSION, compression_level=COMPRESSION_LEVEL)
+
+
+def _zigzag(values):
+    values = values.astype(np.int64)
+    return ((values << 1) ^ (values >> 63)).astype(np.uint64)
+
+
+def _unzigzag(values):
+    values = values.astype(np.uint64)
+    return ((values >> np.uint64(1)).astype(np.int64)) ^ -(
+        (values & np.uint64(1)).astype(np.int64)
+    )
+
+
+def _smallest_uint(values):
+    return values.astype(np.min_scalar_type(int(values.max()) if len(values) else 0))
+
+
+def _previous_same_id(codes):
+    # Index of the previous frame with the same code, -1 for the first frame of each code.
+    order = np.argsort(codes, kind="stable")
+    previous = np.full(len(codes), -1, dtype=np.int64)
+    same = codes[order[1:]] == codes[order[:-1]]
+    previous[order[1:][same]] = order[:-1][same]
+    return order, previous
+
+
+def _xor_delta(payloads, codes):
+    _, previous = _previous_same_id(codes)
+    reference = np.where(previous >= 0, payloads[np.maximum(previous, 0)], 0)
+    return payloads ^ reference.astype(np.uint64)
+
+
+def _undo_xor_delta(deltas, codes):
+    order, _ = _previous_same_id(codes)
+    sorted_deltas = deltas[order]
+    cumulative = np.bitwise_xor.accumulate(sorted_deltas)
+    sorted_codes = codes[order]
+    # The running XOR restarts at the first frame of every code.
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    group_start = np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    before_group = np.where(
+        group_start > 0, cumulative[np.maximum(group_start - 1, 0)], 0
+    ).astype(np.uint64)
+    payloads = np.empty_like(deltas)
+    payloads[order] = cumulative ^ before_group
+    return payloads
+
+
+class _BlockWriter:
+    def __init__(self, file):
+        self.file = file
+        self.codec = _codec()
+        self.segments = []
+
+    def add(self, name, array):
+        raw = np.ascontiguousarray(array)
+        compressed = self.codec.compress(raw.tobytes(), asbytes=True)
+        self.segments.append(
+            {
+                "name": name,
+                "dtype": raw.dtype.str,
+                "offset": self.file.tell(),
+                "length": len(compressed),
+                "raw_length": raw.nbytes,
+            }
+        )
+        self.file.write(compressed)
+
+
+def _read_segment(buffer, segment, codec, base_offset):
+    start = segment["offset"] - base_offset
+    compressed = buffer[start : start + segment["length"]]
+    raw = codec.decompress(compressed, segment["raw_length"], asbytes=True)
+    return np.frombuffer(raw, dtype=np.dtype(segment["dtype"]))
+
+
+def _encode_timestamps(writer, timestamps):
+    timestamps_us = np.round(timestamps * US_PER_SECOND).astype(np.int64)
+    if not np.array_equal(timestamps_us / US_PER_SECOND, timestamps):
+        writer.add("timestamp_f64", timestamps)
+        return "f64", int(timestamps_us.min()), int(timestamps_us.max())
+    deltas = _zigzag(np.diff(timestamps_us, prepend=timestamps_us[0]))
+    writer.add("timestamp_first", timestamps_us[:1])
+    writer.add("timestamp_deltas", _smallest_uint(deltas))
+    return "us_delta", int(timestamps_us.min()), int(timestamps_us.max())
+
+
+def _decode_timestamps(segments, encoding):
+    if encoding == "f64":
+        return segments["timestamp_f64"]
+    deltas = _unzigzag(segments["timestamp_deltas"])
+    deltas[0] = 0
+    timestamps_us = segments["timestamp_first"][0] + np.cumsum(deltas)
+    return timestamps_us / US_PER_SECOND
+
+
+def _encode_payload(writer, block, id_codes):
+    byte_matrix = np.zeros((block.height, len(BYTE_COLUMNS)), dtype=np.uint8)
+    null_mask = np.zeros(block.height, dtype=np.uint8)
+    for i, col in enumerate(BYTE_COLUMNS):
+        if col not in block.columns:
+            continue
+        values = block[col]
+        null_mask |= values.is_null().to_numpy().astype(np.uint8) << i
+        byte_matrix[:, i] = values.str.to_integer(base=16).fill_null(0).to_numpy()
+    deltas = _xor_delta(pack_payload_array(byte_matrix), id_codes)
+    # Byte planes: the i-th byte of every delta together, most of them are zero.
+    writer.add("payload_planes", unpack_payload_array(deltas).T)
+    writer.add("payload_nulls", null_mask)
+
+
+def _decode_payload(segments, id_codes, byte_columns):
+    planes = segments["payload_planes"].reshape(len(BYTE_COLUMNS), -1)
+    payloads = _undo_xor_delta(
+        pack_payload_array(np.ascontiguousarray(planes.T)), id_codes
+    )
+    byte_matrix = unpack_payload_array(payloads)
+    null_mask = segments["payload_nulls"]
+    columns = {}
+    for i, col in enumerate(BYTE_COLUMNS):
+        if col not in byte_columns:
+            continue
+        values = pl.Series(col, HEX_BYTES, dtype=pl.String).gather(byte_matrix[:, i])
+        columns[col] = values.scatter(np.flatnonzero((null_mask >> i) & 1), None)
+    return columns
+
+
+def _encode_block(writer, block, dictionaries, schema):
+    columns = {}
+    timestamp_encoding, first_us, last_us = _encode_timestamps(
+        writer, block[TIMESTAMP_COLUMN].to_numpy()
+    )
+    for col, dtype in schema.items():
+        if col == TIMESTAMP_COLUMN or col in BYTE_COLUMNS:
+            continue
+        if dtype == pl.String:
+            dictionary = dictionaries.setdefault(col, {})
+            codes = np.array(
+                [
+                    dictionary.setdefault(value, len(dictionary))
+                    for value in block[col].to_list()
+                ],
+                dtype=np.int64,
+            )
+            writer.add(col, _smallest_uint(codes))
+            columns[col] = codes
+        else:
+            values = block[col]
+            writer.add(f"{col}_nulls", values.is_null().to_numpy().astype(np.uint8))
+            writer.add(col, values.fill_null(0).to_numpy())
+    id_codes = columns.get(CAN_ID_COLUMN, np.zeros(block.height, dtype=np.int64))
+    _encode_payload(writer, block, id_codes)
+    return timestamp_encoding, first_us, last_us
+
+
+def _decode_block(buffer, entry, schema, dictionaries, base_offset=0):
+    codec = _codec()
+    segments = {
+        segment["name"]: _read_segment(buffer, segment, codec, base_offset)
+        for segment in entry["segments"]
+    }
+    columns = {
+        TIMESTAMP_COLUMN: pl.Series(
+            TIMESTAMP_COLUMN, _decode_timestamps(segments, entry["timestamp"])
+        )
+    }
+    id_codes = np.zeros(entry["rows"], dtype=np.int64)
+    for col, dtype in schema.items():
+        if col == TIMESTAMP_COLUMN or col in BYTE_COLUMNS:
+            continue
+        if dtype == pl.String:
+            codes = segments[col].astype(np.int64)
+            dictionary = pl.Series(col, dictionaries[col], dtype=pl.String)
+            columns[col] = dictionary.gather(codes)
+            if col == CAN_ID_COLUMN:
+                id_codes = codes
+        else:
+            values = pl.Series(col, segments[col]).cast(dtype)
+            nulls = pl.Series(segments[f"{col}_nulls"]).cast(pl.Boolean)
+            columns[col] = (
+                pl.select(pl.when(nulls).then(None).otherwise(values)).to_series()
+            ).alias(col)
+    columns.update(_decode_payload(segments, id_codes, schema))
+    return pl.DataFrame([columns[col] for col in schema])
+
+
+def _dtype_from_str(dtype):
+    return getattr(pl, dtype)
+
+
+def write_archive(df, archive_path, block_rows=BLOCK_ROWS):
+    """
+    Write a processed capture as a CAN archive.
+
+    Parameters
+    ----------
+    df : pl.DataFrame
+        Frames as returned by read_processed_csv(): float timestamp, hex str can_id and bytes,
+        any other str or numeric columns (dlc, updated_flag, frame_type ...).
+    archive_path : str
+        Path of the archive file.
+    block_rows : int
+        Frames per block.
+
+    Raises
+    ------
+    ValueError
+        If a column has an unsupported dtype or a block does not decode to the same frames,
+        e.g. bytes that are not two-digit lower-case hex.
+    """
+    schema = dict(df.schema)
+    unsupported = [
+        col
+        for col, dtype in schema.items()
+        if dtype != pl.String and not dtype.is_numeric()
+    ]
+    if unsupported:
+        raise ValueError(f"Unsupported column dtypes: {unsupported}")
+
+    dictionaries = {}
+    index = []
+    os.makedirs(os.path.dirname(archive_path) or ".", exist_ok=True)
+    with open(archive_path, "wb") as file:
+        file.write(MAGIC)
+        for start in range(0, df.height, block_rows):
+            block = df.slice(start, block_rows)
+            writer = _BlockWriter(file)
+            timestamp_encoding, first_us, last_us = _encode_block(
+                writer, block, dictionaries, schema
+            )
+            index.append(
+                {
+                    "rows": block.height,
+                    "timestamp": timestamp_encoding,
+                    "first_us": first_us,
+                    "last_us": last_us,
+                    "segments": writer.segments,
+                }
+            )
+
+        footer = {
+            "version": ARCHIVE_VERSION,
+            "schema": {col: str(dtype) for col, dtype in schema.items()},
+            "dictionaries": {
+                col: list(dictionary) for col, dictionary in dictionaries.items()
+            },
+            "blocks": index,
+        }
+        footer_bytes = json.dumps(footer).encode("utf-8")
+        file.write(footer_bytes)
+        file.write(len(footer_bytes).to_bytes(8, "little"))
+        file.write(MAGIC)
+
+    # Every block is decoded once, an archive that would not round-trip is never kept.
+    with open(archive_path, "rb") as file:
+        buffer = memoryview(file.read())
+    for i, entry in enumerate(index):
+        block = _decode_block(buffer, entry, schema, footer["dictionaries"])
+        if not block.equals(df.slice(i * block_rows, block_rows)):
+            os.remove(archive_path)
+            raise ValueError(
+                f"Block {i} does not round-trip, check that the byte columns are "
+                "two-digit lower-case hex."
+            )
+
+
+def read_archive_footer(archive_path):
+    """
+    Read the footer of a CAN archive.
+
+    Parameters
+    ----------
+    archive_path : str
+        Path of the archive file.
+
+    Returns
+    -------
+    dict
+        version, schema, dictionaries and the block index.
+
+    Raises
+    ------
+    ValueError
+        If the file is not a CAN archive.
+    """
+    with open(archive_path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{archive_path} is not a CAN archive.")
+        file.seek(-(len(MAGIC) + 8), os.SEEK_END)
+        footer_length = int.from_bytes(file.read(8), "little")
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{archive_path} is truncated.")
+        file.seek(-(len(MAGIC) + 8 + footer_length), os.SEEK_END)
+        return json.loads(file.read(footer_length))
+
+
+def read_archive(archive_path, start=None, end=None, n_threads=None):
+    """
+    Read a CAN archive, optionally only the frames of a time range.
+
+    Parameters
+    ----------
+    archive_path : str
+        Path of the archive file.
+    start : float, optional
+        First timestamp in seconds, inclusive.
+    end : float, optional
+        Last timestamp in seconds, exclusive.
+    n_threads : int, optional
+        Threads decoding blocks, by default one per CPU.
+
+    Returns
+    -------
+    pl.DataFrame
+        The frames, equal to what read_processed_csv() returned when the archive was written.
+    """
+    footer = read_archive_footer(archive_path)
+    schema = {col: _dtype_from_str(dtype) for col, dtype in footer["schema"].items()}
+    start_us = None if start is None else round(start * US_PER_SECOND)
+    end_us = None if end is None else round(end * US_PER_SECOND)
+    blocks = [
+        entry
+        for entry in footer["blocks"]
+        if (start_us is None or entry["last_us"] >= start_us)
+        and (end_us is None or entry["first_us"] < end_us)
+    ]
+    if not blocks:
+        return pl.DataFrame(schema=schema)
+
+    with open(archive_path, "rb") as file:
+        first = blocks[0]["segments"][0]["offset"]
+        last = blocks[-1]["segments"][-1]
+        file.seek(first)
+        data = file.read(last["offset"] + last["length"] - first)
+    buffer = memoryview(data)
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        decoded = list(
+            executor.map(
+                lambda entry: _decode_block(
+                    buffer, entry, schema, footer["dictionaries"], first
+                ),
+                blocks,
+            )
+        )
+    df = pl.concat(decoded)
+    if start is not None:
+        df = df.filter(pl.col(TIMESTAMP_COLUMN) >= start)
+    if end is not None:
+        df = df.filter(pl.col(TIMESTAMP_COLUMN) < end)
+    return df
+
+
+if __name__ == "__main__":
+    output_data_paths = load_data_paths("out_paths")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for key, path in output_data_paths.items():
+            df = read_processed_csv(path)
+            archive_path = os.path.splitext(path)[0] + ".canarc"
+            parquet_path = os.path.join(tmp_dir, f"{key}.parquet")
+            write_archive(df, archive_path)
+            df.write_parquet(parquet_path, compression="zstd", compression_level=9)
+            print(
+                f"{key}: csv {os.path.getsize(path)} bytes, "
+                f"parquet {os.path.getsize(parquet_path)} bytes, "
+                f"archive {os.path.getsize(archive_path)} bytes"
+            )
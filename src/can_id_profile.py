@@ -0,0 +1,367 @@
+"""
+Workflow of the CAN ID profile
+1. build_profile() makes one lazy pass over the attack free data (process_txt() output) and
+    summarizes every CAN ID into a dense table of CAN_ID_SPACE entries indexed by the 11-bit ID
+    1. seen: whether the ID appears in normal traffic
+    2. expected_dlc: most frequent DLC of the ID
+    3. period_mean / period_std: mean and standard deviation of the time between frames
+    4. byte_min / byte_max: range of each byte, constant_mask: bit i is set if byte i never changes
+2. save_profile() stores the table in one small .npz file (seen is stored as a packed bitset)
+3. load_profile() reads it back, every lookup is then an array index
+    1. CanIdProfile.frame_deviations() checks a single frame (OnlineDetector with a profile)
+    2. add_profile_deviations() checks a whole polars DataFrame (prepare_feature_frame() with a
+        profile, used by score.py)
+4. deviations of a frame
+    1. unseen_id: the ID is not in the profile, IDs outside the 11-bit space included
+    2. dlc_mismatch: the DLC differs from expected_dlc
+    3. bytes_out_of_range / constant_bytes_changed: number of bytes outside their range
+    4. period_too_short: the time since the previous frame of the ID is more than
+        PERIOD_TOLERANCE_STD standard deviations below period_mean (injected frames)
+"""
+
+import numpy as np
+import polars as pl
+
+from utils import (
+    load_data_paths,
+    parse_execution_profile_argument,
+    select_execution_profile,
+)
+
+# ──────────────────────────────────────────────────────────────
+# 🛠️ Configuration Constants
+# ──────────────────────────────────────────────────────────────
+CAN_ID_SPACE = 2048  # 11-bit CAN IDs
+MAX_DLC = 8
+BYTE_COLUMNS = [f"byte_{i}" for i in range(MAX_DLC)]
+PROFILE_PATH = "output/can_id_profile.npz"
+DEVIATION_COLUMNS = [
+    "unseen_id",
+    "dlc_mismatch",
+    "bytes_out_of_range",
+    "constant_bytes_changed",
+    "period_too_short",
+]
+PERIOD_TOLERANCE_STD = 3.0
+# ──────────────────────────────────────────────────────────────
+
+
+class CanIdProfile:
+    """
+    Dense per-ID profile table, every array is indexed by the 11-bit CAN ID.
+
+    Parameters
+    ----------
+    seen : np.ndarray
+        bool array, True for IDs seen in attack free traffic.
+    expected_dlc : np.ndarray
+        uint8 array of the most frequent DLC.
+    period_mean : np.ndarray
+        float32 array of the mean period in seconds.
+    period_std : np.ndarray
+        float32 array of the period standard deviation in seconds.
+    byte_min : np.ndarray
+        uint8 array of shape (CAN_ID_SPACE, MAX_DLC).
+    byte_max : np.ndarray
+        uint8 array of shape (CAN_ID_SPACE, MAX_DLC).
+    constant_mask : np.ndarray
+        uint8 array, bit i is set if byte i is constant for the ID.
+    """
+
+    def __init__(
+        self,
+        seen,
+        expected_dlc,
+        period_mean,
+        period_std,
+        byte_min,
+        byte_max,
+        constant_mask,
+    ):
+        self.seen = seen
+        self.expected_dlc = expected_dlc
+        self.period_mean = period_mean
+        self.period_std = period_std
+        self.byte_min = byte_min
+        self.byte_max = byte_max
+        self.constant_mask = constant_mask
+
+    def min_period(self, can_id):
+        """
+        Shortest expected time between two frames of an ID, 0 if the ID has no period.
+
+        Parameters
+        ----------
+        can_id : int or np.ndarray
+            11-bit CAN IDs.
+
+        Returns
+        -------
+        float or np.ndarray
+            Minimum period in seconds.
+        """
+        period_mean = self.period_mean[can_id].astype(np.float64)
+        period_std = self.period_std[can_id].astype(np.float64)
+        return np.maximum(period_mean - PERIOD_TOLERANCE_STD * period_std, 0.0)
+
+    def frame_deviations(self, can_id, dlc, payload, interval=None):
+        """
+        Check a single frame against the profile of its ID.
+
+        Parameters
+        ----------
+        can_id : int
+            CAN ID, IDs outside the 11-bit space are reported as unseen.
+        dlc : int
+            DLC of the frame.
+        payload : sequence of int
+            The first `dlc` bytes of the frame.
+        interval : float, optional
+            Seconds since the previous frame of the ID, None for its first frame.
+
+        Returns
+        -------
+        tuple of int
+            Values of DEVIATION_COLUMNS for the frame.
+        """
+        if not 0 <= can_id < CAN_ID_SPACE or not self.seen[can_id]:
+            return 1, 0, 0, 0, 0
+        out_of_range = 0
+        constant_changed = 0
+        byte_min = self.byte_min[can_id]
+        byte_max = self.byte_max[can_id]
+        mask = self.constant_mask[can_id]
+        for i in range(min(dlc, MAX_DLC)):
+            value = payload[i]
+            if value < byte_min[i] or value > byte_max[i]:
+                out_of_range += 1
+                if mask >> i & 1:
+                    constant_changed += 1
+        too_short = interval is not None and interval < self.min_period(can_id)
+        return (
+            0,
+            int(dlc != self.expected_dlc[can_id]),
+            out_of_range,
+            constant_changed,
+            int(too_short),
+        )
+
+
+def convert_hex_columns(df, columns):
+    """
+    Convert hex str columns to int, keeping nulls of empty byte columns.
+
+    Parameters
+    ----------
+    df : pl.DataFrame or pl.LazyFrame
+        Input frame.
+    columns : list of str
+        Columns to convert.
+
+    Returns
+    -------
+    pl.DataFrame or pl.LazyFrame
+        Frame with the converted columns.
+    """
+    schema = df.collect_schema() if isinstance(df, pl.LazyFrame) else df.schema
+    return df.with_columns(
+        [
+            pl.col(col).str.to_integer(base=16, strict=True)
+            for col in columns
+            if schema[col] == pl.String
+        ]
+    )
+
+
+def build_profile(df, timestamp_column="timestamp", can_id_column="can_id"):
+    """
+    Build the per-ID profile table in one pass over attack free data.
+
+    Parameters
+    ----------
+    df : pl.DataFrame or pl.LazyFrame
+        Attack free frames with timestamp, can_id, dlc and byte columns.
+    timestamp_column : str
+        Name of the float timestamp column in seconds.
+    can_id_column : str
+        Name of the CAN ID column, hex str or int.
+
+    Returns
+    -------
+    CanIdProfile
+        The profile table, frames with an ID outside the 11-bit space are left out.
+    """
+    byte_columns = [col for col in BYTE_COLUMNS if col in df.collect_schema().names()]
+    lazy_df = convert_hex_columns(df.lazy(), [can_id_column] + byte_columns)
+    summary = (
+        lazy_df.sort(timestamp_column)
+        .group_by(can_id_column)
+        .agg(
+            pl.col("dlc").mode().first().alias("expected_dlc"),
+            pl.col(timestamp_column).diff().mean().alias("period_mean"),
+            pl.col(timestamp_column).diff().std().alias("period_std"),
+            *[pl.col(col).min().alias(f"{col}_min") for col in byte_columns],
+            *[pl.col(col).max().alias(f"{col}_max") for col in byte_columns],
+        )
+        # Extended (29-bit) IDs have no row in the table, lookups treat them as unseen.
+        .filter(pl.col(can_id_column).is_between(0, CAN_ID_SPACE - 1))
+        .collect()
+    )
+
+    can_ids = summary[can_id_column].to_numpy()
+    seen = np.zeros(CAN_ID_SPACE, dtype=bool)
+    seen[can_ids] = True
+    expected_dlc = np.zeros(CAN_ID_SPACE, dtype=np.uint8)
+    expected_dlc[can_ids] = summary["expected_dlc"].to_numpy()
+    period_mean = np.zeros(CAN_ID_SPACE, dtype=np.float32)
+    period_mean[can_ids] = summary["period_mean"].fill_null(0).to_numpy()
+    period_std = np.zeros(CAN_ID_SPACE, dtype=np.float32)
+    period_std[can_ids] = summary["period_std"].fill_null(0).to_numpy()
+
+    # Bytes that never appear for an ID get an empty range (min 255, max 0).
+    byte_min = np.full((CAN_ID_SPACE, MAX_DLC), 255, dtype=np.uint8)
+    byte_max = np.zeros((CAN_ID_SPACE, MAX_DLC), dtype=np.uint8)
+    constant_mask = np.zeros(CAN_ID_SPACE, dtype=np.uint8)
+    for i, col in enumerate(byte_columns):
+        minimum = summary[f"{col}_min"]
+        maximum = summary[f"{col}_max"]
+        present = minimum.is_not_null().to_numpy()
+        byte_min[can_ids[present], i] = minimum.to_numpy()[present]
+        byte_max[can_ids[present], i] = maximum.to_numpy()[present]
+        constant = present & (minimum == maximum).fill_null(False).to_numpy()
+        constant_mask[can_ids[constant]] |= np.uint8(1 << i)
+
+    return CanIdProfile(
+        seen, expected_dlc, period_mean, period_std, byte_min, byte_max, constant_mask
+    )
+
+
+def save_profile(profile, profile_path=PROFILE_PATH):
+    """
+    Save the profile table into a .npz file.
+
+    Parameters
+    ----------
+    profile : CanIdProfile
+        The profile table.
+    profile_path : str
+        Path of the .npz file.
+    """
+    np.savez(
+        profile_path,
+        seen_bits=np.packbits(profile.seen),
+        expected_dlc=profile.expected_dlc,
+        period_mean=profile.period_mean,
+        period_std=profile.period_std,
+        byte_min=profile.byte_min,
+        byte_max=profile.byte_max,
+        constant_mask=profile.constant_mask,
+    )
+
+
+def load_profile(profile_path=PROFILE_PATH):
+    """
+    Load a profile table saved with save_profile().
+
+    Parameters
+    ----------
+    profile_path : str
+        Path of the .npz file.
+
+    Returns
+    -------
+    CanIdProfile
+        The profile table.
+    """
+    with np.load(profile_path) as arrays:
+        return CanIdProfile(
+            np.unpackbits(arrays["seen_bits"])[:CAN_ID_SPACE].astype(bool),
+            arrays["expected_dlc"],
+            arrays["period_mean"],
+            arrays["period_std"],
+            arrays["byte_min"],
+            arrays["byte_max"],
+            arrays["constant_mask"],
+        )
+
+
+def add_profile_deviations(
+    df, profile, can_id_column="can_id", timestamp_column="timestamp"
+):
+    """
+    Check every frame of a DataFrame against the profile with array lookups.
+
+    Parameters
+    ----------
+    df : pl.DataFrame
+        Frames sorted by timestamp with can_id (hex str or int), dlc and byte columns.
+    profile : CanIdProfile
+        The profile table.
+    can_id_column : str
+        Name of the CAN ID column.
+    timestamp_column : str
+        Name of the float timestamp column in seconds.
+
+    Returns
+    -------
+    pl.DataFrame
+        DataFrame with newly added DEVIATION_COLUMNS.
+    """
+    byte_columns = [col for col in BYTE_COLUMNS if col in df.columns]
+    converted_df = convert_hex_columns(df, [can_id_column] + byte_columns)
+    raw_can_ids = converted_df[can_id_column].to_numpy()
+    dlc = converted_df["dlc"].to_numpy()
+    interval = (
+        converted_df.select(
+            pl.col(timestamp_column).diff().over(can_id_column).fill_null(-1.0)
+        )
+        .to_series()
+        .to_numpy()
+    )
+
+    # IDs outside the 11-bit space are looked up as ID 0 and masked out as unseen.
+    in_space = (raw_can_ids >= 0) & (raw_can_ids < CAN_ID_SPACE)
+    can_ids = np.where(in_space, raw_can_ids, 0)
+    seen = in_space & profile.seen[can_ids]
+    out_of_range = np.zeros(len(df), dtype=np.int64)
+    constant_changed = np.zeros(len(df), dtype=np.int64)
+    for i, col in enumerate(byte_columns):
+        values = converted_df[col].fill_null(0).to_numpy()
+        outside = (
+            seen
+            & (i < dlc)
+            & (
+                (values < profile.byte_min[can_ids, i])
+                | (values > profile.byte_max[can_ids, i])
+            )
+        )
+        out_of_range += outside
+        constant_changed += outside & (profile.constant_mask[can_ids] >> i & 1 == 1)
+
+    return df.with_columns(
+        pl.Series("unseen_id", (~seen).astype(np.int64)),
+        pl.Series(
+            "dlc_mismatch",
+            (seen & (dlc != profile.expected_dlc[can_ids])).astype(np.int64),
+        ),
+        pl.Series("bytes_out_of_range", out_of_range),
+        pl.Series("constant_bytes_changed", constant_changed),
+        pl.Series(
+            "period_too_short",
+            (seen & (interval >= 0) & (interval < profile.min_period(can_ids))).astype(
+                np.int64
+            ),
+        ),
+    )
+
+
+if __name__ == "__main__":
+    select_execution_profile(parse_execution_profile_argument())
+    output_data_paths = load_data_paths("out_paths")
+    print("Building CAN ID profile from attack free data!")
+    hex_schema = {col: pl.String for col in ["can_id"] + BYTE_COLUMNS}
+    profile = build_profile(
+        pl.scan_csv(output_data_paths["attack_free_df"], schema_overrides=hex_schema)
+    )
+    save_profile(profile)
+    print(f"{int(profile.seen.sum())} IDs are profiled and saved to {PROFILE_PATH}!")
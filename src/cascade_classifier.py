@@ -0,0 +1,286 @@
+"""
+Workflow of the cascade classifier
+1. stage 1 is a cheap model, a shallow decision tree on the raw ID, DLC and bytes
+    (CHEAP_FEATURE_COLUMNS), which predicts every frame with its class probabilities
+2. frames whose highest stage 1 probability reaches the confidence threshold keep the stage 1
+    prediction, most frames of a capture are decided here
+3. only the remaining, uncertain frames go to stage 2, the expensive model (KNN by default) on
+    every FEATURE_COLUMNS feature, including the per-ID timing
+4. evaluate_cascade() sweeps the threshold on held-out frames and reports, next to the cheap
+    and expensive models alone
+    1. the fraction of frames decided by each stage
+    2. the frames per second of the whole prediction
+    3. the accuracy and the agreement with the expensive model alone
+5. the script evaluates a cascade on the DoS and on the Fuzzy data, then fits one on both and
+    saves it as a model artifact, usable by score.py and the online detector like any model
+
+Usage
+    python src/cascade_classifier.py
+"""
+
+import time
+
+import numpy as np
+import polars as pl
+from sklearn.base import clone
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+from model_artifact import save_model_artifact
+from online_detector import BYTE_COLUMNS, FEATURE_COLUMNS, prepare_feature_frame
+from utils import (
+    load_data_paths,
+    parse_execution_profile_argument,
+    read_processed_csv,
+    select_execution_profile,
+)
+
+# ──────────────────────────────────────────────────────────────
+# 🛠️ Configuration Constants
+# ──────────────────────────────────────────────────────────────
+CHEAP_FEATURE_COLUMNS = ["can_id", "dlc"] + BYTE_COLUMNS
+CHEAP_MAX_DEPTH = 6
+CONFIDENCE_THRESHOLD = 0.99
+THRESHOLDS = [0.9, 0.95, 0.99, 0.999, 1.0]
+N_NEIGHBORS = 5
+RANDOM_STATE = 42
+# ──────────────────────────────────────────────────────────────
+
+
+class CascadeClassifier:
+    """
+    Two-stage classifier: a cheap model decides the confident frames, an expensive model the rest.
+
+    Parameters
+    ----------
+    cheap_model : object, optional
+        Unfitted estimator with predict_proba(), by default a decision tree of depth
+        CHEAP_MAX_DEPTH.
+    expensive_model : object, optional
+        Unfitted estimator, by default KNN with N_NEIGHBORS neighbours.
+    threshold : float
+        Frames whose highest stage 1 probability is at least this go no further.
+    feature_columns : list of str
+        Column order of the X given to fit() and predict().
+    cheap_feature_columns : list of str
+        Columns of X the cheap model uses.
+    """
+
+    def __init__(
+        self,
+        cheap_model=None,
+        expensive_model=None,
+        threshold=CONFIDENCE_THRESHOLD,
+        feature_columns=FEATURE_COLUMNS,
+        cheap_feature_columns=CHEAP_FEATURE_COLUMNS,
+    ):
+        self.cheap_model = cheap_model or DecisionTreeClassifier(
+            max_depth=CHEAP_MAX_DEPTH, random_state=RANDOM_STATE
+        )
+        self.expensive_model = expensive_model or KNeighborsClassifier(
+            n_neighbors=N_NEIGHBORS, algorithm="kd_tree"
+        )
+        self.threshold = threshold
+        self.feature_columns = list(feature_columns)
+        self.cheap_feature_columns = list(cheap_feature_columns)
+        self._cheap_index = np.array(
+            [self.feature_columns.index(col) for col in self.cheap_feature_columns]
+        )
+
+    def fit(self, X, y):
+        """
+        Fit both stages on the same frames.
+
+        Parameters
+        ----------
+        X : np.ndarray
+            Training vectors in feature_columns order.
+        y : np.ndarray
+            Training labels.
+
+        Returns
+        -------
+        CascadeClassifier
+            The fitted classifier.
+        """
+        X = np.asarray(X)
+        self.cheap_model_ = clone(self.cheap_model).fit(X[:, self._cheap_index], y)
+        self.expensive_model_ = clone(self.expensive_model).fit(X, y)
+        self.classes_ = self.cheap_model_.classes_
+        return self
+
+    def predict_stages(self, X, threshold=None):
+        """
+        Predict every frame and tell which stage decided it.
+
+        Parameters
+        ----------
+        X : np.ndarray
+            Vectors in feature_columns order.
+        threshold : float, optional
+            Confidence threshold, by default the classifier's.
+
+        Returns
+        -------
+        tuple of np.ndarray
+            (predictions, stages), stages is 1 for frames decided by the cheap model and 2
+            for frames sent to the expensive model.
+        """
+        X = np.asarray(X)
+        threshold = self.threshold if threshold is None else threshold
+        probabilities = self.cheap_model_.predict_proba(X[:, self._cheap_index])
+        predictions = self.classes_[probabilities.argmax(axis=1)]
+        uncertain = probabilities.max(axis=1) < threshold
+        if uncertain.any():
+            predictions[uncertain] = self.expensive_model_.predict(X[uncertain])
+        return predictions, np.where(uncertain, 2, 1)
+
+    def predict(self, X):
+        """
+        Predict every frame, see predict_stages().
+
+        Parameters
+        ----------
+        X : np.ndarray
+            Vectors in feature_columns order.
+
+        Returns
+        -------
+        np.ndarray
+            Predicted labels.
+        """
+        return self.predict_stages(X)[0]
+
+
+def _timed(predict, X):
+    start = time.perf_counter()
+    result = predict(X)
+    return result, time.perf_counter() - start
+
+
+def evaluate_cascade(cascade, X_test, y_test, thresholds=THRESHOLDS):
+    """
+    Report the stage fractions, throughput and accuracy of a fitted cascade per threshold.
+
+    Parameters
+    ----------
+    cascade : CascadeClassifier
+        Fitted cascade.
+    X_test : np.ndarray
+        Held-out vectors in the cascade's feature_columns order.
+    y_test : np.ndarray
+        Held-out labels.
+    thresholds : list of float
+        Confidence thresholds to evaluate.
+
+    Returns
+    -------
+    pl.DataFrame
+        One row for the cheap model alone, one per threshold and one for the expensive model
+        alone, with stage_1_fraction, stage_2_fraction, frames_per_second, accuracy and
+        agreement (with the expensive model alone).
+
+    Raises
+    ------
+    ValueError
+        If there are no test vectors.
+    """
+    if len(X_test) == 0:
+        raise ValueError("X_test is empty, there is nothing to evaluate.")
+    X_test = np.asarray(X_test)
+    n_frames = len(X_test)
+    expensive_predictions, expensive_seconds = _timed(
+        cascade.expensive_model_.predict, X_test
+    )
+
+    def row(mode, threshold, predictions, stages, seconds):
+        return {
+            "mode": mode,
+            "threshold": threshold,
+            "stage_1_fraction": float(np.mean(stages == 1)),
+            "stage_2_fraction": float(np.mean(stages == 2)),
+            "frames_per_second": n_frames / max(seconds, 1e-9),
+            "accuracy": float(np.mean(predictions == y_test)),
+            "agreement": float(np.mean(predictions == expensive_predictions)),
+        }
+
+    cheap_predictions, cheap_seconds = _timed(
+        cascade.cheap_model_.predict, X_test[:, cascade._cheap_index]
+    )
+    rows = [row("cheap", None, cheap_predictions, np.ones(n_frames), cheap_seconds)]
+    for threshold in thresholds:
+        (predictions, stages), seconds = _timed(
+            lambda X: cascade.predict_stages(X, threshold), X_test
+        )
+        rows.append(row("cascade", threshold, predictions, stages, seconds))
+    rows.append(
+        row(
+            "expensive",
+            None,
+            expensive_predictions,
+            np.full(n_frames, 2),
+            expensive_seconds,
+        )
+    )
+    return pl.DataFrame(rows)
+
+
+def load_labelled_features(df_path, n_samples, random_state=RANDOM_STATE):
+    """
+    Read a processed attack dataset as feature vectors and binary labels.
+
+    Parameters
+    ----------
+    df_path : str
+        Path to a processed DoS or Fuzzy CSV file.
+    n_samples : int
+        Number of frames sampled after the features are computed on the whole capture.
+    random_state : int
+        Seed of the sample.
+
+    Returns
+    -------
+    tuple of np.ndarray
+        (X in FEATURE_COLUMNS order, y with 1 for injected frames and 0 otherwise).
+    """
+    df = read_processed_csv(df_path)
+    features = prepare_feature_frame(df).with_columns(
+        (df["updated_flag"] == "T").cast(pl.Int64).alias("label")
+    )
+    features = features.sample(n=min(n_samples, features.height), seed=random_state)
+    return features.select(FEATURE_COLUMNS).to_numpy(), features["label"].to_numpy()
+
+
+if __name__ == "__main__":
+    profile = select_execution_profile(parse_execution_profile_argument())
+    train_sample_size = profile["train_sample_size"]
+    query_sample_size = profile["query_sample_size"]
+    output_data_paths = load_data_paths("out_paths")
+
+    training_sets = []
+    for key in ["dos_df", "fuzzy_df"]:
+        print(f"Evaluating cascade on {key}!")
+        X, y = load_labelled_features(
+            output_data_paths[key], train_sample_size + query_sample_size
+        )
+        # Small captures keep a fifth of their frames for the evaluation.
+        n_test = min(query_sample_size, len(X) // 5)
+        X_train, y_train = X[: len(X) - n_test], y[: len(X) - n_test]
+        X_test, y_test = X[len(X) - n_test :], y[len(X) - n_test :]
+        cascade = CascadeClassifier().fit(X_train, y_train)
+        print(evaluate_cascade(cascade, X_test, y_test))
+        training_sets.append((X_train, y_train))
+
+    print("Saving cascade fitted on both datasets!")
+    X_train = np.concatenate([X for X, _ in training_sets])
+    y_train = np.concatenate([y for _, y in training_sets])
+    # Pickled through the module, not __main__, so the artifact loads in any process.
+    from cascade_classifier import CascadeClassifier as ImportableCascadeClassifier
+
+    cascade = ImportableCascadeClassifier().fit(X_train, y_train)
+    save_model_artifact(
+        cascade,
+        "models/cascade",
+        FEATURE_COLUMNS,
+        preprocessing_params={"threshold": cascade.threshold},
+    )
@@ -0,0 +1,314 @@
+"""
+Workflow of dataset statistics
+1. compute_dataset_stats() builds every EDA statistic of a processed dataset from one lazy scan
+    1. the queries below share the scan and are collected together with pl.collect_all(),
+        so the CSV is read once
+    2. overview: rows, null count of every column, first and last timestamp
+    3. id_dlc_counts: frames, first and last timestamp per (updated_flag, can_id, dlc), the
+        value counts of can_id, dlc and updated_flag are sums over this table
+    4. byte_histograms: frames per (updated_flag, byte column, value)
+    5. datetime_components: frames per (year, month, day, hour)
+2. every table is additive, so the stats of two parts of a dataset can be combined with
+    merge_dataset_stats(), update_dataset_stats() adds the stats of rows appended to a dataset
+    to its stored stats without reading the rows before them
+3. load_dataset_stats() stores the tables as parquet in a stats folder next to the processed
+    data, keyed on the dataset's size and mtime, they are only recomputed when the data changes
+4. value_counts() and start_end_timestamps() answer the EDA questions from the stored tables
+
+Usage
+    python src/dataset_stats.py
+"""
+
+import json
+import os
+
+import polars as pl
+
+from utils import (
+    file_fingerprint,
+    load_data_paths,
+    parse_execution_profile_argument,
+    select_execution_profile,
+)
+
+# ──────────────────────────────────────────────────────────────
+# 🛠️ Configuration Constants
+# ──────────────────────────────────────────────────────────────
+STATS_DIR_NAME = "stats"
+STATS_VERSION = 1  # bump when the stats tables change
+MAX_DLC = 8
+BYTE_COLUMNS = [f"byte_{i}" for i in range(MAX_DLC)]
+HEX_SCHEMA = {col: pl.String for col in ["can_id"] + BYTE_COLUMNS}
+FLAG_COLUMN = "updated_flag"
+STATS_TABLES = ["overview", "id_dlc_counts", "byte_histograms", "datetime_components"]
+# Group keys of the additive count tables.
+COUNT_TABLE_KEYS = {
+    "id_dlc_counts": [FLAG_COLUMN, "can_id", "dlc"],
+    "byte_histograms": [FLAG_COLUMN, "byte", "value"],
+    "datetime_components": ["year", "month", "day", "hour"],
+}
+# ──────────────────────────────────────────────────────────────
+
+
+def compute_dataset_stats(df):
+    """
+    Compute the statistics tables of a dataset in one pass.
+
+    Parameters
+    ----------
+    df : pl.DataFrame or pl.LazyFrame
+        Processed frames with timestamp, can_id, dlc and byte columns (hex str). Datasets
+        without updated_flag (attack free) are counted as 'R'.
+
+    Returns
+    -------
+    dict
+        pl.DataFrame of every STATS_TABLES name.
+    """
+    lazy_df = df.lazy()
+    columns = lazy_df.collect_schema().names()
+    if FLAG_COLUMN not in columns:
+        lazy_df = lazy_df.with_columns(pl.lit("R").alias(FLAG_COLUMN))
+    byte_columns = [col for col in BYTE_COLUMNS if col in columns]
+    timestamp = pl.col("timestamp")
+
+    overview = lazy_df.select(
+        pl.len().alias("rows"),
+        timestamp.min().alias("start_timestamp"),
+        timestamp.max().alias("end_timestamp"),
+        *[pl.col(col).null_count().alias(f"{col}_nulls") for col in columns],
+    )
+    id_dlc_counts = lazy_df.group_by(FLAG_COLUMN, "can_id", "dlc").agg(
+        pl.len().alias("frames"),
+        timestamp.min().alias("start_timestamp"),
+        timestamp.max().alias("end_timestamp"),
+    )
+    byte_histograms = (
+        lazy_df.select(FLAG_COLUMN, *byte_columns)
+        .unpivot(index=FLAG_COLUMN, variable_name="byte", value_name="value")
+        .drop_nulls("value")
+        .group_by(FLAG_COLUMN, "byte", "value")
+        .agg(pl.len().alias("frames"))
+    )
+    datetime = pl.from_epoch(timestamp, time_unit="s")
+    datetime_components = lazy_df.group_by(
+        datetime.dt.year().alias("year"),
+        datetime.dt.month().alias("month"),
+        datetime.dt.day().alias("day"),
+        datetime.dt.hour().alias("hour"),
+    ).agg(pl.len().alias("frames"))
+
+    tables = pl.collect_all(
+        [overview, id_dlc_counts, byte_histograms, datetime_components]
+    )
+    stats = dict(zip(STATS_TABLES, tables))
+    for name, key in COUNT_TABLE_KEYS.items():
+        stats[name] = stats[name].sort(key)
+    return stats
+
+
+def merge_dataset_stats(stats, other_stats):
+    """
+    Combine the statistics of two parts of a dataset.
+
+    Parameters
+    ----------
+    stats : dict
+        Tables returned by compute_dataset_stats().
+    other_stats : dict
+        Tables of the other part.
+
+    Returns
+    -------
+    dict
+        Tables of both parts together.
+    """
+    overview = pl.concat([stats["overview"], other_stats["overview"]])
+    merged = {
+        "overview": overview.select(
+            pl.col("rows").sum(),
+            pl.col("start_timestamp").min(),
+            pl.col("end_timestamp").max(),
+            *[pl.col(col).sum() for col in overview.columns if col.endswith("_nulls")],
+        )
+    }
+    for name, key in COUNT_TABLE_KEYS.items():
+        table = pl.concat([stats[name], other_stats[name]])
+        aggregations = [pl.col("frames").sum()]
+        if "start_timestamp" in table.columns:
+            aggregations += [
+                pl.col("start_timestamp").min(),
+                pl.col("end_timestamp").max(),
+            ]
+        merged[name] = table.group_by(key).agg(aggregations).sort(key)
+    return merged
+
+
+def get_stats_dir(df_path):
+    """
+    Folder of the statistics of a processed dataset, next to the dataset.
+
+    Parameters
+    ----------
+    df_path : str
+        Path to a processed CSV file.
+
+    Returns
+    -------
+    str
+        Path of the stats folder of the dataset.
+    """
+    name = os.path.splitext(os.path.basename(df_path))[0]
+    return os.path.join(os.path.dirname(df_path), STATS_DIR_NAME, name)
+
+
+def save_dataset_stats(stats, df_path):
+    """
+    Store the statistics tables of a dataset, keyed on its current size and mtime.
+
+    Parameters
+    ----------
+    stats : dict
+        Tables returned by compute_dataset_stats().
+    df_path : str
+        Path to the processed CSV file the stats belong to.
+    """
+    stats_dir = get_stats_dir(df_path)
+    os.makedirs(stats_dir, exist_ok=True)
+    for name in STATS_TABLES:
+        stats[name].write_parquet(os.path.join(stats_dir, f"{name}.parquet"))
+    # The key is written last, an interrupted run leaves a stale key and is redone.
+    with open(os.path.join(stats_dir, "key.json"), "w") as file:
+        json.dump(
+            {"source": file_fingerprint(df_path), "version": STATS_VERSION},
+            file,
+            indent=2,
+        )
+
+
+def update_dataset_stats(df_path, new_stats, previous_source):
+    """
+    Add the statistics of rows appended to a dataset to its stored statistics.
+
+    Parameters
+    ----------
+    df_path : str
+        Path to the processed CSV file the rows were appended to.
+    new_stats : dict
+        Tables of the appended rows, returned by compute_dataset_stats().
+    previous_source : dict
+        file_fingerprint() of the dataset before the rows were appended.
+
+    Returns
+    -------
+    bool
+        True if the stored stats were updated, False if there were none for the dataset
+        before the append. load_dataset_stats() computes them when they are next needed.
+    """
+    stats_dir = get_stats_dir(df_path)
+    key_path = os.path.join(stats_dir, "key.json")
+    if not os.path.isfile(key_path):
+        return False
+    with open(key_path, "r") as file:
+        if json.load(file) != {"source": previous_source, "version": STATS_VERSION}:
+            return False
+    stats = {
+        name: pl.read_parquet(os.path.join(stats_dir, f"{name}.parquet"))
+        for name in STATS_TABLES
+    }
+    save_dataset_stats(merge_dataset_stats(stats, new_stats), df_path)
+    return True
+
+
+def load_dataset_stats(df_path):
+    """
+    Load the stored statistics of a dataset, computing them when the dataset changed.
+
+    Parameters
+    ----------
+    df_path : str
+        Path to a processed CSV file.
+
+    Returns
+    -------
+    dict
+        pl.DataFrame of every STATS_TABLES name.
+    """
+    stats_dir = get_stats_dir(df_path)
+    key_path = os.path.join(stats_dir, "key.json")
+    key = {"source": file_fingerprint(df_path), "version": STATS_VERSION}
+    if os.path.isfile(key_path):
+        with open(key_path, "r") as file:
+            if json.load(file) == key:
+                return {
+                    name: pl.read_parquet(os.path.join(stats_dir, f"{name}.parquet"))
+                    for name in STATS_TABLES
+                }
+
+    stats = compute_dataset_stats(pl.scan_csv(df_path, schema_overrides=HEX_SCHEMA))
+    save_dataset_stats(stats, df_path)
+    return stats
+
+
+def value_counts(stats, column, flag=None):
+    """
+    Value counts of can_id, dlc or updated_flag.
+
+    Parameters
+    ----------
+    stats : dict
+        Tables returned by load_dataset_stats().
+    column : str
+        'can_id', 'dlc' or 'updated_flag'.
+    flag : str, optional
+        Only count frames with this updated_flag ('R' or 'T').
+
+    Returns
+    -------
+    pl.DataFrame
+        column and frames, most frequent first.
+    """
+    table = stats["id_dlc_counts"]
+    if flag is not None:
+        table = table.filter(pl.col(FLAG_COLUMN) == flag)
+    return (
+        table.group_by(column)
+        .agg(pl.col("frames").sum())
+        .sort(["frames", column], descending=[True, False])
+    )
+
+
+def start_end_timestamps(stats, flag=None):
+    """
+    First and last timestamp of a dataset.
+
+    Parameters
+    ----------
+    stats : dict
+        Tables returned by load_dataset_stats().
+    flag : str, optional
+        Only consider frames with this updated_flag ('R' or 'T').
+
+    Returns
+    -------
+    tuple of float
+        (start_timestamp, end_timestamp).
+    """
+    table = stats["id_dlc_counts"]
+    if flag is not None:
+        table = table.filter(pl.col(FLAG_COLUMN) == flag)
+    return table["start_timestamp"].min(), table["end_timestamp"].max()
+
+
+if __name__ == "__main__":
+    select_execution_profile(parse_execution_profile_argument())
+    output_data_paths = load_data_paths("out_paths")
+    for key, path in output_data_paths.items():
+        stats = load_dataset_stats(path)
+        overview = stats["overview"].row(0, named=True)
+        print(
+            f"{key}: {overview['rows']} rows, "
+            f"{value_counts(stats, 'can_id').height} IDs, "
+            f"{overview['start_timestamp']} - {overview['end_timestamp']}"
+        )
+        print(value_counts(stats, "dlc"))
@@ -0,0 +1,394 @@
+"""
+Workflow of the feature registry
+1. every derived column is registered once with register_feature(): its name, its inputs and a
+    code version. Inputs are dataset columns or other registered features, the function gets a
+    DataFrame of its inputs in dataset row order and returns the feature as a pl.Series
+2. load_features() returns the requested features of a processed dataset, nothing else
+    1. every feature is cached on disk as its own column file, an uncompressed Arrow IPC file
+        in a features folder next to the dataset
+    2. the file name holds the feature's key: a hash of the dataset's size and mtime, the
+        feature's name, version and inputs, and the keys of the features it reads. Changing a
+        feature's code version or one of its inputs changes its key and the keys of every
+        feature computed from it
+    3. a cache hit is a memory-mapped read of the column file, the dataset is not read at all
+    4. on a miss the dataset's needed columns are read once, the missing features (and the
+        features they depend on) are computed, written and memory-mapped back. Files of an
+        older key of the same feature are removed
+3. a feature is written to a temporary file and renamed into place, an interrupted run leaves
+    no half-written column behind
+
+Usage
+    python src/feature_registry.py
+"""
+
+import hashlib
+import json
+import os
+
+import polars as pl
+import pyarrow as pa
+
+from online_detector import add_rolling_features
+from payload import BYTE_COLUMNS, PAYLOAD_COLUMN, payload_expr
+from preprocess_data_with_polars import (
+    convert_hex_column_to_int,
+    convert_timestamp_to_datetime,
+    encode_updated_flag_column,
+)
+from timeline import (
+    TIMESTAMP_US_COLUMN,
+    interval_us_expr,
+    timestamp_us_expr,
+    window_count_expr,
+)
+from utils import (
+    HEX_COLUMNS,
+    file_fingerprint,
+    load_data_paths,
+    parse_execution_profile_argument,
+    select_execution_profile,
+)
+
+# ──────────────────────────────────────────────────────────────
+# 🛠️ Configuration Constants
+# ──────────────────────────────────────────────────────────────
+FEATURES_DIR_NAME = "features"
+FEATURE_STORE_VERSION = 1  # bump when the cache layout changes
+FEATURE_FILE_EXTENSION = ".arrow"
+KEY_LENGTH = 16  # hex digits of the key in the file name
+RATE_WINDOW_US = 10_000
+# ──────────────────────────────────────────────────────────────
+
+# Feature name to its inputs, version and function, filled by register_feature().
+FEATURES = {}
+
+
+def register_feature(name, inputs, version=1):
+    """
+    Decorator registering a feature function.
+
+    Parameters
+    ----------
+    name : str
+        Name of the feature column, must not be a dataset column.
+    inputs : list of str
+        Dataset columns or registered features the function reads.
+    version : int
+        Code version, bump it when the function's result changes so cached columns are
+        recomputed.
+
+    Returns
+    -------
+    callable
+        Decorator returning the function unchanged. The function takes a pl.DataFrame of the
+        inputs and returns a pl.Series with one value per row.
+
+    Raises
+    ------
+    ValueError
+        If a feature with the same name is already registered.
+    """
+
+    def decorator(function):
+        if name in FEATURES:
+            raise ValueError(f"Feature '{name}' is already registered.")
+        FEATURES[name] = {
+            "inputs": list(inputs),
+            "version": version,
+            "function": function,
+        }
+        return function
+
+    return decorator
+
+
+@register_feature("datetime", ["timestamp"])
+def _datetime(df):
+    return convert_timestamp_to_datetime(df, "datetime", "timestamp")["datetime"]
+
+
+@register_feature(TIMESTAMP_US_COLUMN, ["timestamp"])
+def _timestamp_us(df):
+    return df.select(timestamp_us_expr(df.schema["timestamp"])).to_series()
+
+
+@register_feature("can_id_int", ["can_id"])
+def _can_id_int(df):
+    return convert_hex_column_to_int(df, "can_id_int", "can_id")["can_id_int"]
+
+
+def _register_byte_feature(byte_column):
+    @register_feature(f"{byte_column}_int", [byte_column])
+    def _byte_int(df):
+        return convert_hex_column_to_int(df, "byte_int", byte_column)["byte_int"]
+
+
+for _byte_column in BYTE_COLUMNS:
+    _register_byte_feature(_byte_column)
+
+
+@register_feature(PAYLOAD_COLUMN, BYTE_COLUMNS)
+def _payload(df):
+    return df.select(payload_expr(df.schema)).to_series()
+
+
+@register_feature("updated_flag_encoded", ["updated_flag"])
+def _updated_flag_encoded(df):
+    return encode_updated_flag_column(df, "updated_flag")["updated_flag"]
+
+
+@register_feature("interval_us", [TIMESTAMP_US_COLUMN, "can_id"])
+def _interval_us(df):
+    return df.select(interval_us_expr("can_id")).to_series()
+
+
+@register_feature(f"frames_in_{RATE_WINDOW_US}us", [TIMESTAMP_US_COLUMN, "can_id"])
+def _frames_in_window(df):
+    # The window count needs sorted timestamps, the result is put back in row order.
+    counts = (
+        df.with_row_index("_row")
+        .sort(TIMESTAMP_US_COLUMN, maintain_order=True)
+        .select("_row", window_count_expr(RATE_WINDOW_US, "can_id").alias("count"))
+        .sort("_row")
+    )
+    return counts["count"]
+
+
+@register_feature("interval", ["timestamp", "can_id"])
+def _interval(df):
+    return add_rolling_features(df)["interval"]
+
+
+@register_feature("mean_interval", ["timestamp", "can_id"])
+def _mean_interval(df):
+    return add_rolling_features(df)["mean_interval"]
+
+
+def resolve_features(names):
+    """
+    Order the requested features after the features they depend on.
+
+    Parameters
+    ----------
+    names : list of str
+        Registered feature names.
+
+    Returns
+    -------
+    list of str
+        The requested features and their feature dependencies, every feature after its
+        dependencies.
+
+    Raises
+    ------
+    ValueError
+        If a feature is not registered or the dependencies form a cycle.
+    """
+    ordered = []
+    visiting = set()
+
+    def visit(name):
+        if name in ordered:
+            return
+        if name not in FEATURES:
+            raise ValueError(
+                f"Feature '{name}' is not registered, choose from {list(FEATURES)}."
+            )
+        if name in visiting:
+            raise ValueError(f"Feature '{name}' depends on itself.")
+        visiting.add(name)
+        for input_name in FEATURES[name]["inputs"]:
+            if input_name in FEATURES:
+                visit(input_name)
+        visiting.discard(name)
+        ordered.append(name)
+
+    for name in names:
+        visit(name)
+    return ordered
+
+
+def feature_keys(names, df_path):
+    """
+    Cache key of every feature of a dataset and of the features they depend on.
+
+    Parameters
+    ----------
+    names : list of str
+        Registered feature names.
+    df_path : str
+        Path to the processed CSV file.
+
+    Returns
+    -------
+    dict
+        Feature name to its hex key, in resolve_features() order.
+    """
+    dataset = file_fingerprint(df_path)
+    keys = {}
+    for name in resolve_features(names):
+        feature = FEATURES[name]
+        definition = {
+            "store_version": FEATURE_STORE_VERSION,
+            "dataset": dataset,
+            "feature": name,
+            "version": feature["version"],
+            "inputs": [keys.get(col, col) for col in feature["inputs"]],
+        }
+        payload = json.dumps(definition, sort_keys=True).encode()
+        keys[name] = hashlib.sha256(payload).hexdigest()[:KEY_LENGTH]
+    return keys
+
+
+def get_features_dir(df_path):
+    """
+    Folder of the cached features of a processed dataset, next to the dataset.
+
+    Parameters
+    ----------
+    df_path : str
+        Path to a processed CSV file.
+
+    Returns
+    -------
+    str
+        Path of the features folder of the dataset.
+    """
+    name = os.path.splitext(os.path.basename(df_path))[0]
+    return os.path.join(os.path.dirname(df_path), FEATURES_DIR_NAME, name)
+
+
+def get_feature_path(features_dir, name, key):
+    return os.path.join(features_dir, f"{name}-{key}{FEATURE_FILE_EXTENSION}")
+
+
+def _read_feature(path):
+    # Uncompressed IPC files are memory-mapped, the column's buffers stay in page cache and
+    # polars uses them without a copy.
+    with pa.memory_map(path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    return pl.from_arrow(table).to_series()
+
+
+def _write_feature(series, features_dir, name, key):
+    path = get_feature_path(features_dir, name, key)
+    temp_path = f"{path}.tmp"
+    series.to_frame(name).write_ipc(temp_path, compression="uncompressed")
+    os.replace(temp_path, path)
+    # Files of older keys of the same feature, '<name>-<key>.arrow' with another key.
+    prefix = f"{name}-"
+    key_length = KEY_LENGTH + len(FEATURE_FILE_EXTENSION)
+    for file_name in os.listdir(features_dir):
+        rest = file_name[len(prefix) :]
+        stale = file_name.startswith(prefix) and file_name != os.path.basename(path)
+        if stale and rest.endswith(FEATURE_FILE_EXTENSION) and len(rest) == key_length:
+            os.remove(os.path.join(features_dir, file_name))
+    return path
+
+
+def _read_dataset_columns(df_path, columns):
+    lf = pl.scan_csv(df_path, schema_overrides={col: pl.String for col in HEX_COLUMNS})
+    missing = [col for col in columns if col not in lf.collect_schema()]
+    if missing:
+        raise ValueError(f"Columns {missing} not found in {df_path}.")
+    return lf.select(columns).collect()
+
+
+def load_features(df_path, names):
+    """
+    Load features of a processed dataset, from the cache when their key matches.
+
+    Parameters
+    ----------
+    df_path : str
+        Path to a processed CSV file.
+    names : list of str
+        Registered feature names.
+
+    Returns
+    -------
+    pl.DataFrame
+        The requested features in the requested order, one row per dataset row. Cached
+        columns are memory-mapped.
+
+    Raises
+    ------
+    ValueError
+        If a feature is not registered or an input column is missing from the dataset.
+    """
+    features_dir = get_features_dir(df_path)
+    keys = feature_keys(names, df_path)
+    paths = {
+        name: get_feature_path(features_dir, name, key) for name, key in keys.items()
+    }
+    missing = [name for name in keys if not os.path.isfile(paths[name])]
+
+    computed = {}
+    if missing:
+        # Only the features that are missing, or that a missing feature reads, are loaded.
+        required = set(missing)
+        for name in reversed(list(keys)):
+            if name in required:
+                required.update(col for col in FEATURES[name]["inputs"] if col in keys)
+        raw_columns = sorted(
+            {
+                col
+                for name in missing
+                for col in FEATURES[name]["inputs"]
+                if col not in FEATURES
+            }
+        )
+        dataset = _read_dataset_columns(df_path, raw_columns) if raw_columns else None
+        os.makedirs(features_dir, exist_ok=True)
+        for name in keys:
+            if name not in required:
+                continue
+            if name not in missing:
+                computed[name] = _read_feature(paths[name])
+                continue
+            inputs = pl.DataFrame(
+                [
+                    computed[col].alias(col) if col in FEATURES else dataset[col]
+                    for col in FEATURES[name]["inputs"]
+                ]
+            )
+            series = FEATURES[name]["function"](inputs)
+            _write_feature(series.alias(name), features_dir, name, keys[name])
+            computed[name] = _read_feature(paths[name])
+
+    columns = [
+        (computed[name] if name in computed else _read_feature(paths[name])).alias(name)
+        for name in names
+    ]
+    return pl.DataFrame(columns)
+
+
+def load_feature_frames(names, paths_key="out_paths"):
+    """
+    Load the same features of every dataset of a paths group.
+
+    Parameters
+    ----------
+    names : list of str
+        Registered feature names.
+    paths_key : str
+        Paths group of the config, e.g. 'out_paths'.
+
+    Returns
+    -------
+    dict
+        Dataset name to the pl.DataFrame of load_features().
+    """
+    return {
+        key: load_features(path, names)
+        for key, path in load_data_paths(paths_key).items()
+    }
+
+
+if __name__ == "__main__":
+    select_execution_profile(parse_execution_profile_argument())
+    output_data_paths = load_data_paths("out_paths")
+    requested = ["datetime", "can_id_int", PAYLOAD_COLUMN, "interval_us"]
+    for key, path in output_data_paths.items():
+        df = load_features(path, requested)
+        print(f"{key}: {df.height} rows, features {df.columns}")
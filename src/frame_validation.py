@@ -0,0 +1,454 @@
+"""
+Workflow of frame validation
+1. a raw capture is read as lines (pl.scan_lines()), every line keeps its line number and text,
+    so a malformed line can never abort the read
+2. the lines are split into fields
+    1. csv (DoS / Fuzzy): split on ',', the first line is skipped like set_column_names() does
+    2. txt (attack free): lines starting with 'Timestamp:' are split on whitespace and mapped
+        like parse_attack_free_line(), other lines are not frames and are ignored
+3. validate_fields() checks every frame in one vectorized pass and gives each failed check a
+    reason code, see REASONS
+4. frames without a reason continue as str columns with the loader's column names, frames
+    with reasons are written to a quarantine csv (line number, reasons, raw line) in a
+    quarantine folder next to the output
+5. a segment of a growing capture (load_data_with_polars.append_new_frames()) is validated the
+    same way, its line numbers continue the capture's and its first frames are ordered against
+    the last valid frame before the segment
+
+Usage
+    python src/frame_validation.py input/dos_dataset.csv
+"""
+
+import argparse
+import os
+
+import polars as pl
+
+# ──────────────────────────────────────────────────────────────
+# 🛠️ Configuration Constants
+# ──────────────────────────────────────────────────────────────
+MAX_DLC = 8
+MAX_CAN_ID = 0x1FFFFFFF  # 29-bit extended identifiers
+FLAG_VALUES = ["R", "T"]
+HEX_BYTE_PATTERN = r"^[0-9a-fA-F]{2}$"
+CAN_ID_PATTERN = r"^[0-9a-fA-F]{1,8}$"
+CANDUMP_PREFIX = "Timestamp:"
+CANDUMP_MIN_TOKENS = 8
+LINE_NUMBER_COLUMN = "line_number"
+RAW_COLUMN = "raw"
+FIELDS_COLUMN = "fields"
+REASONS_COLUMN = "reasons"
+REASON_SEPARATOR = ";"
+QUARANTINE_DIR_NAME = "quarantine"
+REASONS = {
+    "field_count": "number of fields does not match the DLC",
+    "bad_timestamp": "timestamp is not a number",
+    "timestamp_order": "timestamp is earlier than the previous frame's",
+    "bad_can_id": "ID is not hex or above 29 bits",
+    "bad_dlc": "DLC is not an integer from 0 to 8",
+    "bad_byte": "a payload byte within the DLC is not two hex digits",
+    "flag_count": "R / T flag missing or present more than once",
+    "flag_position": "R / T flag is not in the field right after the DLC bytes",
+}
+# ──────────────────────────────────────────────────────────────
+
+
+def read_csv_fields(input_path, first_line_number=1):
+    """
+    Read a raw DoS / Fuzzy csv as lines split into fields.
+
+    Parameters
+    ----------
+    input_path : str or io.BytesIO
+        Path to the raw csv capture, or a segment of it starting at a line.
+    first_line_number : int
+        Line number of the first line, by default 1 (the start of the capture).
+
+    Returns
+    -------
+    pl.LazyFrame
+        line_number (1-based), raw and fields (list of str).
+    """
+    lf = pl.scan_lines(
+        input_path,
+        name=RAW_COLUMN,
+        row_index_name=LINE_NUMBER_COLUMN,
+        row_index_offset=first_line_number,
+    )
+    # set_column_names() reads the first line as a header, it is skipped here too so both
+    # loaders keep the same frames.
+    if first_line_number == 1:
+        lf = lf.slice(1)
+    return lf.filter(pl.col(RAW_COLUMN).str.strip_chars() != "").with_columns(
+        pl.col(RAW_COLUMN).str.strip_chars_end("\r").str.split(",").alias(FIELDS_COLUMN)
+    )
+
+
+def read_candump_fields(input_path, first_line_number=1):
+    """
+    Read a raw attack free txt capture as frame lines split into fields.
+
+    Parameters
+    ----------
+    input_path : str or io.BytesIO
+        Path to the raw txt capture, or a segment of it starting at a line.
+    first_line_number : int
+        Line number of the first line, by default 1 (the start of the capture).
+
+    Returns
+    -------
+    pl.LazyFrame
+        line_number (1-based), raw and fields [timestamp, id, frame_type, dlc, bytes...] of
+        the lines starting with 'Timestamp:'. Lines with fewer than 8 tokens, which
+        parse_attack_free_line() skips, get only their tokens and fail the field_count check.
+    """
+    tokens = pl.col(RAW_COLUMN).str.extract_all(r"\S+")
+    fields = pl.concat_list(
+        tokens.list.get(1, null_on_oob=True),
+        tokens.list.get(3, null_on_oob=True),
+        tokens.list.get(4, null_on_oob=True),
+        tokens.list.get(6, null_on_oob=True),
+        tokens.list.slice(7),
+    )
+    return (
+        pl.scan_lines(
+            input_path,
+            name=RAW_COLUMN,
+            row_index_name=LINE_NUMBER_COLUMN,
+            row_index_offset=first_line_number,
+        )
+        .filter(pl.col(RAW_COLUMN).str.starts_with(CANDUMP_PREFIX))
+        .with_columns(
+            pl.when(tokens.list.len() >= CANDUMP_MIN_TOKENS)
+            .then(fields)
+            .otherwise(tokens.list.slice(1))
+            .alias(FIELDS_COLUMN)
+        )
+    )
+
+
+def add_timestamp_order_check(
+    lf, timestamp_column, frame_ok_column, check_column, previous_timestamp=None
+):
+    """
+    Flag frames whose timestamp breaks the order of the capture.
+
+    Only frames passing the other checks are compared. A frame is out of order when it is
+    earlier than the previous frame, or when it jumps ahead of both neighbours, in which case
+    the frame after it is not blamed.
+
+    Parameters
+    ----------
+    lf : pl.LazyFrame
+        Frames with a Float64 timestamp column and a boolean column of the other checks.
+    timestamp_column : str
+        Name of the Float64 timestamp column.
+    frame_ok_column : str
+        Name of the boolean column, True if the frame passes every other check.
+    check_column : str
+        Name of the boolean column added.
+    previous_timestamp : float, optional
+        Timestamp of the last frame before these ones, when they continue a capture. The
+        first frames are compared with it.
+
+    Returns
+    -------
+    pl.LazyFrame
+        The frames with the check column.
+    """
+    timestamp = pl.col(timestamp_column)
+    frame_ok = pl.col(frame_ok_column)
+    lf = lf.with_columns(pl.when(frame_ok).then(timestamp).alias("_candidate"))
+    previous = pl.col("_candidate").shift(1).forward_fill()
+    if previous_timestamp is not None:
+        previous = previous.fill_null(previous_timestamp)
+    lf = lf.with_columns(
+        previous.alias("_previous"),
+        pl.col("_candidate").shift(-1).backward_fill().alias("_following"),
+    )
+    lf = lf.with_columns(
+        (
+            (timestamp > pl.col("_following"))
+            & (pl.col("_following") >= pl.col("_previous")).fill_null(True)
+        )
+        .fill_null(False)
+        .alias("_spike")
+    )
+    lf = lf.with_columns(
+        pl.when(frame_ok)
+        .then(pl.col("_spike"))
+        .shift(1)
+        .forward_fill()
+        .fill_null(False)
+        .alias("_previous_spike")
+    )
+    earlier = (timestamp < pl.col("_previous")).fill_null(False) & ~pl.col(
+        "_previous_spike"
+    )
+    return lf.with_columns(
+        (frame_ok & (pl.col("_spike") | earlier)).alias(check_column)
+    ).drop("_candidate", "_previous", "_following", "_spike", "_previous_spike")
+
+
+def validate_fields(lf, column_names, has_flag, previous_timestamp=None):
+    """
+    Check every frame in one pass and name the columns.
+
+    Parameters
+    ----------
+    lf : pl.LazyFrame
+        line_number, raw and fields, see read_csv_fields() / read_candump_fields().
+    column_names : list of str
+        Loader column names of the fields, the payload columns are byte_0 ... byte_7 and the
+        dlc column is 'dlc'. With a flag the last name is the flag column.
+    has_flag : bool
+        The frame ends with a R / T flag right after its DLC bytes (DoS / Fuzzy csv).
+    previous_timestamp : float, optional
+        Timestamp of the last valid frame before these ones, see add_timestamp_order_check().
+
+    Returns
+    -------
+    pl.LazyFrame
+        line_number, raw, the named str columns (fields beyond the names are dropped) and
+        reasons, the REASONS codes joined with ';', empty for valid frames.
+    """
+    payload_start = column_names.index("byte_0")
+    # Fields from byte_0 on: the DLC bytes, then the flag when there is one.
+    slots = column_names[payload_start:]
+    fields = pl.col(FIELDS_COLUMN)
+    # Every step materializes its columns, so the checks share them instead of recomputing.
+    lf = lf.with_columns(
+        fields.list.len().alias("_n_fields"),
+        *[
+            fields.list.get(i, null_on_oob=True).alias(name)
+            for i, name in enumerate(column_names)
+        ],
+    )
+    lf = lf.with_columns(
+        pl.col("dlc").str.to_integer(strict=False).alias("_dlc"),
+        pl.col(column_names[0]).cast(pl.Float64, strict=False).alias("_timestamp"),
+    )
+    dlc = pl.col("_dlc")
+    dlc_valid = dlc.is_between(0, MAX_DLC).fill_null(False)
+    can_id = pl.col(column_names[1])
+    checks = {
+        "field_count": dlc_valid
+        & (pl.col("_n_fields") != dlc + payload_start + int(has_flag)),
+        "bad_timestamp": pl.col("_timestamp").is_null(),
+        "bad_can_id": ~(
+            can_id.str.contains(CAN_ID_PATTERN)
+            & (can_id.str.to_integer(base=16, strict=False) <= MAX_CAN_ID)
+        ).fill_null(False),
+        "bad_dlc": ~dlc_valid,
+        "bad_byte": pl.any_horizontal(
+            [
+                dlc_valid
+                & (dlc > i)
+                & ~pl.col(f"byte_{i}").str.contains(HEX_BYTE_PATTERN).fill_null(False)
+                for i in range(MAX_DLC)
+            ]
+        ),
+    }
+    if has_flag:
+        is_flag = [pl.col(slot).is_in(FLAG_VALUES).fill_null(False) for slot in slots]
+        flag_count = pl.sum_horizontal(is_flag)
+        flag_at_dlc = pl.any_horizontal(
+            [(dlc == i) & flag for i, flag in enumerate(is_flag)]
+        )
+        checks["flag_count"] = flag_count != 1
+        checks["flag_position"] = dlc_valid & (flag_count == 1) & ~flag_at_dlc
+    lf = lf.with_columns(
+        [check.fill_null(False).alias(f"_{code}") for code, check in checks.items()]
+    )
+    lf = lf.with_columns(
+        (~pl.any_horizontal([f"_{code}" for code in checks])).alias("_frame_ok")
+    )
+    lf = add_timestamp_order_check(
+        lf, "_timestamp", "_frame_ok", "_timestamp_order", previous_timestamp
+    )
+    codes = list(checks) + ["timestamp_order"]
+    reasons = pl.concat_str(
+        [pl.when(pl.col(f"_{code}")).then(pl.lit(code)) for code in codes],
+        separator=REASON_SEPARATOR,
+        ignore_nulls=True,
+    )
+    return lf.select(
+        LINE_NUMBER_COLUMN, RAW_COLUMN, *column_names, reasons.alias(REASONS_COLUMN)
+    )
+
+
+def split_valid_frames(validated, column_names):
+    """
+    Separate the valid frames from the quarantined ones.
+
+    Parameters
+    ----------
+    validated : pl.LazyFrame
+        Frames returned by validate_fields().
+    column_names : list of str
+        Loader column names.
+
+    Returns
+    -------
+    tuple of pl.DataFrame
+        (valid frames with the str columns, quarantine with line_number, reasons and raw).
+    """
+    validated = validated.collect()
+    has_reason = pl.col(REASONS_COLUMN) != ""
+    valid = validated.filter(~has_reason).select(column_names)
+    quarantine = validated.filter(has_reason).select(
+        LINE_NUMBER_COLUMN, REASONS_COLUMN, RAW_COLUMN
+    )
+    return valid, quarantine
+
+
+def validate_capture(
+    input_path,
+    capture_format,
+    column_names,
+    first_line_number=1,
+    previous_timestamp=None,
+):
+    """
+    Read and validate a raw capture.
+
+    Parameters
+    ----------
+    input_path : str or io.BytesIO
+        Path to the raw capture, or a segment of it starting at a line.
+    capture_format : str
+        'csv' (DoS / Fuzzy, with a flag) or 'txt' (attack free candump text).
+    column_names : list of str
+        Loader column names of the capture.
+    first_line_number : int
+        Line number of the first line of a segment, by default 1 (the whole capture).
+    previous_timestamp : float, optional
+        Timestamp of the last valid frame before a segment, see add_timestamp_order_check().
+
+    Returns
+    -------
+    tuple of pl.DataFrame
+        (valid frames as str columns, quarantine), see split_valid_frames().
+
+    Raises
+    ------
+    ValueError
+        If the capture format is invalid.
+    """
+    if capture_format == "csv":
+        lf = validate_fields(
+            read_csv_fields(input_path, first_line_number),
+            column_names,
+            has_flag=True,
+            previous_timestamp=previous_timestamp,
+        )
+    elif capture_format == "txt":
+        lf = validate_fields(
+            read_candump_fields(input_path, first_line_number),
+            column_names,
+            has_flag=False,
+            previous_timestamp=previous_timestamp,
+        )
+    else:
+        raise ValueError("Invalid capture format! Use 'csv' or 'txt'.")
+    return split_valid_frames(lf, column_names)
+
+
+def get_quarantine_path(df_out_path):
+    """
+    Path of the quarantine csv of a processed dataset.
+
+    Parameters
+    ----------
+    df_out_path : str
+        Path of the processed CSV file.
+
+    Returns
+    -------
+    str
+        <output folder>/quarantine/<file name>.
+    """
+    return os.path.join(
+        os.path.dirname(df_out_path), QUARANTINE_DIR_NAME, os.path.basename(df_out_path)
+    )
+
+
+def count_reasons(quarantine):
+    """
+    Number of quarantined frames per reason code.
+
+    Parameters
+    ----------
+    quarantine : pl.DataFrame
+        Quarantine returned by split_valid_frames().
+
+    Returns
+    -------
+    dict
+        Reason code to frames, a frame with two reasons counts for both.
+    """
+    counts = (
+        quarantine.select(pl.col(REASONS_COLUMN).str.split(REASON_SEPARATOR).explode())
+        .to_series()
+        .value_counts(sort=True)
+    )
+    return dict(counts.iter_rows())
+
+
+def save_quarantine(quarantine, df_out_path, append=False):
+    """
+    Write the quarantined frames of a dataset and report them.
+
+    Parameters
+    ----------
+    quarantine : pl.DataFrame
+        Quarantine returned by split_valid_frames().
+    df_out_path : str
+        Path of the processed CSV file the valid frames are written to.
+    append : bool
+        Add the frames to the quarantine csv of earlier runs, for a segment appended to the
+        dataset, instead of replacing it.
+
+    Returns
+    -------
+    str or None
+        Path of the quarantine csv, None if no frame was quarantined. Without append, a
+        quarantine csv of an earlier run is removed then.
+    """
+    quarantine_path = get_quarantine_path(df_out_path)
+    if quarantine.height == 0:
+        if not append and os.path.isfile(quarantine_path):
+            os.remove(quarantine_path)
+        return None
+    os.makedirs(os.path.dirname(quarantine_path), exist_ok=True)
+    if append and os.path.isfile(quarantine_path):
+        with open(quarantine_path, "ab") as file:
+            quarantine.write_csv(file, include_header=False)
+    else:
+        quarantine.write_csv(quarantine_path)
+    print(
+        f"Quarantined {quarantine.height} frames {count_reasons(quarantine)} "
+        f"to {quarantine_path}"
+    )
+    return quarantine_path
+
+
+if __name__ == "__main__":
+    from load_data_with_polars import (
+        ATTACK_FREE_COLUMN_NAMES,
+        DOS_AND_FUZZY_COLUMN_NAMES,
+    )
+
+    parser = argparse.ArgumentParser(description="Validate a raw capture.")
+    parser.add_argument("input", help="Raw capture, csv (DoS / Fuzzy) or txt.")
+    args = parser.parse_args()
+    is_txt = args.input.lower().endswith(".txt")
+    valid, quarantine = validate_capture(
+        args.input,
+        "txt" if is_txt else "csv",
+        ATTACK_FREE_COLUMN_NAMES if is_txt else DOS_AND_FUZZY_COLUMN_NAMES,
+    )
+    print(f"{valid.height} valid frames, {quarantine.height} quarantined")
+    if quarantine.height:
+        print(count_reasons(quarantine))
+        print(quarantine.head(10))
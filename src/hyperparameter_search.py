@@ -0,0 +1,370 @@
+"""
+Workflow of the hyperparameter search
+1. the training matrix is prepared once and cached in the cache folder
+    1. features are built with prepare_feature_frame(), the same steps the detectors use
+    2. attack_type is 1 for injected DoS frames, 2 for injected Fuzzy frames, 0 otherwise
+    3. the cache is keyed on the size and mtime of the processed datasets and the feature
+        columns, the key is written to cache_key.json and a changed key rebuilds the matrix
+2. a stratified order of the rows is cached once, keyed on a hash of the labels
+    1. every prefix of the order keeps the class proportions, so a subset of n rows is
+        simply the first n rows of the order
+    2. fold ids are assigned round-robin along the order, so the folds of every prefix are
+        stratified too and every candidate reuses the same splits
+3. successive halving
+    1. every candidate is cross-validated on the smallest subset
+    2. the best 1 / factor candidates are promoted to a subset factor times larger
+    3. this repeats until one candidate is left or the subset is the whole matrix
+"""
+
+import hashlib
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+import polars as pl
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+from model_artifact import save_model_artifact
+from online_detector import FEATURE_COLUMNS, prepare_feature_frame
+from utils import (
+    load_data_paths,
+    parse_execution_profile_argument,
+    read_processed_csv,
+    select_execution_profile,
+)
+
+# ──────────────────────────────────────────────────────────────
+# 🛠️ Configuration Constants
+# ──────────────────────────────────────────────────────────────
+CACHE_DIR = "cache/search"
+LABEL_COLUMN = "attack_type"
+N_SPLITS = 5
+MIN_RESOURCES = 20000
+FACTOR = 3
+RANDOM_STATE = 42
+SEARCH_SPACES = {
+    "Decision Tree": (
+        DecisionTreeClassifier,
+        {"max_depth": [4, 8, 16, None], "min_samples_leaf": [1, 5, 20]},
+    ),
+    "Random Forest": (
+        RandomForestClassifier,
+        {"n_estimators": [20, 50], "max_depth": [8, 16, None], "n_jobs": [-1]},
+    ),
+    "KNN": (
+        KNeighborsClassifier,
+        {"n_neighbors": [3, 5, 9], "algorithm": ["kd_tree"]},
+    ),
+}
+# ──────────────────────────────────────────────────────────────
+
+
+def build_training_frame(dfs_dict):
+    """
+    Build the labelled feature frame from the processed datasets.
+
+    Parameters
+    ----------
+    dfs_dict : dict
+        Processed polars DataFrames keyed as 'dos_df', 'fuzzy_df' and 'attack_free_df'.
+
+    Returns
+    -------
+    pl.DataFrame
+        FEATURE_COLUMNS plus the attack_type label column.
+    """
+    attack_labels = {"dos_df": 1, "fuzzy_df": 2, "attack_free_df": 0}
+    frames = []
+    for key, attack_label in attack_labels.items():
+        df = dfs_dict[key]
+        if "updated_flag" in df.columns:
+            label = (df["updated_flag"] == "T").cast(pl.Int64) * attack_label
+        else:
+            label = pl.zeros(df.height, dtype=pl.Int64, eager=True)
+        frames.append(prepare_feature_frame(df).with_columns(label.alias(LABEL_COLUMN)))
+    return pl.concat(frames)
+
+
+def make_source_key(data_paths):
+    """
+    Build the cache key of the training matrix from the processed datasets.
+
+    Parameters
+    ----------
+    data_paths : dict
+        Paths of the processed datasets keyed by dataset name.
+
+    Returns
+    -------
+    dict
+        Size and mtime of every dataset and the feature columns.
+    """
+    sources = {}
+    for key, path in sorted(data_paths.items()):
+        stat = os.stat(path)
+        sources[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    return {"sources": sources, "feature_columns": FEATURE_COLUMNS}
+
+
+def load_training_matrix(cache_dir=CACHE_DIR):
+    """
+    Load the cached training matrix, preparing and caching it when the datasets changed.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Folder of the cache.
+
+    Returns
+    -------
+    tuple of np.ndarray
+        (X, y), memory-mapped from the cache.
+    """
+    X_path = os.path.join(cache_dir, "X.npy")
+    y_path = os.path.join(cache_dir, "y.npy")
+    key_path = os.path.join(cache_dir, "cache_key.json")
+    output_data_paths = load_data_paths("out_paths")
+    source_key = make_source_key(output_data_paths)
+
+    cached_key = None
+    if os.path.isfile(X_path) and os.path.isfile(y_path) and os.path.isfile(key_path):
+        with open(key_path, "r") as file:
+            cached_key = json.load(file)
+    if cached_key != source_key:
+        print("Preparing training matrix!")
+        dfs_dict = {
+            key: read_processed_csv(path) for key, path in output_data_paths.items()
+        }
+        df = build_training_frame(dfs_dict)
+        os.makedirs(cache_dir, exist_ok=True)
+        np.save(X_path, df.select(FEATURE_COLUMNS).to_numpy())
+        np.save(y_path, df[LABEL_COLUMN].to_numpy())
+        # The key is written last, an interrupted run leaves a stale key and is redone.
+        with open(key_path, "w") as file:
+            json.dump(source_key, file, indent=2)
+    return np.load(X_path, mmap_mode="r"), np.load(y_path, mmap_mode="r")
+
+
+def make_stratified_order(y, random_state=RANDOM_STATE):
+    """
+    Order the rows so that every prefix of the order is a stratified sample.
+
+    Each class is shuffled and its rows are spread evenly over [0, 1), then all rows are
+    sorted by that position.
+
+    Parameters
+    ----------
+    y : np.ndarray
+        Labels.
+    random_state : int
+        Seed of the shuffle.
+
+    Returns
+    -------
+    np.ndarray
+        Row indices in stratified order.
+    """
+    rng = np.random.default_rng(random_state)
+    positions = np.empty(len(y), dtype=np.float64)
+    for label in np.unique(y):
+        label_index = np.flatnonzero(y == label)
+        rng.shuffle(label_index)
+        positions[label_index] = (np.arange(len(label_index)) + 0.5) / len(label_index)
+    return np.argsort(positions, kind="stable")
+
+
+def load_split_cache(y, cache_dir=CACHE_DIR, n_splits=N_SPLITS):
+    """
+    Load the cached stratified order and fold ids, computing them when the labels changed.
+
+    Parameters
+    ----------
+    y : np.ndarray
+        Labels of the cached training matrix.
+    cache_dir : str
+        Folder of the cache.
+    n_splits : int
+        Number of folds.
+
+    Returns
+    -------
+    tuple of np.ndarray
+        (order, fold_ids), fold_ids[i] is the fold of row order[i].
+    """
+    split_path = os.path.join(cache_dir, f"splits_{n_splits}.npz")
+    y = np.ascontiguousarray(y)
+    labels_key = f"{RANDOM_STATE}:{hashlib.sha256(y.tobytes()).hexdigest()}"
+    if os.path.isfile(split_path):
+        with np.load(split_path) as splits:
+            if "labels_key" in splits.files and str(splits["labels_key"]) == labels_key:
+                return splits["order"], splits["fold_ids"]
+
+    order = make_stratified_order(y)
+    fold_ids = np.arange(len(order)) % n_splits
+    os.makedirs(cache_dir, exist_ok=True)
+    np.savez(
+        split_path,
+        order=order,
+        fold_ids=fold_ids,
+        labels_key=np.array(labels_key),
+    )
+    return order, fold_ids
+
+
+def expand_search_space(search_spaces=SEARCH_SPACES):
+    """
+    Expand the search spaces into one candidate per parameter combination.
+
+    Parameters
+    ----------
+    search_spaces : dict
+        Model name mapped to (estimator class, parameter grid).
+
+    Returns
+    -------
+    list of dict
+        Candidates with 'model_name', 'params' and 'estimator' keys.
+    """
+    candidates = []
+    for model_name, (estimator_class, grid) in search_spaces.items():
+        keys = list(grid)
+        for values in itertools.product(*(grid[key] for key in keys)):
+            params = dict(zip(keys, values))
+            candidates.append(
+                {
+                    "model_name": model_name,
+                    "params": params,
+                    "estimator": estimator_class(**params),
+                }
+            )
+    return candidates
+
+
+def cross_validate_on_prefix(estimator, X, y, order, fold_ids, n_samples):
+    """
+    Cross-validate an estimator on the first n_samples rows of the stratified order.
+
+    Parameters
+    ----------
+    estimator : object
+        Unfitted estimator.
+    X : np.ndarray
+        Features.
+    y : np.ndarray
+        Labels.
+    order : np.ndarray
+        Cached stratified order.
+    fold_ids : np.ndarray
+        Cached fold id of each position of the order.
+    n_samples : int
+        Size of the subset.
+
+    Returns
+    -------
+    float
+        Mean validation accuracy over the folds.
+    """
+    subset = np.sort(order[:n_samples])
+    subset_folds = fold_ids[:n_samples][np.argsort(order[:n_samples])]
+    X_subset, y_subset = X[subset], y[subset]
+
+    scores = []
+    for fold in np.unique(subset_folds):
+        train_mask = subset_folds != fold
+        model = clone(estimator).fit(X_subset[train_mask], y_subset[train_mask])
+        val_predictions = model.predict(X_subset[~train_mask])
+        scores.append(accuracy_score(y_subset[~train_mask], val_predictions))
+    return float(np.mean(scores))
+
+
+def successive_halving(
+    candidates,
+    X,
+    y,
+    order,
+    fold_ids,
+    min_resources=MIN_RESOURCES,
+    factor=FACTOR,
+):
+    """
+    Run successive halving over the candidates with the cached subsets and folds.
+
+    Parameters
+    ----------
+    candidates : list of dict
+        Candidates returned by expand_search_space().
+    X : np.ndarray
+        Features.
+    y : np.ndarray
+        Labels.
+    order : np.ndarray
+        Cached stratified order.
+    fold_ids : np.ndarray
+        Cached fold id of each position of the order.
+    min_resources : int
+        Number of rows used in the first rung.
+    factor : int
+        Candidates kept per rung are divided, and rows multiplied, by this factor.
+
+    Returns
+    -------
+    tuple
+        (results, best_candidate), results is a pl.DataFrame with one row per evaluation.
+    """
+    n_samples = min(min_resources, len(order))
+    results = []
+    rung = 0
+    while True:
+        print(f"Rung {rung}: {len(candidates)} candidates on {n_samples} rows")
+        for candidate in candidates:
+            start = time.perf_counter()
+            candidate["score"] = cross_validate_on_prefix(
+                candidate["estimator"], X, y, order, fold_ids, n_samples
+            )
+            results.append(
+                {
+                    "rung": rung,
+                    "n_samples": n_samples,
+                    "model_name": candidate["model_name"],
+                    "params": str(candidate["params"]),
+                    "accuracy": candidate["score"],
+                    "seconds": time.perf_counter() - start,
+                }
+            )
+
+        candidates = sorted(candidates, key=lambda c: c["score"], reverse=True)
+        if len(candidates) == 1 or n_samples == len(order):
+            break
+        candidates = candidates[: max(1, len(candidates) // factor)]
+        n_samples = min(n_samples * factor, len(order))
+        rung += 1
+
+    return pl.DataFrame(results), candidates[0]
+
+
+if __name__ == "__main__":
+    profile = select_execution_profile(parse_execution_profile_argument())
+    X, y = load_training_matrix()
+    order, fold_ids = load_split_cache(y)
+
+    candidates = expand_search_space()
+    if profile["workers"]:
+        for candidate in candidates:
+            if "n_jobs" in candidate["params"]:
+                candidate["params"]["n_jobs"] = profile["workers"]
+                candidate["estimator"].set_params(n_jobs=profile["workers"])
+
+    print("Searching hyperparameters!")
+    results, best_candidate = successive_halving(candidates, X, y, order, fold_ids)
+    print(results.sort("accuracy", descending=True).head(10))
+    print(f"Best: {best_candidate['model_name']} {best_candidate['params']}")
+
+    print("Refitting best candidate on the whole matrix!")
+    best_model = clone(best_candidate["estimator"]).fit(X, y)
+    save_model_artifact(best_model, "models/best_search_model", FEATURE_COLUMNS)
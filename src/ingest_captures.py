@@ -0,0 +1,456 @@
+"""
+Workflow of capture ingestion
+1. the inputs (directories, searched recursively, globs or files) are expanded to capture
+    files, files inside the output folder are ignored
+2. the format of every capture is detected from its first lines, not from its extension
+    1. 'txt': candump style lines ('Timestamp: ... ID: ... DLC: ...'), processed with
+        process_txt()
+    2. 'csv': comma separated frames ending with the R / T flag (DoS / Fuzzy style), processed
+        with process_csv()
+    3. files matching neither are recorded as failed
+3. every capture is a job of a persistent queue (a json file in the output folder)
+    1. a job is keyed on its input path and remembers the input's size and mtime, its output
+        path, status, frames, seconds and error
+    2. jobs that are done, whose input did not change and whose output still exists are
+        skipped, everything else (new, changed, failed, interrupted while running) is queued
+    3. the output name comes from the capture's path below its input folder, a capture keeps
+        the output of its first run when it is found through another input later
+    4. the queue file is replaced atomically after every status change, so a killed run
+        resumes where it stopped
+4. queued jobs run in a pool of worker processes, at most JOBS_IN_FLIGHT_PER_WORKER jobs per
+    worker are submitted at once. The cores are split between the workers: each worker's
+    polars thread pool gets threads // workers threads
+5. a line with frames and throughput is printed for every finished job and a summary at the end
+
+Usage
+    python src/ingest_captures.py "captures/2024-*/**/*.csv" captures/candump --output output/captures
+"""
+
+import argparse
+import glob
+import json
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from load_data_with_polars import (
+    ATTACK_FREE_COLUMN_NAMES,
+    DOS_AND_FUZZY_COLUMN_NAMES,
+    EXISTING_DLC_COLUMN_NAME,
+    EXISTING_FLAG_COLUMN_NAME,
+    NEW_FLAG_COLUMN_NAME,
+    parse_attack_free_line,
+    process_csv,
+    process_txt,
+)
+from utils import (
+    add_execution_profile_argument,
+    file_fingerprint,
+    select_execution_profile,
+)
+
+# ──────────────────────────────────────────────────────────────
+# 🛠️ Configuration Constants
+# ──────────────────────────────────────────────────────────────
+CAPTURE_EXTENSIONS = (".csv", ".txt", ".log")
+QUEUE_FILE_NAME = "ingest_queue.json"
+QUEUE_VERSION = 1
+SNIFF_LINES = 5
+FLAG_VALUES = ("R", "T")
+JOBS_IN_FLIGHT_PER_WORKER = 2
+GLOB_CHARACTERS = "*?["
+# ──────────────────────────────────────────────────────────────
+
+
+def detect_capture_format(input_path):
+    """
+    Detect the format of a raw capture from its first lines.
+
+    Parameters
+    ----------
+    input_path : str
+        Path to the raw capture.
+
+    Returns
+    -------
+    str or None
+        'txt' for candump style text, 'csv' for comma separated frames with a R / T flag, None
+        if the first SNIFF_LINES non-empty lines match neither.
+    """
+    lines = []
+    with open(input_path, "r", errors="replace") as file:
+        for line in file:
+            if line.strip():
+                lines.append(line.strip())
+            if len(lines) == SNIFF_LINES:
+                break
+    if not lines:
+        return None
+    if all(parse_attack_free_line(line) is not None for line in lines):
+        return "txt"
+
+    def is_flagged_frame(line):
+        fields = line.split(",")
+        if len(fields) < 4 or fields[-1] not in FLAG_VALUES:
+            return False
+        try:
+            float(fields[0])
+            int(fields[1], 16)
+            int(fields[2])
+        except ValueError:
+            return False
+        return True
+
+    if all(is_flagged_frame(line) for line in lines):
+        return "csv"
+    return None
+
+
+def _input_root(input_spec):
+    # Folder output names are made relative to: the directory itself, or a glob's static part.
+    if os.path.isdir(input_spec):
+        return input_spec
+    for i, character in enumerate(input_spec):
+        if character in GLOB_CHARACTERS:
+            return os.path.dirname(input_spec[:i]) or "."
+    return os.path.dirname(input_spec) or "."
+
+
+def discover_captures(input_specs, output_dir):
+    """
+    Expand directories, globs and files to capture files.
+
+    Parameters
+    ----------
+    input_specs : list of str
+        Directories (searched recursively for CAPTURE_EXTENSIONS), glob patterns ('**'
+        matches any folder depth) or files.
+    output_dir : str
+        Output folder, files inside it are never inputs.
+
+    Returns
+    -------
+    dict
+        Absolute capture path to the folder its output name is relative to, sorted by path.
+    """
+    output_dir = os.path.abspath(output_dir)
+    captures = {}
+    for input_spec in input_specs:
+        root = os.path.abspath(_input_root(input_spec))
+        if os.path.isdir(input_spec):
+            paths = []
+            for folder, _, file_names in os.walk(input_spec):
+                paths += [
+                    os.path.join(folder, file_name)
+                    for file_name in file_names
+                    if file_name.lower().endswith(CAPTURE_EXTENSIONS)
+                ]
+        else:
+            paths = glob.glob(input_spec, recursive=True)
+        for path in paths:
+            path = os.path.abspath(path)
+            hidden = os.path.basename(path).startswith(".")
+            in_output = os.path.commonpath([path, output_dir]) == output_dir
+            if os.path.isfile(path) and not hidden and not in_output:
+                captures.setdefault(path, root)
+    return dict(sorted(captures.items()))
+
+
+def output_path_for(input_path, root, output_dir):
+    """
+    Output path of a capture, built from its path relative to its input folder.
+
+    Parameters
+    ----------
+    input_path : str
+        Absolute path to the raw capture.
+    root : str
+        Folder of the input the capture was found in.
+    output_dir : str
+        Output folder.
+
+    Returns
+    -------
+    str
+        e.g. output_dir/vehicle_a__dos_dataset_df.csv for root/vehicle_a/dos_dataset.csv.
+    """
+    relative = os.path.splitext(os.path.relpath(input_path, root))[0]
+    name = relative.replace(os.sep, "__")
+    return os.path.join(output_dir, f"{name}_df.csv")
+
+
+class JobQueue:
+    """
+    Persistent queue of capture jobs, stored as json.
+
+    Parameters
+    ----------
+    queue_path : str
+        Path of the queue file, created on the first save.
+    """
+
+    def __init__(self, queue_path):
+        self.queue_path = queue_path
+        self.jobs = {}
+        if os.path.isfile(queue_path):
+            with open(queue_path, "r") as file:
+                state = json.load(file)
+            if state.get("version") == QUEUE_VERSION:
+                self.jobs = state["jobs"]
+
+    def save(self):
+        """
+        Write the queue to a temporary file and move it over the queue file.
+        """
+        os.makedirs(os.path.dirname(self.queue_path) or ".", exist_ok=True)
+        temp_path = f"{self.queue_path}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump({"version": QUEUE_VERSION, "jobs": self.jobs}, file, indent=2)
+        os.replace(temp_path, self.queue_path)
+
+    def enqueue(self, captures, output_dir):
+        """
+        Queue the captures that are not done yet.
+
+        Parameters
+        ----------
+        captures : dict
+            Capture path to its input folder, see discover_captures().
+        output_dir : str
+            Output folder.
+
+        Returns
+        -------
+        tuple of list
+            (queued input paths, skipped input paths).
+
+        Raises
+        ------
+        ValueError
+            If two captures would be written to the same output path.
+        """
+        # A capture keeps the output path of its first run, whatever input found it.
+        outputs = {job["output_path"]: path for path, job in self.jobs.items()}
+        queued, skipped = [], []
+        for input_path, root in captures.items():
+            job = self.jobs.get(input_path)
+            if job is not None:
+                output_path = job["output_path"]
+            else:
+                output_path = output_path_for(input_path, root, output_dir)
+            if outputs.get(output_path, input_path) != input_path:
+                raise ValueError(
+                    f"{input_path} and {outputs[output_path]} would both be written to "
+                    f"{output_path}, rename one of them."
+                )
+            outputs[output_path] = input_path
+
+            fingerprint = file_fingerprint(input_path)
+            if (
+                job is not None
+                and job["status"] == "done"
+                and job["fingerprint"] == fingerprint
+                and os.path.isfile(output_path)
+            ):
+                skipped.append(input_path)
+                continue
+            self.jobs[input_path] = {
+                "output_path": output_path,
+                "fingerprint": fingerprint,
+                "format": None,
+                "status": "queued",
+                "frames": None,
+                "seconds": None,
+                "error": None,
+            }
+            queued.append(input_path)
+        self.save()
+        return queued, skipped
+
+    def update(self, input_path, **fields):
+        """
+        Change fields of a job and save the queue.
+
+        Parameters
+        ----------
+        input_path : str
+            Input path of the job.
+        **fields
+            Job fields, e.g. status='done', frames=1000.
+        """
+        self.jobs[input_path].update(fields)
+        self.save()
+
+
+def process_capture(input_path, output_path):
+    """
+    Detect the format of a capture and process it into a processed CSV file.
+
+    Parameters
+    ----------
+    input_path : str
+        Path to the raw capture.
+    output_path : str
+        Path of the processed CSV file, replaced if it exists.
+
+    Returns
+    -------
+    dict
+        format, frames and seconds.
+
+    Raises
+    ------
+    ValueError
+        If the format cannot be detected.
+    """
+    start = time.perf_counter()
+    capture_format = detect_capture_format(input_path)
+    if capture_format is None:
+        raise ValueError(
+            "Unknown capture format, expected candump text or flagged csv."
+        )
+    # The input changed since the last run, process_csv() / process_txt() keep existing files.
+    if os.path.isfile(output_path):
+        os.remove(output_path)
+    name = os.path.basename(input_path)
+    if capture_format == "csv":
+        df = process_csv(
+            name,
+            input_path,
+            DOS_AND_FUZZY_COLUMN_NAMES,
+            output_path,
+            EXISTING_DLC_COLUMN_NAME,
+            EXISTING_FLAG_COLUMN_NAME,
+            NEW_FLAG_COLUMN_NAME,
+        )
+    else:
+        df = process_txt(name, output_path, ATTACK_FREE_COLUMN_NAMES, input_path)
+    return {
+        "format": capture_format,
+        "frames": df.height,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def ingest_captures(input_specs, output_dir, n_workers=None, threads=None):
+    """
+    Process every capture of the inputs that is not done yet in a pool of worker processes.
+
+    Parameters
+    ----------
+    input_specs : list of str
+        Directories, glob patterns or files, see discover_captures().
+    output_dir : str
+        Folder of the processed CSV files and the queue file.
+    n_workers : int, optional
+        Number of worker processes, by default the number of CPUs.
+    threads : int, optional
+        Threads shared by the workers' polars thread pools, by default the number of CPUs.
+
+    Returns
+    -------
+    dict
+        Counts of done, failed and skipped captures, frames, seconds and frames_per_second.
+    """
+    start = time.perf_counter()
+    n_workers = n_workers or os.cpu_count()
+    threads = threads or os.cpu_count()
+    queue = JobQueue(os.path.join(output_dir, QUEUE_FILE_NAME))
+    queued, skipped = queue.enqueue(
+        discover_captures(input_specs, output_dir), output_dir
+    )
+    print(f"{len(queued)} captures queued, {len(skipped)} already done.")
+
+    summary = {"done": 0, "failed": 0, "skipped": len(skipped), "frames": 0}
+    if queued:
+        # Workers are spawned, so they import polars with the environment set here.
+        worker_threads = str(max(1, threads // n_workers))
+        parent_threads = os.environ.get("POLARS_MAX_THREADS")
+        os.environ["POLARS_MAX_THREADS"] = worker_threads
+        try:
+            with ProcessPoolExecutor(
+                max_workers=n_workers, mp_context=mp.get_context("spawn")
+            ) as executor:
+                _run_jobs(executor, queue, queued, n_workers, summary)
+        finally:
+            if parent_threads is None:
+                os.environ.pop("POLARS_MAX_THREADS")
+            else:
+                os.environ["POLARS_MAX_THREADS"] = parent_threads
+
+    summary["seconds"] = time.perf_counter() - start
+    summary["frames_per_second"] = (
+        summary["frames"] / summary["seconds"] if summary["seconds"] else None
+    )
+    return summary
+
+
+def _run_jobs(executor, queue, queued, n_workers, summary):
+    pending = list(reversed(queued))
+    in_flight = {}
+    n_finished = 0
+    while pending or in_flight:
+        while pending and len(in_flight) < n_workers * JOBS_IN_FLIGHT_PER_WORKER:
+            input_path = pending.pop()
+            output_path = queue.jobs[input_path]["output_path"]
+            future = executor.submit(process_capture, input_path, output_path)
+            in_flight[future] = input_path
+            queue.update(input_path, status="running")
+
+        finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in finished:
+            input_path = in_flight.pop(future)
+            n_finished += 1
+            progress = f"[{n_finished}/{len(queued)}]"
+            try:
+                result = future.result()
+            except Exception as error:
+                queue.update(input_path, status="failed", error=str(error))
+                summary["failed"] += 1
+                print(f"{progress} failed {input_path}: {error}")
+                continue
+            queue.update(input_path, status="done", error=None, **result)
+            summary["done"] += 1
+            summary["frames"] += result["frames"]
+            print(
+                f"{progress} done {input_path} ({result['format']}): "
+                f"{result['frames']} frames in {result['seconds']:.2f} s, "
+                f"{result['frames'] / max(result['seconds'], 1e-9):,.0f} frames/s"
+            )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Process any number of raw captures with a pool of worker processes."
+    )
+    parser.add_argument(
+        "inputs", nargs="+", help="Capture directories, glob patterns or files."
+    )
+    parser.add_argument(
+        "--output", required=True, help="Folder of the processed captures."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes, by default the execution profile's workers.",
+    )
+    add_execution_profile_argument(parser)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    profile = select_execution_profile(args.execution_profile)
+    summary = ingest_captures(
+        args.inputs,
+        args.output,
+        n_workers=args.workers or profile["workers"],
+        threads=profile["threads"],
+    )
+    print(
+        f"{summary['done']} done, {summary['failed']} failed, {summary['skipped']} skipped: "
+        f"{summary['frames']} frames in {summary['seconds']:.2f} s "
+        f"({summary['frames_per_second'] or 0:,.0f} frames/s)"
+    )
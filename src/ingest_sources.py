@@ -0,0 +1,436 @@
+"""
+Workflow of asyncio ingestion
+1. every source runs as a coroutine in one event loop, there is no thread per source
+    1. tcp / unix socket servers: each connection sends candump style lines in the
+        attack_free.txt format (a stand-in for a bus gateway)
+    2. file tail: a growing candump style log file is followed like `tail -f`
+2. lines are parsed incrementally with parse_attack_free_line(), the same logic as
+    convert_attack_free_txt_to_list(), partial lines wait for their newline
+    1. row_to_frame() validates the fields, lines that can't be parsed or hold an invalid
+        frame (bad timestamp, DLC or hex field, ID outside the 11-bit space) are counted as
+        skipped lines and never reach the detector
+3. each source collects frames into batches of BATCH_SIZE (or whatever arrived within
+    BATCH_TIMEOUT_S) and puts them into one bounded asyncio.Queue
+    1. when the queue is full the source awaits, so socket reads stop and TCP flow control
+        pushes back on the sender (backpressure)
+4. the detector coroutine takes batches from the queue and pushes their frames to the detector
+    of their source
+    1. every source gets its own detector (detector.clone()), so frames of two buses with the
+        same ID never share a ring buffer
+    2. a frame the detector rejects is counted as skipped, the loop keeps running
+    3. when a socket connection closes, a SourceClosed marker follows its last batch, the
+        detector then predicts the source's pending frames and drops its detector and stats,
+        so reconnecting gateways don't pile up detectors
+
+Usage
+    python src/ingest_sources.py --model models/dos_model --tcp 127.0.0.1:29536 --tail input/live.txt
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import time
+
+from load_data_with_polars import parse_attack_free_line
+from online_detector import BYTE_COLUMNS, CAN_ID_SPACE, MAX_DLC, OnlineDetector
+from utils import add_execution_profile_argument, select_execution_profile
+
+# ──────────────────────────────────────────────────────────────
+# 🛠️ Configuration Constants
+# ──────────────────────────────────────────────────────────────
+BATCH_SIZE = 256
+BATCH_TIMEOUT_S = 0.005
+QUEUE_MAX_BATCHES = 64
+TAIL_POLL_INTERVAL_S = 0.05
+# ──────────────────────────────────────────────────────────────
+
+
+def row_to_frame(row, source_name):
+    """
+    Convert a parsed line into a frame with the loader columns as keys.
+
+    Parameters
+    ----------
+    row : list of str
+        Row returned by parse_attack_free_line().
+    source_name : str
+        Name of the source the frame came from.
+
+    Returns
+    -------
+    dict
+        Frame with timestamp, can_id, frame_type, dlc, byte_0 ... byte_7 and source keys.
+
+    Raises
+    ------
+    ValueError
+        If a field is invalid or the CAN ID is not an 11-bit identifier.
+    """
+    timestamp, can_id, frame_type, dlc = row[:4]
+    dlc = int(dlc)
+    if not 0 <= dlc <= MAX_DLC:
+        raise ValueError(f"Invalid DLC {dlc}.")
+    if not 0 <= int(can_id, 16) < CAN_ID_SPACE:
+        raise ValueError(f"CAN ID {can_id} is not an 11-bit identifier.")
+    frame = {
+        "timestamp": float(timestamp),
+        "can_id": can_id,
+        "frame_type": frame_type,
+        "dlc": dlc,
+        "source": source_name,
+    }
+    payload = row[4:]
+    for i, byte_column in enumerate(BYTE_COLUMNS):
+        value = payload[i] if i < len(payload) else None
+        if value is not None and not 0 <= int(value, 16) <= 0xFF:
+            raise ValueError(f"Invalid payload byte {value}.")
+        frame[byte_column] = value
+    return frame
+
+
+class FrameBatcher:
+    """
+    Collects parsed frames of one source and puts full batches into the shared queue.
+
+    Parameters
+    ----------
+    queue : asyncio.Queue
+        Bounded queue shared by all sources.
+    source_name : str
+        Name of the source.
+    batch_size : int
+        Number of frames per batch.
+    """
+
+    def __init__(self, queue, source_name, batch_size=BATCH_SIZE):
+        self.queue = queue
+        self.source_name = source_name
+        self.batch_size = batch_size
+        self.batch = []
+        self.frames = 0
+        self.skipped_lines = 0
+
+    async def add_line(self, line):
+        """
+        Parse a line and add its frame to the batch, waiting if the queue is full.
+
+        Parameters
+        ----------
+        line : str
+            One line of text, without the newline.
+        """
+        row = parse_attack_free_line(line)
+        if row is None:
+            if line.strip():
+                self.skipped_lines += 1
+            return
+        try:
+            frame = row_to_frame(row, self.source_name)
+        except ValueError:
+            self.skipped_lines += 1
+            return
+        self.batch.append(frame)
+        self.frames += 1
+        if len(self.batch) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        """Put the collected frames into the queue, waiting if the queue is full."""
+        if self.batch:
+            batch, self.batch = self.batch, []
+            await self.queue.put(batch)
+
+
+class SourceClosed:
+    """
+    Queue item put after the last batch of a source that closed.
+
+    Parameters
+    ----------
+    source_name : str
+        Name of the source.
+    """
+
+    def __init__(self, source_name):
+        self.source_name = source_name
+
+
+async def read_lines(reader, batcher):
+    """
+    Read lines from a stream until it closes, flushing partial batches on timeout.
+
+    Parameters
+    ----------
+    reader : asyncio.StreamReader
+        Stream of candump style lines.
+    batcher : FrameBatcher
+        Batcher of the source.
+    """
+    while True:
+        # Only wait with a timeout when a partial batch is waiting to be flushed.
+        timeout = BATCH_TIMEOUT_S if batcher.batch else None
+        try:
+            line = await asyncio.wait_for(reader.readline(), timeout=timeout)
+        except asyncio.TimeoutError:
+            await batcher.flush()
+            continue
+        if not line:
+            break
+        await batcher.add_line(line.decode("ascii", errors="replace"))
+    await batcher.flush()
+
+
+async def serve_socket(
+    queue, stats, host=None, port=None, unix_path=None, batch_size=BATCH_SIZE
+):
+    """
+    Accept connections on a TCP or unix socket and ingest their lines.
+
+    Parameters
+    ----------
+    queue : asyncio.Queue
+        Bounded queue shared by all sources.
+    stats : dict
+        Batchers of every source, keyed by source name.
+    host : str, optional
+        TCP host.
+    port : int, optional
+        TCP port.
+    unix_path : str, optional
+        Path of the unix socket, used instead of host and port.
+    batch_size : int
+        Number of lines per batch.
+    """
+
+    connections = itertools.count()
+
+    async def handle_connection(reader, writer):
+        # Unix socket peers have no name, the connection number keeps their sources apart.
+        peer = writer.get_extra_info("peername") or f"{unix_path}#{next(connections)}"
+        source_name = f"socket:{peer}"
+        batcher = FrameBatcher(queue, source_name, batch_size)
+        stats[source_name] = batcher
+        try:
+            await read_lines(reader, batcher)
+        finally:
+            writer.close()
+            # Queued after the source's last batch, run_detector() then forgets the source.
+            await batcher.flush()
+            await queue.put(SourceClosed(source_name))
+
+    if unix_path:
+        server = await asyncio.start_unix_server(handle_connection, path=unix_path)
+    else:
+        server = await asyncio.start_server(handle_connection, host=host, port=port)
+    async with server:
+        await server.serve_forever()
+
+
+async def tail_file(queue, stats, path, from_start=False, batch_size=BATCH_SIZE):
+    """
+    Follow a growing candump style log file and ingest new lines.
+
+    Parameters
+    ----------
+    queue : asyncio.Queue
+        Bounded queue shared by all sources.
+    stats : dict
+        Batchers of every source, keyed by source name.
+    path : str
+        Path of the log file.
+    from_start : bool
+        Ingest the lines already in the file instead of only new ones.
+    batch_size : int
+        Number of lines per batch.
+    """
+    source_name = f"file:{path}"
+    batcher = FrameBatcher(queue, source_name, batch_size)
+    stats[source_name] = batcher
+    partial_line = ""
+    with open(path, "r") as file:
+        if not from_start:
+            file.seek(0, os.SEEK_END)
+        while True:
+            chunk = file.read(1 << 16)
+            if not chunk:
+                await batcher.flush()
+                await asyncio.sleep(TAIL_POLL_INTERVAL_S)
+                continue
+            lines = (partial_line + chunk).split("\n")
+            partial_line = lines.pop()
+            for line in lines:
+                await batcher.add_line(line)
+
+
+async def run_detector(queue, detector, stats, on_results=None):
+    """
+    Take batches from the queue and push their frames to the detector of their source.
+
+    Parameters
+    ----------
+    queue : asyncio.Queue
+        Bounded queue shared by all sources.
+    detector : OnlineDetector
+        Template detector, every source gets a clone with its own per-ID state.
+    stats : dict
+        Batchers of every source, keyed by source name.
+    on_results : callable, optional
+        Called with the (frame, prediction) pairs of each predicted micro-batch.
+    """
+    source_detectors = {}
+    while True:
+        batch = await queue.get()
+        results = []
+        if isinstance(batch, SourceClosed):
+            source_detector = source_detectors.pop(batch.source_name, None)
+            if source_detector is not None:
+                results.extend(source_detector.flush())
+            stats.pop(batch.source_name, None)
+            batch = []
+        for frame in batch:
+            source_name = frame["source"]
+            if source_name not in source_detectors:
+                source_detectors[source_name] = detector.clone()
+            try:
+                results.extend(source_detectors[source_name].push(frame))
+            except ValueError as error:
+                stats[source_name].skipped_lines += 1
+                print(f"{source_name}: skipped frame, {error}")
+        if queue.empty():
+            for source_detector in source_detectors.values():
+                results.extend(source_detector.flush())
+        if results and on_results is not None:
+            on_results(results)
+        queue.task_done()
+
+
+async def report_progress(queue, stats, interval_s=10.0):
+    """
+    Print frames/sec per source and the queue depth every interval.
+
+    Parameters
+    ----------
+    queue : asyncio.Queue
+        Bounded queue shared by all sources.
+    stats : dict
+        Batchers of every source, keyed by source name.
+    interval_s : float
+        Seconds between reports.
+    """
+    previous = {}
+    previous_time = time.perf_counter()
+    while True:
+        await asyncio.sleep(interval_s)
+        now = time.perf_counter()
+        frames = {}
+        for source_name, batcher in list(stats.items()):
+            rate = (batcher.frames - previous.get(source_name, 0)) / (
+                now - previous_time
+            )
+            frames[source_name] = batcher.frames
+            print(
+                f"{source_name}: {batcher.frames} frames ({rate:.0f}/s), "
+                f"{batcher.skipped_lines} skipped lines"
+            )
+        print(f"queue depth: {queue.qsize()}/{queue.maxsize} batches")
+        # Closed sources are dropped from stats, only the current ones are kept.
+        previous, previous_time = frames, now
+
+
+async def ingest(
+    detector,
+    tcp_addresses=(),
+    unix_paths=(),
+    tail_paths=(),
+    on_results=None,
+    batch_size=BATCH_SIZE,
+):
+    """
+    Run every source and the detector in one event loop.
+
+    Parameters
+    ----------
+    detector : OnlineDetector
+        Template detector, every source gets a clone with its own per-ID state.
+    tcp_addresses : sequence of tuple
+        (host, port) pairs to listen on.
+    unix_paths : sequence of str
+        Unix socket paths to listen on.
+    tail_paths : sequence of str
+        Log files to follow.
+    on_results : callable, optional
+        Called with the (frame, prediction) pairs of each predicted micro-batch.
+    batch_size : int
+        Number of lines per source batch.
+    """
+    queue = asyncio.Queue(maxsize=QUEUE_MAX_BATCHES)
+    stats = {}
+    tasks = [
+        run_detector(queue, detector, stats, on_results),
+        report_progress(queue, stats),
+    ]
+    tasks += [
+        serve_socket(queue, stats, host, port, batch_size=batch_size)
+        for host, port in tcp_addresses
+    ]
+    tasks += [
+        serve_socket(queue, stats, unix_path=path, batch_size=batch_size)
+        for path in unix_paths
+    ]
+    tasks += [
+        tail_file(queue, stats, path, batch_size=batch_size) for path in tail_paths
+    ]
+    await asyncio.gather(*tasks)
+
+
+def print_alerts(results):
+    """
+    Print the frames predicted as attacks.
+
+    Parameters
+    ----------
+    results : list of tuple
+        (frame, prediction) pairs.
+    """
+    for frame, prediction in results:
+        if prediction != 0:
+            print(
+                f"ALERT {prediction} {frame['source']} {frame['timestamp']:.6f} "
+                f"{frame['can_id']}"
+            )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Ingest CAN frames from sockets and growing log files."
+    )
+    parser.add_argument("--model", required=True, help="Folder of the model artifact.")
+    parser.add_argument("--tcp", action="append", default=[], help="host:port")
+    parser.add_argument("--unix", action="append", default=[], help="Socket path.")
+    parser.add_argument("--tail", action="append", default=[], help="Log file path.")
+    add_execution_profile_argument(parser)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    profile = select_execution_profile(args.execution_profile)
+    tcp_addresses = []
+    for address in args.tcp:
+        host, port = address.rsplit(":", 1)
+        tcp_addresses.append((host, int(port)))
+
+    detector = OnlineDetector.from_artifact(
+        args.model, batch_size=profile["batch_size"]
+    )
+    asyncio.run(
+        ingest(
+            detector,
+            tcp_addresses,
+            args.unix,
+            args.tail,
+            on_results=print_alerts,
+            batch_size=profile["batch_size"],
+        )
+    )
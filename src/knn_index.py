@@ -0,0 +1,309 @@
+"""
+Workflow of the KNN index backend
+1. frames are 10-dimensional small-integer vectors (can_id, dlc, byte_0 ... byte_7)
+2. build_knn_model() builds the index once, at fit time
+    1. 'kd_tree' / 'ball_tree': sklearn's spatial trees, exact results
+    2. 'dedup_kd_tree': approximate backend tuned for repeated payloads. Most CAN frames repeat
+        exactly, so the training vectors are deduplicated and each unique vector keeps its
+        per-class counts. The KD tree is built on the unique vectors only, which makes it far
+        smaller, and neighbours vote with their counts.
+3. the fitted model is persisted with save_model_artifact() like any other estimator
+4. benchmark_knn() compares each backend to exact brute-force KNN on the same data
+    1. recall: fraction of the exact k nearest distances that the backend also returns
+    2. agreement: fraction of predictions equal to the exact KNN predictions
+    3. build time and batched query latency per frame
+"""
+
+import time
+
+import numpy as np
+import polars as pl
+from sklearn.neighbors import KDTree, KNeighborsClassifier
+
+from model_artifact import save_model_artifact
+from online_detector import prepare_feature_frame
+from utils import (
+    load_data_paths,
+    parse_execution_profile_argument,
+    read_processed_csv,
+    select_execution_profile,
+)
+
+# ──────────────────────────────────────────────────────────────
+# 🛠️ Configuration Constants
+# ──────────────────────────────────────────────────────────────
+KNN_FEATURE_COLUMNS = ["can_id", "dlc"] + [f"byte_{i}" for i in range(8)]
+KNN_ALGORITHMS = ["brute", "kd_tree", "ball_tree", "dedup_kd_tree"]
+N_NEIGHBORS = 5
+LEAF_SIZE = 40
+QUERY_BATCH_SIZE = 10000
+# ──────────────────────────────────────────────────────────────
+
+
+class DedupKNNClassifier:
+    """
+    Approximate KNN classifier that indexes unique vectors with their per-class counts.
+
+    Parameters
+    ----------
+    n_neighbors : int
+        Number of unique vectors that vote for each query.
+    leaf_size : int
+        Leaf size of the KD tree.
+    """
+
+    def __init__(self, n_neighbors=N_NEIGHBORS, leaf_size=LEAF_SIZE):
+        self.n_neighbors = n_neighbors
+        self.leaf_size = leaf_size
+
+    def fit(self, X, y):
+        """
+        Deduplicate the training vectors and build the KD tree on the unique ones.
+
+        Parameters
+        ----------
+        X : np.ndarray
+            Training vectors.
+        y : np.ndarray
+            Training labels.
+
+        Returns
+        -------
+        DedupKNNClassifier
+            The fitted classifier.
+        """
+        X = np.asarray(X)
+        self.classes_, y_index = np.unique(np.asarray(y), return_inverse=True)
+        unique_vectors, vector_index = np.unique(X, axis=0, return_inverse=True)
+        class_counts = np.zeros(
+            (len(unique_vectors), len(self.classes_)), dtype=np.int64
+        )
+        np.add.at(class_counts, (vector_index.ravel(), y_index), 1)
+
+        self.unique_vectors_ = unique_vectors.astype(np.float64)
+        self.class_counts_ = class_counts
+        self.tree_ = KDTree(self.unique_vectors_, leaf_size=self.leaf_size)
+        return self
+
+    def kneighbors(self, X):
+        """
+        Find the nearest unique training vectors.
+
+        Parameters
+        ----------
+        X : np.ndarray
+            Query vectors.
+
+        Returns
+        -------
+        tuple of np.ndarray
+            (distances, indices into unique_vectors_)
+        """
+        n_neighbors = min(self.n_neighbors, len(self.unique_vectors_))
+        return self.tree_.query(np.asarray(X, dtype=np.float64), k=n_neighbors)
+
+    def predict(self, X):
+        """
+        Predict the class with the most training frames among the nearest unique vectors.
+
+        Parameters
+        ----------
+        X : np.ndarray
+            Query vectors.
+
+        Returns
+        -------
+        np.ndarray
+            Predicted labels.
+        """
+        _, indices = self.kneighbors(X)
+        votes = self.class_counts_[indices].sum(axis=1)
+        return self.classes_[votes.argmax(axis=1)]
+
+
+def build_knn_model(
+    X, y, algorithm="kd_tree", n_neighbors=N_NEIGHBORS, leaf_size=LEAF_SIZE
+):
+    """
+    Fit a KNN classifier, building its index once.
+
+    Parameters
+    ----------
+    X : np.ndarray
+        Training vectors in KNN_FEATURE_COLUMNS order.
+    y : np.ndarray
+        Training labels.
+    algorithm : str
+        One of KNN_ALGORITHMS.
+    n_neighbors : int
+        Number of neighbours.
+    leaf_size : int
+        Leaf size of the tree indexes.
+
+    Returns
+    -------
+    object
+        The fitted classifier.
+
+    Raises
+    ------
+    ValueError
+        If the algorithm is invalid.
+    """
+    if algorithm == "dedup_kd_tree":
+        model = DedupKNNClassifier(n_neighbors=n_neighbors, leaf_size=leaf_size)
+    elif algorithm in KNN_ALGORITHMS:
+        model = KNeighborsClassifier(
+            n_neighbors=n_neighbors, algorithm=algorithm, leaf_size=leaf_size
+        )
+    else:
+        raise ValueError(
+            f"Invalid algorithm '{algorithm}'. Choose one of {KNN_ALGORITHMS}."
+        )
+    return model.fit(X, y)
+
+
+def predict_in_batches(model, X, batch_size=QUERY_BATCH_SIZE):
+    """
+    Predict the queries batch by batch.
+
+    Parameters
+    ----------
+    model : object
+        Fitted KNN classifier.
+    X : np.ndarray
+        Query vectors.
+    batch_size : int
+        Number of queries per batch.
+
+    Returns
+    -------
+    np.ndarray
+        Predicted labels.
+    """
+    if len(X) == 0:
+        return np.empty(0, dtype=model.classes_.dtype)
+    return np.concatenate(
+        [model.predict(X[i : i + batch_size]) for i in range(0, len(X), batch_size)]
+    )
+
+
+def neighbour_recall(exact_distances, distances):
+    """
+    Fraction of the exact k nearest distances that are matched by an index.
+
+    Parameters
+    ----------
+    exact_distances : np.ndarray
+        Sorted distances returned by exact KNN, shape (n_queries, k).
+    distances : np.ndarray
+        Sorted distances returned by the index, shape (n_queries, k).
+
+    Returns
+    -------
+    float
+        Mean recall over the queries.
+    """
+    kth_distance = exact_distances[:, -1:]
+    matched = (distances <= kth_distance + 1e-9).sum(axis=1)
+    return float(
+        np.mean(
+            np.minimum(matched, exact_distances.shape[1]) / exact_distances.shape[1]
+        )
+    )
+
+
+def benchmark_knn(
+    X_train,
+    y_train,
+    X_query,
+    algorithms=KNN_ALGORITHMS,
+    n_neighbors=N_NEIGHBORS,
+    batch_size=QUERY_BATCH_SIZE,
+):
+    """
+    Compare recall, agreement and latency of KNN backends against exact brute-force KNN.
+
+    Parameters
+    ----------
+    X_train : np.ndarray
+        Training vectors.
+    y_train : np.ndarray
+        Training labels.
+    X_query : np.ndarray
+        Query vectors.
+    algorithms : list of str
+        Backends to benchmark.
+    n_neighbors : int
+        Number of neighbours.
+    batch_size : int
+        Number of query rows per predict call.
+
+    Returns
+    -------
+    pl.DataFrame
+        One row per backend with build_seconds, query_us_per_frame, recall and agreement.
+
+    Raises
+    ------
+    ValueError
+        If there are no query vectors.
+    """
+    if len(X_query) == 0:
+        raise ValueError("X_query is empty, there is nothing to benchmark.")
+    exact_model = build_knn_model(X_train, y_train, "brute", n_neighbors)
+    exact_distances = exact_model.kneighbors(X_query)[0]
+    exact_predictions = predict_in_batches(exact_model, X_query, batch_size)
+
+    rows = []
+    for algorithm in algorithms:
+        start = time.perf_counter()
+        model = build_knn_model(X_train, y_train, algorithm, n_neighbors)
+        build_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        predictions = predict_in_batches(model, X_query, batch_size)
+        query_seconds = time.perf_counter() - start
+        distances = model.kneighbors(X_query)[0]
+
+        rows.append(
+            {
+                "algorithm": algorithm,
+                "build_seconds": build_seconds,
+                "query_us_per_frame": query_seconds / len(X_query) * 1e6,
+                "recall": neighbour_recall(exact_distances, distances),
+                "agreement": float(np.mean(predictions == exact_predictions)),
+            }
+        )
+    return pl.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    profile = select_execution_profile(parse_execution_profile_argument())
+    train_sample_size = profile["train_sample_size"]
+    query_sample_size = profile["query_sample_size"]
+    print("Reading datasets!")
+    output_data_paths = load_data_paths("out_paths")
+    dfs = [read_processed_csv(output_data_paths[key]) for key in ["dos_df", "fuzzy_df"]]
+    df = pl.concat(
+        [
+            prepare_feature_frame(df).with_columns(
+                (df["updated_flag"] == "T").cast(pl.Int64).alias("label")
+            )
+            for df in dfs
+        ]
+    ).sample(n=train_sample_size + query_sample_size, seed=42)
+
+    X = df.select(KNN_FEATURE_COLUMNS).to_numpy()
+    y = df["label"].to_numpy()
+    X_train, y_train = X[:train_sample_size], y[:train_sample_size]
+    X_query = X[train_sample_size:]
+
+    print("Benchmarking KNN backends!")
+    print(
+        benchmark_knn(X_train, y_train, X_query, batch_size=profile["query_batch_size"])
+    )
+
+    print("Saving dedup_kd_tree model!")
+    model = build_knn_model(X_train, y_train, "dedup_kd_tree")
+    save_model_artifact(model, "models/knn_dedup_kd_tree", KNN_FEATURE_COLUMNS)
@@ -4,6 +4,8 @@ from utils import (
     check_file_exists,
     set_column_names,
     save_df_to_csv,
+    parse_execution_profile_argument,
+    select_execution_profile,
 )
 
 
@@ -117,6 +119,7 @@ def main(
 
 
 if __name__ == "__main__":
+    select_execution_profile(parse_execution_profile_argument())
 
     # dos_df_in_path, fuzzy_df_in_path, attack_free_in_path = load_data_paths_from_config(
     #     "in_paths"
@@ -6,26 +6,98 @@ Workflow of load data
 4. process_csv() method is used for dos and fuzzy.
     1. it checks whether csv file exists in output folder
         1. if not
-            1. set column names
-            2. fix dlc- flag issue (update_dlc_flag_association())
-            3. save updated pl df into output folder
+            1. validate frames, bad ones go to output/quarantine with reason codes
+            2. set column names
+            3. fix dlc- flag issue (update_dlc_flag_association())
+            4. save updated pl df into output folder
 5. process_txt method is used for attack free df.
     1. it checks whether csv file exists in output folder
         1. if not
             1. convert txt file to list format by deleting column names from each line in txt
-            2. convert list to csv
+            2. validate frames, bad ones go to output/quarantine with reason codes
             3. save updated pl df into output folder
+6. any number of captures (a directory or glob) is processed with src/ingest_captures.py
+7. growing captures are processed with append_new_frames() (--append)
+    1. an append state next to the output (output/append_state/<name>.json) remembers the byte
+        offset of the source read so far, its line count, the last valid timestamp, the max
+        DLC of the DLC fix and the output's size and mtime
+    2. only the complete lines after the offset are read, validated (line numbers and the
+        timestamp order continue from the state) and fixed like process_csv() / process_txt()
+    3. the new frames are appended to the output and the quarantine, the dataset stats
+        (dataset_stats.py) are updated with the stats of the new frames only
+    4. the state is written last. If the output changed, the source was replaced or shrank,
+        or the new frames need another max DLC, the whole source is processed again
 """
 
+import argparse
+import hashlib
+import io
+import json
+import os
+
 import polars as pl
-import pandas as pd
+from dataset_stats import (
+    compute_dataset_stats,
+    save_dataset_stats,
+    update_dataset_stats,
+)
+from frame_validation import save_quarantine, validate_capture
 from utils import (
+    HEX_COLUMNS,
+    add_execution_profile_argument,
+    file_fingerprint,
     load_data_paths,
     check_file_exists,
-    set_column_names,
     save_df_to_csv,
+    read_processed_csv,
+    rows_to_dataframe,
+    select_execution_profile,
 )
 
+# ──────────────────────────────────────────────────────────────
+# 🛠️ Configuration Constants
+# ──────────────────────────────────────────────────────────────
+DOS_AND_FUZZY_COLUMN_NAMES = (
+    ["timestamp", "can_id", "dlc"] + [f"byte_{i}" for i in range(8)] + ["flag"]
+)
+ATTACK_FREE_COLUMN_NAMES = ["timestamp", "can_id", "frame_type", "dlc"] + [
+    f"byte_{i}" for i in range(8)
+]
+EXISTING_DLC_COLUMN_NAME = "dlc"
+EXISTING_FLAG_COLUMN_NAME = "flag"
+NEW_FLAG_COLUMN_NAME = "updated_flag"
+APPEND_STATE_DIR_NAME = "append_state"
+APPEND_STATE_VERSION = 1  # bump when the state or the processing of a segment changes
+SOURCE_CHECK_BYTES = 4096  # bytes before the offset hashed to notice a replaced source
+# ──────────────────────────────────────────────────────────────
+
+
+def parse_attack_free_line(line):
+    """
+    Parse one line of the attack free text file.
+
+    Parameters
+    ----------
+    line : str
+        A line such as 'Timestamp: 1479121434.850202 ID: 0350 000 DLC: 8 05 28 84 ...'.
+
+    Returns
+    -------
+    list or None
+        [timestamp, id, frame_type, dlc, byte_0, ...] as str, None if the line is not a frame.
+    """
+    if not line.startswith("Timestamp:"):
+        return None
+    parts = line.split()
+    if len(parts) < 8:
+        return None
+    timestamp = parts[1]
+    id_value = parts[3]
+    frame_type = parts[4]
+    dlc = parts[6]
+    bytes_data = parts[7:]
+    return [timestamp, id_value, frame_type, dlc] + bytes_data
+
 
 def convert_attack_free_txt_to_list(input_file):
     """
@@ -47,16 +119,9 @@ def convert_attack_free_txt_to_list(input_file):
             lines = file.readlines()
         for line in lines:
             if line.strip():
-                if line.startswith("Timestamp:"):
-                    parts = line.split()
-                    if len(parts) >= 8:
-                        timestamp = parts[1]
-                        id_value = parts[3]
-                        frame_type = parts[4]
-                        dlc = parts[6]
-                        bytes_data = parts[7:]
-                        row = [timestamp, id_value, frame_type, dlc] + bytes_data
-                        data.append(row)
+                row = parse_attack_free_line(line)
+                if row is not None:
+                    data.append(row)
 
     except FileNotFoundError:
         print(f"Error: File not found at {input_file}")
@@ -83,8 +148,7 @@ def convert_list_to_csv(data, output_file, column_names):
     pl.DataFrame
         DataFrame created from the input data.
     """
-    df = pd.DataFrame(data, columns=column_names)
-    df = pl.from_pandas(df)
+    df = rows_to_dataframe(data, column_names, backend="polars")
     df.write_csv(output_file)
     return df
 
@@ -136,7 +200,9 @@ def set_new_flag_for_non_max_dlc(
     )
 
 
-def set_byte_to_null_if_byte_contains_flag(df, existing_dlc_column_name):
+def set_byte_to_null_if_byte_contains_flag(
+    df, existing_dlc_column_name, max_dlc_value=None
+):
     """
     Nullifies byte columns containing misplaced flag values.
 
@@ -146,6 +212,8 @@ def set_byte_to_null_if_byte_contains_flag(df, existing_dlc_column_name):
         The input dataframe.
     existing_dlc_column_name : str
         Name of the column containing the current DLC values.
+    max_dlc_value : int, optional
+        The maximum value of DLC, by default the maximum of the dataframe.
 
     Returns
     -------
@@ -159,7 +227,11 @@ def set_byte_to_null_if_byte_contains_flag(df, existing_dlc_column_name):
             .then(None)  # Set to null if dlc matches the byte column
             .otherwise(pl.col(f"byte_{i}"))  # Keep the original value otherwise
             .alias(f"byte_{i}")
-            for i in range(df[existing_dlc_column_name].max())  # Update the byte column
+            for i in range(
+                df[existing_dlc_column_name].max()
+                if max_dlc_value is None
+                else max_dlc_value
+            )  # Update the byte column
         ]
     )
 
@@ -206,6 +278,7 @@ def update_dlc_flag_association(
     existing_dlc_column_name,
     existing_flag_column_name,
     new_flag_column_name,
+    max_dlc_value=None,
 ):
     """
     Updates flag associations by handling misplaced flags and cleaning byte columns, and deleting old flag columns.
@@ -220,14 +293,15 @@ def update_dlc_flag_association(
     ----------
     df : DataFrame
         The input dataframe containing byte, flag, and DLC columns.
-    max_dlc_value : int
-        The maximum value of DLC.
     existing_dlc_column_name : str
         Name of the column containing the current DLC values.
     existing_flag_column_name : str
         Name of the column containing the flag values.
     new_flag_column_name : str
         Name of the column to store the updated flag values.
+    max_dlc_value : int, optional
+        The maximum value of DLC, by default the maximum of the dataframe. A segment of a
+        capture is fixed with the maximum of the whole capture.
 
     Returns
     -------
@@ -235,11 +309,14 @@ def update_dlc_flag_association(
         Updated dataframe with corrected flag associations.
     """
 
-    max_dlc_value = df[existing_dlc_column_name].max()
+    if max_dlc_value is None:
+        max_dlc_value = df[existing_dlc_column_name].max()
     df = set_new_flag_for_non_max_dlc(
         df, max_dlc_value, existing_dlc_column_name, new_flag_column_name
     )
-    df = set_byte_to_null_if_byte_contains_flag(df, existing_dlc_column_name)
+    df = set_byte_to_null_if_byte_contains_flag(
+        df, existing_dlc_column_name, max_dlc_value
+    )
     df = set_new_flag_for_max_dlc(
         df,
         max_dlc_value,
@@ -251,6 +328,47 @@ def update_dlc_flag_association(
     return df
 
 
+def fix_dos_and_fuzzy_frames(
+    df,
+    existing_dlc_column_name,
+    existing_flag_column_name,
+    new_flag_column_name,
+    max_dlc_value=None,
+):
+    """
+    Cast the validated DoS / Fuzzy frames and fix the dlc-flag issue.
+
+    Parameters
+    ----------
+    df : pl.DataFrame
+        Valid frames returned by validate_capture(), as str columns.
+    existing_dlc_column_name : str
+        Name of the column containing DLC information.
+    existing_flag_column_name : str
+        Name of the column containing the existing flag information.
+    new_flag_column_name : str
+        Name of the new flag column to be created or updated.
+    max_dlc_value : int, optional
+        The maximum value of DLC, see update_dlc_flag_association().
+
+    Returns
+    -------
+    pl.DataFrame
+        Frames with a Float64 timestamp, an Int64 DLC and the new flag column.
+    """
+    df = df.with_columns(
+        pl.col("timestamp").cast(pl.Float64),
+        pl.col(existing_dlc_column_name).cast(pl.Int64),
+    )
+    return update_dlc_flag_association(
+        df,
+        existing_dlc_column_name,
+        existing_flag_column_name,
+        new_flag_column_name,
+        max_dlc_value,
+    )
+
+
 def process_csv(
     df_name,
     df_in_path,
@@ -266,9 +384,11 @@ def process_csv(
     This function checks if the output file already exists:
     - If the file exists, it returns the DataFrame from the existing CSV.
     - If the file does not exist, it performs the following steps:
-        1. Renames the columns of the input DataFrame based on the provided `column_names`.
-        2. Updates the DataFrame by associating the new flag column with the values from the existing columns (`existing_dlc_column_name` and `existing_flag_column_name`).
-        3. Saves the processed DataFrame to the specified output file path.
+        1. Validates every frame (validate_capture()), frames failing a check are written to
+           the quarantine folder with their reason codes and the rest continue.
+        2. Renames the columns of the input DataFrame based on the provided `column_names`.
+        3. Updates the DataFrame by associating the new flag column with the values from the existing columns (`existing_dlc_column_name` and `existing_flag_column_name`).
+        4. Saves the processed DataFrame to the specified output file path.
 
 
     Parameters
@@ -295,12 +415,13 @@ def process_csv(
     """
 
     if check_file_exists(df_out_path):
-        return pl.read_csv(df_out_path)
+        return read_processed_csv(df_out_path)
 
     else:
         print(f"Processing {df_name} CSV...")
-        df = set_column_names(column_names, df_in_path, backend="polars")
-        df = update_dlc_flag_association(
+        df, quarantine = validate_capture(df_in_path, "csv", column_names)
+        save_quarantine(quarantine, df_out_path)
+        df = fix_dos_and_fuzzy_frames(
             df,
             existing_dlc_column_name,
             existing_flag_column_name,
@@ -318,9 +439,10 @@ def process_txt(df_name, df_out_path, column_names, df_in_path):
     This function checks if the output file already exists:
     - If the output file exists, it returns the DataFrame from the existing CSV.
     - If the file doesn't exist, it performs the following steps:
-        1. Converts the content of the input TXT file into a list.
-        2. Converts the list into a DataFrame with the specified column names.
-        3. Saves the processed DataFrame as a CSV file to the specified output path.
+        1. Parses the frame lines of the input TXT file into the specified column names.
+        2. Validates every frame (validate_capture()), frames failing a check are written to
+           the quarantine folder with their reason codes.
+        3. Saves the valid frames as a CSV file to the specified output path.
 
 
     Parameters
@@ -340,16 +462,315 @@ def process_txt(df_name, df_out_path, column_names, df_in_path):
         The processed DataFrame.
     """
     if check_file_exists(df_out_path):
-        return pl.read_csv(df_out_path)
+        return read_processed_csv(df_out_path)
     else:
         print(f"Processing {df_name} txt...")
-        data_list = convert_attack_free_txt_to_list(df_in_path)
-        df = convert_list_to_csv(data_list, df_out_path, column_names)
+        df, quarantine = validate_capture(df_in_path, "txt", column_names)
+        save_quarantine(quarantine, df_out_path)
+        df.write_csv(df_out_path)
         print(f"{df_name} txt is saved to output folder!")
         return df
 
 
+def get_append_state_path(df_out_path):
+    """
+    Path of the append state of a processed dataset, next to the dataset.
+
+    Parameters
+    ----------
+    df_out_path : str
+        Path of the processed CSV file.
+
+    Returns
+    -------
+    str
+        <output folder>/append_state/<file name without extension>.json.
+    """
+    name = os.path.splitext(os.path.basename(df_out_path))[0]
+    return os.path.join(
+        os.path.dirname(df_out_path), APPEND_STATE_DIR_NAME, f"{name}.json"
+    )
+
+
+def load_append_state(df_out_path):
+    """
+    Read the append state of a processed dataset.
+
+    Parameters
+    ----------
+    df_out_path : str
+        Path of the processed CSV file.
+
+    Returns
+    -------
+    dict or None
+        The state written by the last append_new_frames() run, None if there is none.
+    """
+    state_path = get_append_state_path(df_out_path)
+    if not os.path.isfile(state_path):
+        return None
+    with open(state_path, "r") as file:
+        return json.load(file)
+
+
+def save_append_state(state, df_out_path):
+    """
+    Write the append state of a processed dataset, replacing the previous one at once.
+
+    Parameters
+    ----------
+    state : dict
+        State of append_new_frames().
+    df_out_path : str
+        Path of the processed CSV file.
+    """
+    state_path = get_append_state_path(df_out_path)
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    temp_path = f"{state_path}.tmp"
+    with open(temp_path, "w") as file:
+        json.dump(state, file, indent=2)
+    os.replace(temp_path, state_path)
+
+
+def source_digest(df_in_path, offset):
+    """
+    Hash of the SOURCE_CHECK_BYTES bytes of a source before an offset.
+
+    Parameters
+    ----------
+    df_in_path : str
+        Path to the raw capture.
+    offset : int
+        Byte offset read so far.
+
+    Returns
+    -------
+    str
+        Hex sha256, it changes when the capture was replaced by another one.
+    """
+    start = max(0, offset - SOURCE_CHECK_BYTES)
+    with open(df_in_path, "rb") as file:
+        file.seek(start)
+        return hashlib.sha256(file.read(offset - start)).hexdigest()
+
+
+def output_fingerprint(df_out_path):
+    return file_fingerprint(df_out_path) if check_file_exists(df_out_path) else None
+
+
+def is_append_state_current(state, df_in_path, df_out_path, capture_format):
+    """
+    Check that new frames can be appended after the ones of an append state.
+
+    Parameters
+    ----------
+    state : dict
+        State returned by load_append_state().
+    df_in_path : str
+        Path to the raw capture.
+    df_out_path : str
+        Path of the processed CSV file.
+    capture_format : str
+        'csv' or 'txt'.
+
+    Returns
+    -------
+    bool
+        False if the state is of another version, source or format, the output was changed
+        by something else, or the source shrank or was replaced.
+    """
+    return (
+        state.get("version") == APPEND_STATE_VERSION
+        and state["source"] == df_in_path
+        and state["format"] == capture_format
+        and state["output"] == output_fingerprint(df_out_path)
+        and os.path.getsize(df_in_path) >= state["offset"]
+        and state["source_digest"] == source_digest(df_in_path, state["offset"])
+    )
+
+
+def read_new_segment(df_in_path, offset):
+    """
+    Read the complete lines of a raw capture after a byte offset.
+
+    A line still being written (no newline yet) is left for the next run.
+
+    Parameters
+    ----------
+    df_in_path : str
+        Path to the raw capture.
+    offset : int
+        Byte offset read so far, at the start of a line.
+
+    Returns
+    -------
+    tuple
+        (bytes of the new lines, byte offset after them).
+    """
+    with open(df_in_path, "rb") as file:
+        file.seek(offset)
+        data = file.read()
+    end = data.rfind(b"\n") + 1
+    return data[:end], offset + end
+
+
+def append_new_frames(
+    df_name,
+    df_in_path,
+    df_out_path,
+    capture_format,
+    column_names,
+    existing_dlc_column_name=EXISTING_DLC_COLUMN_NAME,
+    existing_flag_column_name=EXISTING_FLAG_COLUMN_NAME,
+    new_flag_column_name=NEW_FLAG_COLUMN_NAME,
+):
+    """
+    Process only the frames added to a growing capture since the last run.
+
+    The new lines are validated and fixed like process_csv() / process_txt() do, appended to
+    the output and its quarantine, and the dataset stats are updated with them. The first run,
+    or a run after the output or the source changed, processes the whole capture and
+    replaces the output.
+
+    Parameters
+    ----------
+    df_name : str
+        Name of the DataFrame being processed, used for logging purposes.
+    df_in_path : str
+        Path to the raw capture.
+    df_out_path : str
+        Path of the processed CSV file.
+    capture_format : str
+        'csv' (DoS / Fuzzy) or 'txt' (attack free).
+    column_names : list of str
+        Column names of the capture, see DOS_AND_FUZZY_COLUMN_NAMES and
+        ATTACK_FREE_COLUMN_NAMES.
+    existing_dlc_column_name : str
+        Name of the column containing DLC information.
+    existing_flag_column_name : str
+        Name of the column containing the existing flag information (csv).
+    new_flag_column_name : str
+        Name of the new flag column (csv).
+
+    Returns
+    -------
+    pl.DataFrame or None
+        The frames appended, None if the capture has no new complete line.
+    """
+    state = load_append_state(df_out_path)
+    if state is not None and not is_append_state_current(
+        state, df_in_path, df_out_path, capture_format
+    ):
+        print(f"{df_out_path} or its source changed, processing {df_name} again...")
+        state = None
+    full = state is None
+    if full:
+        state = {
+            "version": APPEND_STATE_VERSION,
+            "source": df_in_path,
+            "format": capture_format,
+            "offset": 0,
+            "lines": 0,
+            "last_timestamp": None,
+            "max_dlc": None,
+            "frames": 0,
+            "quarantined": 0,
+        }
+    segment, end_offset = read_new_segment(df_in_path, state["offset"])
+    if not segment:
+        print(f"No new {df_name} frames.")
+        return None
+
+    df, quarantine = validate_capture(
+        io.BytesIO(segment),
+        capture_format,
+        column_names,
+        first_line_number=state["lines"] + 1,
+        previous_timestamp=state["last_timestamp"],
+    )
+    if capture_format == "csv":
+        # The DLC fix depends on the max DLC, the frames already written were fixed with the
+        # max of the frames before them.
+        max_dlc = df[existing_dlc_column_name].cast(pl.Int64).max()
+        if state["max_dlc"] is None:
+            state["max_dlc"] = max_dlc
+        elif max_dlc is not None and max_dlc > state["max_dlc"]:
+            print(f"New {df_name} frames have a larger DLC, processing it again...")
+            os.remove(get_append_state_path(df_out_path))
+            return append_new_frames(
+                df_name,
+                df_in_path,
+                df_out_path,
+                capture_format,
+                column_names,
+                existing_dlc_column_name,
+                existing_flag_column_name,
+                new_flag_column_name,
+            )
+        if df.height:
+            df = fix_dos_and_fuzzy_frames(
+                df,
+                existing_dlc_column_name,
+                existing_flag_column_name,
+                new_flag_column_name,
+                max_dlc_value=state["max_dlc"],
+            )
+
+    save_quarantine(quarantine, df_out_path, append=not full)
+    if df.height:
+        csv_bytes = df.write_csv().encode()
+        if full:
+            with open(df_out_path, "wb") as file:
+                file.write(csv_bytes)
+        else:
+            with open(df_out_path, "ab") as file:
+                file.write(csv_bytes[csv_bytes.index(b"\n") + 1 :])
+        # The stats of the new rows are taken from their csv text, as a full scan reads them.
+        new_rows = pl.read_csv(
+            io.BytesIO(csv_bytes),
+            schema_overrides={col: pl.String for col in HEX_COLUMNS},
+        )
+        new_stats = compute_dataset_stats(new_rows)
+        if full:
+            save_dataset_stats(new_stats, df_out_path)
+        else:
+            update_dataset_stats(df_out_path, new_stats, state["output"])
+        state["last_timestamp"] = float(df["timestamp"][-1])
+
+    state.update(
+        offset=end_offset,
+        lines=state["lines"] + segment.count(b"\n"),
+        frames=state["frames"] + df.height,
+        quarantined=state["quarantined"] + quarantine.height,
+        source_digest=source_digest(df_in_path, end_offset),
+        output=output_fingerprint(df_out_path),
+    )
+    # Written last, an interrupted run leaves an output that does not match the state and
+    # the next run processes the capture again.
+    save_append_state(state, df_out_path)
+    print(
+        f"Appended {df.height} {df_name} frames to {df_out_path}, "
+        f"{state['frames']} in total."
+    )
+    return df
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Process the DoS, Fuzzy and attack free captures of config.yaml."
+    )
+    parser.add_argument(
+        "--append",
+        action="store_true",
+        help="Process only the frames added to the captures since the last --append run.",
+    )
+    add_execution_profile_argument(parser)
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
+    args = parse_args()
+    profile = select_execution_profile(args.execution_profile)
 
     input_data_paths = load_data_paths("in_paths")
     dos_df_in_path = input_data_paths["dos_df"]
@@ -362,45 +783,63 @@ if __name__ == "__main__":
     fuzzy_df_out_path = output_data_paths["fuzzy_df"]
     attack_free_df_out_path = output_data_paths["attack_free_df"]
 
-    dos_and_fuzzy_column_names = (
-        ["timestamp", "can_id", "dlc"] + [f"byte_{i}" for i in range(8)] + ["flag"]
-    )
-
-    attack_free_column_names = ["timestamp", "can_id", "frame_type", "dlc"] + [
-        f"byte_{i}" for i in range(8)
-    ]
-
-    existing_dlc_column_name = "dlc"
-    existing_flag_column_name = "flag"
-    new_flag_column_name = "updated_flag"
-
-    dos_df = process_csv(
-        "DoS",
-        dos_df_in_path,
-        dos_and_fuzzy_column_names,
-        dos_df_out_path,
-        existing_dlc_column_name,
-        existing_flag_column_name,
-        new_flag_column_name,
-    )
-    fuzy_df = process_csv(
-        "Fuzzy",
-        fuzzy_df_in_path,
-        dos_and_fuzzy_column_names,
-        fuzzy_df_out_path,
-        existing_dlc_column_name,
-        existing_flag_column_name,
-        new_flag_column_name,
-    )
-    attack_free_df = process_txt(
-        "Attack Free",
-        attack_free_df_out_path,
-        attack_free_column_names,
-        attack_free_in_path,
-    )
-    stratified_sample_size = 20000
-    random_sample_size = 20000
+    dos_and_fuzzy_column_names = DOS_AND_FUZZY_COLUMN_NAMES
+    attack_free_column_names = ATTACK_FREE_COLUMN_NAMES
+
+    existing_dlc_column_name = EXISTING_DLC_COLUMN_NAME
+    existing_flag_column_name = EXISTING_FLAG_COLUMN_NAME
+    new_flag_column_name = NEW_FLAG_COLUMN_NAME
+
+    if args.append:
+        captures = [
+            ("DoS", dos_df_in_path, dos_df_out_path, "csv", dos_and_fuzzy_column_names),
+            (
+                "Fuzzy",
+                fuzzy_df_in_path,
+                fuzzy_df_out_path,
+                "csv",
+                dos_and_fuzzy_column_names,
+            ),
+            (
+                "Attack Free",
+                attack_free_in_path,
+                attack_free_df_out_path,
+                "txt",
+                attack_free_column_names,
+            ),
+        ]
+        for df_name, df_in_path, df_out_path, capture_format, column_names in captures:
+            append_new_frames(
+                df_name, df_in_path, df_out_path, capture_format, column_names
+            )
+    else:
+        dos_df = process_csv(
+            "DoS",
+            dos_df_in_path,
+            dos_and_fuzzy_column_names,
+            dos_df_out_path,
+            existing_dlc_column_name,
+            existing_flag_column_name,
+            new_flag_column_name,
+        )
+        fuzy_df = process_csv(
+            "Fuzzy",
+            fuzzy_df_in_path,
+            dos_and_fuzzy_column_names,
+            fuzzy_df_out_path,
+            existing_dlc_column_name,
+            existing_flag_column_name,
+            new_flag_column_name,
+        )
+        attack_free_df = process_txt(
+            "Attack Free",
+            attack_free_df_out_path,
+            attack_free_column_names,
+            attack_free_in_path,
+        )
+        stratified_sample_size = profile["random_sample_size"]
+        random_sample_size = profile["random_sample_size"]
 
-    print("dos_df", dos_df.shape)
-    print("fuzy_df", fuzy_df.shape)
-    print("attack_free_df", attack_free_df.shape)
+        print("dos_df", dos_df.shape)
+        print("fuzy_df", fuzy_df.shape)
+        print("attack_free_df", attack_free_df.shape)
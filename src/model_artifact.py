@@ -0,0 +1,158 @@
+"""
+Workflow of model artifacts
+1. save_model_artifact() writes a folder with two files
+    1. manifest.json: feature column order, dtypes, preprocessing parameters and model info
+    2. estimator.joblib: the fitted estimator, dumped uncompressed so its numpy arrays
+        (tree nodes, support vectors, KNN training data ...) are stored as raw buffers
+2. load_model_artifact() reads the manifest and loads the estimator with mmap_mode="r"
+    1. large arrays are memory-mapped instead of copied, so loading takes milliseconds
+    2. several worker processes loading the same artifact share one copy in page cache
+3. validate_feature_columns() checks the manifest against the feature columns a detector
+    computes (score.py, OnlineDetector.from_artifact()), the model's columns are then selected
+    in the manifest's order, so a model can't be applied to features in a different order
+"""
+
+import json
+import os
+import time
+
+import joblib
+
+# ──────────────────────────────────────────────────────────────
+# 🛠️ Configuration Constants
+# ──────────────────────────────────────────────────────────────
+ARTIFACT_FORMAT_VERSION = 1
+MANIFEST_FILE_NAME = "manifest.json"
+ESTIMATOR_FILE_NAME = "estimator.joblib"
+DEFAULT_FEATURE_DTYPE = "float64"
+# ──────────────────────────────────────────────────────────────
+
+
+def save_model_artifact(
+    model,
+    artifact_dir,
+    feature_columns,
+    feature_dtypes=None,
+    preprocessing_params=None,
+):
+    """
+    Save a fitted estimator together with its feature schema.
+
+    Parameters
+    ----------
+    model : object
+        Fitted estimator.
+    artifact_dir : str
+        Folder where the artifact will be saved, created if it doesn't exist.
+    feature_columns : list of str
+        Exact feature column order the model was fitted on.
+    feature_dtypes : dict, optional
+        dtype of each feature column, by default DEFAULT_FEATURE_DTYPE for all.
+    preprocessing_params : dict, optional
+        Parameters of the feature steps such as the ring size, by default empty.
+
+    Returns
+    -------
+    dict
+        The saved manifest.
+    """
+    feature_dtypes = feature_dtypes or {
+        col: DEFAULT_FEATURE_DTYPE for col in feature_columns
+    }
+    missing_dtypes = [col for col in feature_columns if col not in feature_dtypes]
+    if missing_dtypes:
+        raise ValueError(f"Missing dtypes for feature columns: {missing_dtypes}")
+
+    manifest = {
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "model_class": f"{type(model).__module__}.{type(model).__name__}",
+        "feature_columns": list(feature_columns),
+        "feature_dtypes": {col: str(feature_dtypes[col]) for col in feature_columns},
+        "preprocessing_params": dict(preprocessing_params or {}),
+        "classes": [c.item() for c in getattr(model, "classes_", [])],
+    }
+
+    os.makedirs(artifact_dir, exist_ok=True)
+    # compress=0 keeps the arrays as raw buffers, which is what makes mmap loading possible.
+    joblib.dump(model, os.path.join(artifact_dir, ESTIMATOR_FILE_NAME), compress=0)
+    with open(os.path.join(artifact_dir, MANIFEST_FILE_NAME), "w") as file:
+        json.dump(manifest, file, indent=2)
+    return manifest
+
+
+def load_manifest(artifact_dir):
+    """
+    Load the manifest of a model artifact.
+
+    Parameters
+    ----------
+    artifact_dir : str
+        Folder of the artifact.
+
+    Returns
+    -------
+    dict
+        The manifest.
+
+    Raises
+    ------
+    ValueError
+        If the artifact format version is not supported.
+    """
+    with open(os.path.join(artifact_dir, MANIFEST_FILE_NAME), "r") as file:
+        manifest = json.load(file)
+    if manifest.get("format_version") != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported artifact format version {manifest.get('format_version')}, "
+            f"expected {ARTIFACT_FORMAT_VERSION}."
+        )
+    return manifest
+
+
+def load_model_artifact(artifact_dir, mmap=True):
+    """
+    Load a model artifact, memory-mapping its large arrays.
+
+    Parameters
+    ----------
+    artifact_dir : str
+        Folder of the artifact.
+    mmap : bool, optional
+        Memory-map the estimator's arrays read-only, by default True.
+
+    Returns
+    -------
+    tuple
+        (model, manifest)
+    """
+    manifest = load_manifest(artifact_dir)
+    model = joblib.load(
+        os.path.join(artifact_dir, ESTIMATOR_FILE_NAME),
+        mmap_mode="r" if mmap else None,
+    )
+    return model, manifest
+
+
+def validate_feature_columns(manifest, feature_columns):
+    """
+    Check that every feature the model was fitted on can be computed.
+
+    Parameters
+    ----------
+    manifest : dict
+        Manifest of the artifact.
+    feature_columns : list of str
+        Feature columns the caller computes. The model's columns are selected from them in
+        the manifest's order.
+
+    Raises
+    ------
+    ValueError
+        If a feature column of the artifact is not computed.
+    """
+    unknown_columns = [
+        col for col in manifest["feature_columns"] if col not in feature_columns
+    ]
+    if unknown_columns:
+        raise ValueError(f"Unknown feature columns in the artifact: {unknown_columns}")
@@ -0,0 +1,554 @@
+"""
+Workflow of online detection
+1. a trained model is given together with the feature columns it was fitted on
+2. frames arrive one by one with the same fields the loaders produce
+    (timestamp, can_id, dlc, byte_0 ... byte_7)
+3. per-ID rolling state is kept in preallocated ring buffers indexed by the 11-bit CAN ID
+    1. interval: time since the previous frame of the same ID
+    2. mean_interval: mean interval over the last RING_SIZE frames of the same ID
+4. classify() returns the prediction of a single frame immediately
+    1. a fitted sklearn decision tree is walked directly on the feature row, without predict()
+    2. a tree or forest exported with tree_arrays.export_tree_model() is walked with its
+        predict_one()
+    3. every other model goes through predict()
+5. push() collects frames into a micro-batch and predicts them together
+    1. the batch is predicted when it is full or when a frame arrives after max_delay_ms has
+        passed since the batch's first frame
+    2. the delay is only bounded if the caller also runs poll() on a timer, otherwise the last
+        frames before a gap on the bus wait for the next frame
+    3. flush() predicts whatever is left in the batch
+
+Latency targets
+    P99_LATENCY_TARGETS_US holds the p99 single-frame (classify) latency per model kind.
+    Parsing and updating the ring buffers costs a few microseconds. A decision tree walked
+    directly stays within 50 microseconds. Any other sklearn estimator spends a few hundred
+    microseconds per predict() call on validation, and KNN indexes add the neighbour search
+    on top, that's why micro-batching (push) trades a few milliseconds of latency for a much
+    higher throughput. measure_latency() reports the percentiles on a given frame list and
+    checks the p99 against the model's target.
+
+Profile features
+    With a CanIdProfile the row is extended with the DEVIATION_COLUMNS of the frame
+    (frame_deviations()), prepare_feature_frame(profile=...) adds the same columns in batch.
+
+add_rolling_features() computes the same rolling features on a whole polars DataFrame, so
+the model can be trained on exactly what the detector computes online.
+"""
+
+import time
+import numpy as np
+import polars as pl
+
+from can_id_profile import DEVIATION_COLUMNS, add_profile_deviations, load_profile
+from model_artifact import load_model_artifact, validate_feature_columns
+
+# ──────────────────────────────────────────────────────────────
+# 🛠️ Configuration Constants
+# ──────────────────────────────────────────────────────────────
+CAN_ID_SPACE = 2048  # 11-bit CAN IDs
+RING_SIZE = 16
+MAX_DLC = 8
+BYTE_COLUMNS = [f"byte_{i}" for i in range(MAX_DLC)]
+FEATURE_COLUMNS = ["can_id", "dlc"] + BYTE_COLUMNS + ["interval", "mean_interval"]
+PROFILE_FEATURE_COLUMNS = FEATURE_COLUMNS + DEVIATION_COLUMNS
+P99_LATENCY_TARGETS_US = {
+    "decision_tree": 50,
+    "compiled_tree": 50,
+    "sklearn": 1000,
+    "knn": 5000,
+}
+DEFAULT_BATCH_SIZE = 512
+DEFAULT_MAX_DELAY_MS = 5.0
+# ──────────────────────────────────────────────────────────────
+
+
+def parse_hex(value):
+    """
+    Convert a hex field produced by the loaders into int.
+
+    Parameters
+    ----------
+    value : str, int or None
+        Hex string such as '0316', already converted int, or None for empty byte columns.
+
+    Returns
+    -------
+    int
+        Integer value, 0 for empty byte columns.
+    """
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return int(value, 16) if value else 0
+    return int(value)
+
+
+def add_rolling_features(
+    df,
+    timestamp_column="timestamp",
+    can_id_column="can_id",
+    ring_size=RING_SIZE,
+):
+    """
+    Add per-ID interval and mean_interval columns, exactly as OnlineDetector computes them.
+
+    Parameters
+    ----------
+    df : pl.DataFrame
+        DataFrame sorted by timestamp, containing the timestamp and can_id columns.
+    timestamp_column : str
+        Name of the column containing float timestamps in seconds.
+    can_id_column : str
+        Name of the column containing CAN IDs.
+    ring_size : int
+        Number of frames per ID used for the mean interval.
+
+    Returns
+    -------
+    pl.DataFrame
+        DataFrame with newly added interval and mean_interval columns.
+    """
+    timestamp = pl.col(timestamp_column)
+    position = pl.int_range(pl.len()).over(can_id_column)
+    window = pl.min_horizontal(position, pl.lit(ring_size - 1))
+    oldest = timestamp.shift(ring_size - 1).over(can_id_column)
+    oldest = oldest.fill_null(timestamp.first().over(can_id_column))
+    return df.with_columns(
+        timestamp.diff().over(can_id_column).fill_null(0.0).alias("interval"),
+        pl.when(window > 0)
+        .then((timestamp - oldest) / window)
+        .otherwise(0.0)
+        .alias("mean_interval"),
+    )
+
+
+def prepare_feature_frame(
+    df, timestamp_column="timestamp", can_id_column="can_id", profile=None
+):
+    """
+    Build the FEATURE_COLUMNS frame of a loaded capture, the batch equivalent of update_state().
+
+    Hex can_id and byte columns are converted to int, empty byte columns are set to 0 and
+    the rolling features are added. Hex columns must be str, a column polars inferred as int
+    would be read as decimal and differ from what parse_hex() computes online.
+
+    Parameters
+    ----------
+    df : pl.DataFrame
+        Capture as produced by the loaders, sorted by timestamp.
+    timestamp_column : str
+        Name of the column containing float timestamps in seconds.
+    can_id_column : str
+        Name of the column containing hex CAN IDs.
+    profile : CanIdProfile, optional
+        Profile table, its DEVIATION_COLUMNS are added after FEATURE_COLUMNS.
+
+    Returns
+    -------
+    pl.DataFrame
+        DataFrame with FEATURE_COLUMNS (PROFILE_FEATURE_COLUMNS with a profile) in order.
+
+    Raises
+    ------
+    ValueError
+        If a hex column is not str.
+    """
+    hex_columns = [can_id_column] + [col for col in BYTE_COLUMNS if col in df.columns]
+    not_hex = [col for col in hex_columns if df.schema[col] not in (pl.String, pl.Null)]
+    if not_hex:
+        raise ValueError(
+            f"Columns {not_hex} must be hex str, read them with schema_overrides=pl.String."
+        )
+    df = df.with_columns(
+        [
+            pl.col(col).cast(pl.String).str.to_integer(base=16, strict=True)
+            for col in hex_columns
+        ]
+        + [pl.lit(0).alias(col) for col in BYTE_COLUMNS if col not in df.columns]
+    )
+    df = df.with_columns(pl.col(BYTE_COLUMNS).fill_null(0))
+    df = add_rolling_features(df, timestamp_column, can_id_column)
+    if profile is None:
+        return df.select(FEATURE_COLUMNS).cast(pl.Float64)
+    df = add_profile_deviations(df, profile, can_id_column, timestamp_column)
+    return df.select(PROFILE_FEATURE_COLUMNS).cast(pl.Float64)
+
+
+def model_kind(model):
+    """
+    Classify a model into one of the P99_LATENCY_TARGETS_US kinds.
+
+    Parameters
+    ----------
+    model : object
+        Fitted estimator.
+
+    Returns
+    -------
+    str
+        'decision_tree', 'compiled_tree' (a tree_arrays.TreeArrays), 'knn' or 'sklearn'.
+    """
+    if hasattr(model, "tree_") and hasattr(model, "classes_"):
+        return "decision_tree"
+    if hasattr(model, "predict_one"):
+        return "compiled_tree"
+    if hasattr(model, "kneighbors"):
+        return "knn"
+    return "sklearn"
+
+
+class OnlineDetector:
+    """
+    Frame-by-frame CAN classifier with per-ID state kept in preallocated ring buffers.
+
+    Parameters
+    ----------
+    model : object
+        Fitted estimator with a predict() method, trained on `feature_columns`.
+    feature_columns : list of str
+        Feature order the model was fitted on, each one must be in FEATURE_COLUMNS, or in
+        PROFILE_FEATURE_COLUMNS when a profile is given.
+    ring_size : int
+        Number of timestamps kept per CAN ID.
+    batch_size : int
+        Number of frames predicted together in micro-batching mode.
+    max_delay_ms : float
+        Maximum time a frame waits in the micro-batch before the batch is predicted.
+    profile : CanIdProfile, optional
+        Profile table used for the DEVIATION_COLUMNS features.
+    """
+
+    def __init__(
+        self,
+        model,
+        feature_columns=FEATURE_COLUMNS,
+        ring_size=RING_SIZE,
+        batch_size=DEFAULT_BATCH_SIZE,
+        max_delay_ms=DEFAULT_MAX_DELAY_MS,
+        profile=None,
+    ):
+        known_columns = FEATURE_COLUMNS if profile is None else PROFILE_FEATURE_COLUMNS
+        unknown_columns = [col for col in feature_columns if col not in known_columns]
+        if unknown_columns:
+            raise ValueError(
+                f"Unknown feature columns: {unknown_columns}, "
+                "DEVIATION_COLUMNS need a profile."
+            )
+
+        self.model = model
+        self.profile = profile
+        self.feature_columns = list(feature_columns)
+        self.ring_size = ring_size
+        self.batch_size = batch_size
+        self.max_delay_s = max_delay_ms / 1000
+
+        # Maps each position of the full feature row to the model's column order.
+        self._feature_index = np.array(
+            [PROFILE_FEATURE_COLUMNS.index(col) for col in self.feature_columns]
+        )
+        self._row = np.zeros(len(PROFILE_FEATURE_COLUMNS), dtype=np.float64)
+        self._timestamps = np.zeros((CAN_ID_SPACE, ring_size), dtype=np.float64)
+        self._heads = np.zeros(CAN_ID_SPACE, dtype=np.int64)
+        self._counts = np.zeros(CAN_ID_SPACE, dtype=np.int64)
+
+        self._batch = np.zeros(
+            (batch_size, len(self.feature_columns)), dtype=np.float64
+        )
+        self._batch_frames = []
+        self._batch_started_at = 0.0
+
+        # Flat node arrays of a decision tree, walked by classify() without predict().
+        # An exported TreeArrays walks its own arrays in predict_one().
+        self._compiled = model_kind(model) == "compiled_tree"
+        self._tree = None
+        if model_kind(model) == "decision_tree":
+            tree = model.tree_
+            self._tree = (
+                tree.children_left.tolist(),
+                tree.children_right.tolist(),
+                self._feature_index[np.maximum(tree.feature, 0)].tolist(),
+                tree.threshold.tolist(),
+                model.classes_[tree.value[:, 0].argmax(axis=1)].tolist(),
+            )
+
+    @classmethod
+    def from_artifact(cls, artifact_dir, **kwargs):
+        """
+        Create a detector from a model artifact saved with save_model_artifact().
+
+        Parameters
+        ----------
+        artifact_dir : str
+            Folder of the artifact.
+        **kwargs
+            batch_size and max_delay_ms, passed to the detector.
+
+        Returns
+        -------
+        OnlineDetector
+            Detector using the artifact's model, feature order, ring size and, if the artifact
+            has a profile_path, its CAN ID profile.
+
+        Raises
+        ------
+        ValueError
+            If a feature column of the artifact is not computed by the detector, see
+            validate_feature_columns().
+        """
+        model, manifest = load_model_artifact(artifact_dir)
+        params = manifest["preprocessing_params"]
+        ring_size = params.get("ring_size", RING_SIZE)
+        if params.get("profile_path") and "profile" not in kwargs:
+            kwargs["profile"] = load_profile(params["profile_path"])
+        validate_feature_columns(
+            manifest,
+            (
+                FEATURE_COLUMNS
+                if kwargs.get("profile") is None
+                else PROFILE_FEATURE_COLUMNS
+            ),
+        )
+        return cls(model, manifest["feature_columns"], ring_size=ring_size, **kwargs)
+
+    def clone(self):
+        """
+        Create a detector sharing this detector's model and profile, with empty per-ID state.
+
+        Returns
+        -------
+        OnlineDetector
+            The new detector.
+        """
+        return type(self)(
+            self.model,
+            self.feature_columns,
+            ring_size=self.ring_size,
+            batch_size=self.batch_size,
+            max_delay_ms=self.max_delay_s * 1000,
+            profile=self.profile,
+        )
+
+    def reset(self):
+        """Forget the per-ID state and drop the pending micro-batch."""
+        self._heads[:] = 0
+        self._counts[:] = 0
+        self._batch_frames = []
+
+    def update_state(self, frame):
+        """
+        Update the ring buffer of the frame's ID and build its full feature row.
+
+        Parameters
+        ----------
+        frame : dict
+            Frame with timestamp, can_id, dlc and byte_0 ... byte_7 keys.
+
+        Returns
+        -------
+        np.ndarray
+            Feature row in PROFILE_FEATURE_COLUMNS order, the DEVIATION_COLUMNS are only set
+            with a profile. The array is reused by the next call.
+        """
+        can_id = parse_hex(frame["can_id"])
+        if not 0 <= can_id < CAN_ID_SPACE:
+            raise ValueError(f"CAN ID {can_id:#x} is not an 11-bit identifier.")
+        timestamp = float(frame["timestamp"])
+
+        row = self._row
+        row[0] = can_id
+        row[1] = frame["dlc"]
+        for i, byte_column in enumerate(BYTE_COLUMNS):
+            row[2 + i] = parse_hex(frame.get(byte_column))
+
+        ring = self._timestamps[can_id]
+        head = self._heads[can_id]
+        count = self._counts[can_id]
+        if count:
+            row[10] = timestamp - ring[(head - 1) % self.ring_size]
+        else:
+            row[10] = 0.0
+
+        ring[head] = timestamp
+        count = min(count + 1, self.ring_size)
+        self._heads[can_id] = (head + 1) % self.ring_size
+        self._counts[can_id] = count
+
+        if count > 1:
+            oldest = ring[(head + 1 - count) % self.ring_size]
+            row[11] = (timestamp - oldest) / (count - 1)
+        else:
+            row[11] = 0.0
+
+        if self.profile is not None:
+            row[12:] = self.profile.frame_deviations(
+                can_id,
+                frame["dlc"],
+                row[2:10].tolist(),
+                row[10] if count > 1 else None,
+            )
+        return row
+
+    def classify(self, frame):
+        """
+        Classify a single frame immediately.
+
+        Parameters
+        ----------
+        frame : dict
+            Frame with timestamp, can_id, dlc and byte_0 ... byte_7 keys.
+
+        Returns
+        -------
+        object
+            The model's prediction for the frame.
+        """
+        row = self.update_state(frame)
+        if self._tree is not None:
+            return self._walk_tree(row)
+        if self._compiled:
+            return self.model.predict_one(row[self._feature_index])
+        features = row[self._feature_index].reshape(1, -1)
+        return self.model.predict(features)[0]
+
+    def _walk_tree(self, row):
+        children_left, children_right, feature, threshold, leaf_class = self._tree
+        # sklearn compares float32 features against the thresholds.
+        values = row.astype(np.float32).tolist()
+        node = 0
+        while children_left[node] != -1:
+            if values[feature[node]] <= threshold[node]:
+                node = children_left[node]
+            else:
+                node = children_right[node]
+        return leaf_class[node]
+
+    def push(self, frame):
+        """
+        Add a frame to the micro-batch, predicting the batch when it is due.
+
+        Parameters
+        ----------
+        frame : dict
+            Frame with timestamp, can_id, dlc and byte_0 ... byte_7 keys.
+
+        Returns
+        -------
+        list of tuple
+            (frame, prediction) pairs of the predicted batch, empty if the batch is not due yet.
+        """
+        row = self.update_state(frame)
+        position = len(self._batch_frames)
+        if position == 0:
+            self._batch_started_at = time.perf_counter()
+        self._batch[position] = row[self._feature_index]
+        self._batch_frames.append(frame)
+
+        if (
+            position + 1 == self.batch_size
+            or time.perf_counter() - self._batch_started_at >= self.max_delay_s
+        ):
+            return self.flush()
+        return []
+
+    def poll(self):
+        """
+        Predict the micro-batch if max_delay_ms has passed since its first frame.
+
+        push() only checks the delay when a frame arrives, callers that need a bounded delay
+        run poll() on a timer.
+
+        Returns
+        -------
+        list of tuple
+            (frame, prediction) pairs of the predicted batch, empty if the batch is not due yet.
+        """
+        if (
+            self._batch_frames
+            and time.perf_counter() - self._batch_started_at >= self.max_delay_s
+        ):
+            return self.flush()
+        return []
+
+    def batch_due_at(self):
+        """
+        Time poll() predicts the waiting micro-batch at.
+
+        Returns
+        -------
+        float or None
+            perf_counter() value in seconds, None if no frame is waiting.
+        """
+        if not self._batch_frames:
+            return None
+        return self._batch_started_at + self.max_delay_s
+
+    def flush(self):
+        """
+        Predict the frames waiting in the micro-batch.
+
+        Returns
+        -------
+        list of tuple
+            (frame, prediction) pairs of the predicted batch.
+        """
+        frames = self._batch_frames
+        if not frames:
+            return []
+        predictions = self.model.predict(self._batch[: len(frames)])
+        self._batch_frames = []
+        return list(zip(frames, predictions))
+
+    def classify_batch(self, frames):
+        """
+        Update the state with each frame in order and predict all of them with one model call.
+
+        Parameters
+        ----------
+        frames : iterable of dict
+            Frames with timestamp, can_id, dlc and byte_0 ... byte_7 keys.
+
+        Returns
+        -------
+        np.ndarray
+            The model's prediction for each frame.
+        """
+        features = np.array(
+            [self.update_state(frame)[self._feature_index] for frame in frames]
+        )
+        if len(features) == 0:
+            return np.empty(0)
+        return self.model.predict(features)
+
+
+def measure_latency(detector, frames, percentiles=(50, 99, 99.9)):
+    """
+    Measure the single-frame latency of a detector on a list of frames.
+
+    Parameters
+    ----------
+    detector : OnlineDetector
+        Detector to be measured, its state is updated by the frames.
+    frames : list of dict
+        Frames to classify one by one.
+    percentiles : tuple of float
+        Percentiles to report.
+
+    Returns
+    -------
+    dict
+        Latency in microseconds for each percentile, keyed as 'p50', 'p99' ..., the model's
+        p99 target and whether it is met.
+    """
+    latencies = np.empty(len(frames), dtype=np.float64)
+    for i, frame in enumerate(frames):
+        start = time.perf_counter_ns()
+        detector.classify(frame)
+        latencies[i] = (time.perf_counter_ns() - start) / 1000
+    report = {
+        f"p{percentile:g}": float(np.percentile(latencies, percentile))
+        for percentile in percentiles
+    }
+    target_us = P99_LATENCY_TARGETS_US[model_kind(detector.model)]
+    report["p99_target"] = target_us
+    report["meets_p99_target"] = bool(np.percentile(latencies, 99) <= target_us)
+    return report
@@ -0,0 +1,327 @@
+"""
+Workflow of the partitioned store
+1. write_store() splits every processed dataset of a paths group into hive-style partitions
+        store/dataset=<name>/updated_flag=<R|T>/time_bucket=<unix seconds>/part-0.parquet
+    1. updated_flag is the R (normal) / T (injected) flag, datasets without one (attack free)
+        are stored under R
+    2. time_bucket is the start of the TIME_BUCKET_SECONDS window the frames fall into
+    3. the partition keys live in the path only, the files hold the other columns
+2. the store keeps the column order and dtypes of every dataset and the size and mtime of the
+    CSV files it was built from in store.json, written last, a stale store is rebuilt
+3. scan_store() scans one dataset lazily with the hive schema given up front, so polars
+    prunes partitions from filter predicates on updated_flag and time_bucket before opening
+    any file: df.filter(pl.col("updated_flag") == "T") reads the injected partitions only
+4. scan_datasets() returns a lazy frame per dataset, from the store when it is up to date and
+    from the CSV files otherwise, divide_df() (preprocess_data_with_pandas.py) filters it on the
+    R / T flag before collecting. Filters on the encoded flag (return_only_attack_df()) don't
+    prune partitions, updated_flag is only a partition key before encoding
+
+Usage
+    python src/partitioned_store.py
+"""
+
+import json
+import os
+import shutil
+
+import polars as pl
+
+from utils import (
+    HEX_COLUMNS,
+    file_fingerprint,
+    load_data_paths,
+    parse_execution_profile_argument,
+    read_processed_csv,
+    select_execution_profile,
+)
+
+# ──────────────────────────────────────────────────────────────
+# 🛠️ Configuration Constants
+# ──────────────────────────────────────────────────────────────
+STORE_DIR_NAME = "store"
+STORE_VERSION = 1  # bump when the layout changes
+METADATA_FILE = "store.json"
+DATASET_COLUMN = "dataset"
+FLAG_COLUMN = "updated_flag"
+DEFAULT_FLAG = "R"
+TIME_BUCKET_COLUMN = "time_bucket"
+TIME_BUCKET_SECONDS = 3600
+TIMESTAMP_COLUMN = "timestamp"
+HIVE_SCHEMA = {
+    DATASET_COLUMN: pl.String,
+    FLAG_COLUMN: pl.String,
+    TIME_BUCKET_COLUMN: pl.Int64,
+}
+# ──────────────────────────────────────────────────────────────
+
+
+def get_store_dir(data_paths):
+    """
+    Folder of the partitioned store, next to the processed datasets.
+
+    Parameters
+    ----------
+    data_paths : dict
+        Dataset name to processed CSV path, as returned by load_data_paths().
+
+    Returns
+    -------
+    str
+        Path of the store folder.
+    """
+    first_path = next(iter(data_paths.values()))
+    return os.path.join(os.path.dirname(first_path), STORE_DIR_NAME)
+
+
+def time_bucket_expr(bucket_seconds=TIME_BUCKET_SECONDS):
+    """
+    Expression of the start of the time bucket of every frame.
+
+    Parameters
+    ----------
+    bucket_seconds : int
+        Length of a time bucket in seconds.
+
+    Returns
+    -------
+    pl.Expr
+        Int64 unix seconds, named TIME_BUCKET_COLUMN.
+    """
+    return (
+        (pl.col(TIMESTAMP_COLUMN) // bucket_seconds * bucket_seconds)
+        .cast(pl.Int64)
+        .alias(TIME_BUCKET_COLUMN)
+    )
+
+
+def write_dataset_partitions(df, dataset_dir, bucket_seconds=TIME_BUCKET_SECONDS):
+    """
+    Write one dataset as updated_flag / time_bucket partitions.
+
+    Parameters
+    ----------
+    df : pl.DataFrame
+        Processed frames.
+    dataset_dir : str
+        Folder of the dataset in the store, replaced if it exists.
+    bucket_seconds : int
+        Length of a time bucket in seconds.
+
+    Returns
+    -------
+    int
+        Number of partitions written.
+    """
+    if os.path.isdir(dataset_dir):
+        shutil.rmtree(dataset_dir)
+    flag = pl.col(FLAG_COLUMN) if FLAG_COLUMN in df.columns else pl.lit(DEFAULT_FLAG)
+    keyed = df.with_columns(
+        flag.alias(f"_{FLAG_COLUMN}"),
+        time_bucket_expr(bucket_seconds).alias(f"_{TIME_BUCKET_COLUMN}"),
+    )
+    partitions = keyed.partition_by(
+        [f"_{FLAG_COLUMN}", f"_{TIME_BUCKET_COLUMN}"], as_dict=True
+    )
+    for (flag_value, bucket), part in partitions.items():
+        partition_dir = os.path.join(
+            dataset_dir,
+            f"{FLAG_COLUMN}={flag_value}",
+            f"{TIME_BUCKET_COLUMN}={bucket}",
+        )
+        os.makedirs(partition_dir, exist_ok=True)
+        part.drop(
+            [f"_{FLAG_COLUMN}", f"_{TIME_BUCKET_COLUMN}", FLAG_COLUMN], strict=False
+        ).write_parquet(os.path.join(partition_dir, "part-0.parquet"))
+    return len(partitions)
+
+
+def write_store(paths_key="out_paths", bucket_seconds=TIME_BUCKET_SECONDS):
+    """
+    Build the partitioned store of every dataset of a paths group.
+
+    Parameters
+    ----------
+    paths_key : str
+        Paths group of the config, e.g. 'out_paths'.
+    bucket_seconds : int
+        Length of a time bucket in seconds.
+
+    Returns
+    -------
+    str
+        Path of the store folder.
+    """
+    data_paths = load_data_paths(paths_key)
+    store_dir = get_store_dir(data_paths)
+    metadata = {
+        "version": STORE_VERSION,
+        "bucket_seconds": bucket_seconds,
+        "sources": {},
+        "schemas": {},
+    }
+    for name, df_path in data_paths.items():
+        df = read_processed_csv(df_path)
+        dataset_dir = os.path.join(store_dir, f"{DATASET_COLUMN}={name}")
+        n_partitions = write_dataset_partitions(df, dataset_dir, bucket_seconds)
+        metadata["sources"][name] = file_fingerprint(df_path)
+        metadata["schemas"][name] = {
+            col: str(dtype) for col, dtype in df.schema.items()
+        }
+        print(f"{name}: {df.height} frames in {n_partitions} partitions")
+    # The metadata is written last, an interrupted run leaves a stale store and is redone.
+    with open(os.path.join(store_dir, METADATA_FILE), "w") as file:
+        json.dump(metadata, file, indent=2)
+    return store_dir
+
+
+def load_store_metadata(store_dir, data_paths=None):
+    """
+    Read the metadata of a store, checking it is up to date.
+
+    Parameters
+    ----------
+    store_dir : str
+        Path of the store folder.
+    data_paths : dict, optional
+        Dataset name to processed CSV path, the store is stale if one of them changed.
+
+    Returns
+    -------
+    dict or None
+        The metadata, None if the store is missing or stale.
+    """
+    metadata_path = os.path.join(store_dir, METADATA_FILE)
+    if not os.path.isfile(metadata_path):
+        return None
+    with open(metadata_path, "r") as file:
+        metadata = json.load(file)
+    if metadata.get("version") != STORE_VERSION:
+        return None
+    for name, df_path in (data_paths or {}).items():
+        if not os.path.isfile(df_path):
+            continue
+        if metadata["sources"].get(name) != file_fingerprint(df_path):
+            return None
+    return metadata
+
+
+def _scan_partitions(store_dir, dataset, metadata):
+    # Every file and hive column, the schemas are given so no file is opened to infer them.
+    if metadata is None or dataset not in metadata["schemas"]:
+        raise ValueError(f"Dataset '{dataset}' not found in store {store_dir}.")
+    schema = {
+        col: getattr(pl, dtype) for col, dtype in metadata["schemas"][dataset].items()
+    }
+    lf = pl.scan_parquet(
+        os.path.join(store_dir, f"{DATASET_COLUMN}={dataset}", "**", "*.parquet"),
+        hive_partitioning=True,
+        hive_schema=HIVE_SCHEMA,
+        schema={col: dtype for col, dtype in schema.items() if col != FLAG_COLUMN},
+    )
+    return lf, list(schema)
+
+
+def scan_store(store_dir, dataset, metadata=None):
+    """
+    Lazily scan one dataset of the store, filters on the partition keys prune partitions.
+
+    Parameters
+    ----------
+    store_dir : str
+        Path of the store folder.
+    dataset : str
+        Dataset name, e.g. 'dos_df'.
+    metadata : dict, optional
+        Metadata returned by load_store_metadata(), read from the store if not given.
+
+    Returns
+    -------
+    pl.LazyFrame
+        The dataset's columns in their original order, updated_flag is kept if the dataset
+        had it. Frames are grouped by partition, in their original order within one.
+
+    Raises
+    ------
+    ValueError
+        If the store or the dataset does not exist.
+    """
+    lf, columns = _scan_partitions(
+        store_dir, dataset, metadata or load_store_metadata(store_dir)
+    )
+    return lf.select(columns)
+
+
+def scan_time_range(store_dir, dataset, start=None, end=None, metadata=None):
+    """
+    Lazily scan the frames of a dataset in a time range, reading the overlapping buckets only.
+
+    Parameters
+    ----------
+    store_dir : str
+        Path of the store folder.
+    dataset : str
+        Dataset name.
+    start : float, optional
+        First timestamp in seconds, inclusive.
+    end : float, optional
+        Last timestamp in seconds, exclusive.
+    metadata : dict, optional
+        Metadata returned by load_store_metadata(), read from the store if not given.
+
+    Returns
+    -------
+    pl.LazyFrame
+        The frames in the range, columns as in scan_store().
+
+    Raises
+    ------
+    ValueError
+        If the store or the dataset does not exist.
+    """
+    metadata = metadata or load_store_metadata(store_dir)
+    lf, columns = _scan_partitions(store_dir, dataset, metadata)
+    bucket_seconds = metadata["bucket_seconds"]
+    if start is not None:
+        first_bucket = int(start // bucket_seconds * bucket_seconds)
+        lf = lf.filter(pl.col(TIME_BUCKET_COLUMN) >= first_bucket)
+        lf = lf.filter(pl.col(TIMESTAMP_COLUMN) >= start)
+    if end is not None:
+        lf = lf.filter(pl.col(TIME_BUCKET_COLUMN) < end)
+        lf = lf.filter(pl.col(TIMESTAMP_COLUMN) < end)
+    return lf.select(columns)
+
+
+def scan_datasets(paths_key="out_paths"):
+    """
+    Lazy frame of every dataset of a paths group, from the store when it is up to date.
+
+    Parameters
+    ----------
+    paths_key : str
+        Paths group of the config, e.g. 'out_paths'.
+
+    Returns
+    -------
+    dict
+        Dataset name to pl.LazyFrame. Filters on updated_flag prune the store's partitions,
+        without a store the CSV files are scanned with hex columns as str.
+    """
+    data_paths = load_data_paths(paths_key)
+    store_dir = get_store_dir(data_paths)
+    metadata = load_store_metadata(store_dir, data_paths)
+    if metadata is not None:
+        return {name: scan_store(store_dir, name, metadata) for name in data_paths}
+    return {
+        name: pl.scan_csv(
+            df_path, schema_overrides={col: pl.String for col in HEX_COLUMNS}
+        )
+        for name, df_path in data_paths.items()
+    }
+
+
+if __name__ == "__main__":
+    select_execution_profile(parse_execution_profile_argument())
+    store_dir = write_store("out_paths")
+    attack_only = scan_store(store_dir, "dos_df").filter(pl.col(FLAG_COLUMN) == "T")
+    print(attack_only.explain().splitlines()[0])
+    print(f"Injected dos frames: {attack_only.collect().height}")
@@ -0,0 +1,212 @@
+"""
+Workflow of the packed payload
+1. the payload bytes byte_0 ... byte_7 of a frame are packed into one UInt64
+    1. byte_0 is the most significant byte, so packed payloads sort like the hex strings
+    2. bytes beyond dlc are null in the loaders and are packed as 0, so a payload is
+        identified by (dlc, payload): dlc 2 '00 00' and dlc 8 '00 ... 00' both pack to 0
+2. payload_expr() / add_payload_column() pack polars byte columns, hex str or int
+3. unpack_payload_columns() restores byte_0 ... byte_7, hex str by default and null beyond dlc,
+    so unpacking a packed frame gives back the loader output
+4. pack_payload_array() / unpack_payload_array() do the same on numpy uint8 matrices through a
+    big-endian view of the same memory, without arithmetic
+5. payload equality, per-ID distinct counts (count_distinct_payloads()), lookups and joins
+    (add_payload_seen_column()) compare one integer instead of eight strings or a
+    concatenated message string
+"""
+
+import numpy as np
+import polars as pl
+
+# ──────────────────────────────────────────────────────────────
+# 🛠️ Configuration Constants
+# ──────────────────────────────────────────────────────────────
+MAX_DLC = 8
+BYTE_COLUMNS = [f"byte_{i}" for i in range(MAX_DLC)]
+PAYLOAD_COLUMN = "payload"
+PAYLOAD_KEY_COLUMNS = ["can_id", "dlc", PAYLOAD_COLUMN]
+HEX_BYTES = [f"{value:02x}" for value in range(256)]
+# ──────────────────────────────────────────────────────────────
+
+
+def payload_expr(schema, byte_columns=BYTE_COLUMNS):
+    """
+    Expression packing the byte columns into a UInt64 payload.
+
+    Parameters
+    ----------
+    schema : pl.Schema or dict
+        Schema of the frame, hex str byte columns are parsed, int ones are used directly.
+    byte_columns : list of str
+        Byte columns, byte_0 first. Missing columns are packed as 0.
+
+    Returns
+    -------
+    pl.Expr
+        UInt64 payload expression, named PAYLOAD_COLUMN.
+    """
+    packed = pl.lit(0, dtype=pl.UInt64)
+    for i, col in enumerate(byte_columns):
+        if col not in schema:
+            continue
+        value = pl.col(col)
+        if schema[col] == pl.String:
+            value = value.str.to_integer(base=16, strict=True)
+        shift = 8 * (MAX_DLC - 1 - i)
+        packed = packed + value.fill_null(0).cast(pl.UInt64) * pl.lit(
+            1 << shift, dtype=pl.UInt64
+        )
+    return packed.alias(PAYLOAD_COLUMN)
+
+
+def add_payload_column(df, drop_bytes=False):
+    """
+    Add the packed payload column to a frame.
+
+    Parameters
+    ----------
+    df : pl.DataFrame or pl.LazyFrame
+        Frames with byte columns, hex str or int.
+    drop_bytes : bool
+        Drop byte_0 ... byte_7 and keep only the payload and dlc.
+
+    Returns
+    -------
+    pl.DataFrame or pl.LazyFrame
+        The frame with the PAYLOAD_COLUMN.
+    """
+    schema = df.collect_schema()
+    df = df.with_columns(payload_expr(schema))
+    if drop_bytes:
+        df = df.drop([col for col in BYTE_COLUMNS if col in schema])
+    return df
+
+
+def unpack_payload_columns(df, dlc_column="dlc", hex_bytes=True):
+    """
+    Restore byte_0 ... byte_7 from the packed payload column.
+
+    Parameters
+    ----------
+    df : pl.DataFrame or pl.LazyFrame
+        Frames with PAYLOAD_COLUMN and dlc.
+    dlc_column : str
+        Name of the dlc column, bytes at and beyond dlc are null.
+    hex_bytes : bool
+        Return the bytes as two-digit lower-case hex str like the loaders, else as UInt8.
+
+    Returns
+    -------
+    pl.DataFrame or pl.LazyFrame
+        The frame with the byte columns.
+    """
+    byte_exprs = []
+    for i, col in enumerate(BYTE_COLUMNS):
+        shift = 8 * (MAX_DLC - 1 - i)
+        value = (
+            pl.col(PAYLOAD_COLUMN) // pl.lit(1 << shift, dtype=pl.UInt64)
+        ) % pl.lit(256, dtype=pl.UInt64)
+        value = value.cast(pl.UInt8)
+        if hex_bytes:
+            value = value.replace_strict(
+                list(range(256)), HEX_BYTES, return_dtype=pl.String
+            )
+        byte_exprs.append(
+            pl.when(pl.col(dlc_column) > i).then(value).otherwise(None).alias(col)
+        )
+    return df.with_columns(byte_exprs)
+
+
+def pack_payload_array(byte_matrix):
+    """
+    Pack a uint8 matrix of payload bytes into uint64 payloads.
+
+    Parameters
+    ----------
+    byte_matrix : np.ndarray
+        Shape (n, 8), byte_0 first, bytes beyond dlc set to 0.
+
+    Returns
+    -------
+    np.ndarray
+        uint64 payloads, the same values as payload_expr().
+    """
+    byte_matrix = np.ascontiguousarray(byte_matrix, dtype=np.uint8)
+    return byte_matrix.view(">u8").ravel().astype(np.uint64)
+
+
+def unpack_payload_array(payloads):
+    """
+    Unpack uint64 payloads into a uint8 matrix of payload bytes.
+
+    Parameters
+    ----------
+    payloads : np.ndarray
+        uint64 payloads.
+
+    Returns
+    -------
+    np.ndarray
+        Shape (n, 8), byte_0 first.
+    """
+    return np.asarray(payloads, dtype=">u8").view(np.uint8).reshape(-1, MAX_DLC)
+
+
+def count_distinct_payloads(df, can_id_column="can_id", dlc_column="dlc"):
+    """
+    Number of distinct payloads of every CAN ID.
+
+    Parameters
+    ----------
+    df : pl.DataFrame or pl.LazyFrame
+        Frames with PAYLOAD_COLUMN, see add_payload_column().
+    can_id_column : str
+        Name of the CAN ID column.
+    dlc_column : str
+        Name of the dlc column, payloads with another dlc are different payloads.
+
+    Returns
+    -------
+    pl.DataFrame
+        can_id, frames and distinct_payloads, sorted by can_id.
+    """
+    return (
+        df.lazy()
+        .group_by(can_id_column, dlc_column, PAYLOAD_COLUMN)
+        .agg(pl.len().alias("frames"))
+        .group_by(can_id_column)
+        .agg(pl.col("frames").sum(), pl.len().alias("distinct_payloads"))
+        .sort(can_id_column)
+        .collect()
+    )
+
+
+def add_payload_seen_column(df, reference_df, column_name="payload_seen"):
+    """
+    Flag the frames whose (can_id, dlc, payload) appears in a reference capture.
+
+    Parameters
+    ----------
+    df : pl.DataFrame or pl.LazyFrame
+        Frames with PAYLOAD_KEY_COLUMNS.
+    reference_df : pl.DataFrame or pl.LazyFrame
+        Reference frames with PAYLOAD_KEY_COLUMNS, e.g. attack free traffic.
+    column_name : str
+        Name of the boolean column.
+
+    Returns
+    -------
+    pl.DataFrame or pl.LazyFrame
+        The frame with the boolean column, rows in their original order.
+    """
+    seen = (
+        reference_df.lazy()
+        .select(PAYLOAD_KEY_COLUMNS)
+        .unique()
+        .with_columns(pl.lit(True).alias(column_name))
+    )
+    joined = (
+        df.lazy()
+        .join(seen, on=PAYLOAD_KEY_COLUMNS, how="left", maintain_order="left")
+        .with_columns(pl.col(column_name).fill_null(False))
+    )
+    return joined.collect() if isinstance(df, pl.DataFrame) else joined
@@ -1,7 +1,13 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
-from utils import load_data
+from partitioned_store import scan_datasets
+from utils import (
+    filter_by_value,
+    parse_execution_profile_argument,
+    select_execution_profile,
+    to_backend,
+)
 
 # ──────────────────────────────────────────────────────────────
 # 🛠️ Configuration Constants
@@ -10,7 +16,6 @@ DLC_COLUMN = "dlc"
 FRAME_TYPE_COLUMN = "frame_type"
 FILTER_COLUMN = "updated_flag"
 STRATIFIED_COLUMN = "dlc"
-RANDOM_SAMPLE_SIZE = 40000
 STRATIFIED_ATTACK_FREE_FRACTION = 0.02
 STRATIFIED_ATTACK_FREE_INSIDE_DOS_FRACTION = 0.003
 STRATIFIED_ATTACK_FREE_INSIDE_FUZZY_FRACTION = 0.003
@@ -47,8 +52,9 @@ def divide_df(df, column_name, column_value):
 
     Parameters
     ----------
-    df : pd.DataFrame
-        The input DataFrame to be filtered.
+    df : pd.DataFrame or pl.LazyFrame
+        The input DataFrame to be filtered. A scan of the partitioned store only reads the
+        partitions matching the value.
     column_name : str
         The name of column to apply to filter on.
     column_value : str
@@ -59,7 +65,7 @@ def divide_df(df, column_name, column_value):
     pd.DataFrame
         A filtered dataframe.
     """
-    return df[df[column_name] == column_value]
+    return filter_by_value(df, column_name, column_value, backend="pandas")
 
 
 def delete_columns_or_noisy_data(
@@ -342,12 +348,15 @@ def insert_columns(dfs_dict, updated_flag_column, attack_type_column):
 
 
 def main():
+    profile = select_execution_profile(parse_execution_profile_argument())
+
     print("Loading data!")
-    dfs_dict = load_data("out_paths", backend="pandas")
+    # Lazy scans, divide_df() only reads the flag's partitions when the store is built.
+    dfs_dict = scan_datasets("out_paths")
 
     dos_df = dfs_dict["dos_df"]
     fuzzy_df = dfs_dict["fuzzy_df"]
-    attack_free_df = dfs_dict["attack_free_df"]
+    attack_free_df = to_backend(dfs_dict["attack_free_df"], "pandas")
 
     # T represents injected message!
     # R represents normal message!
@@ -373,7 +382,7 @@ def main():
     print("Sampling data!")
     sampled_dfs_dict = sample_data(
         dfs_dict,
-        RANDOM_SAMPLE_SIZE,
+        profile["random_sample_size"],
         STRATIFIED_ATTACK_FREE_FRACTION,
         STRATIFIED_ATTACK_FREE_INSIDE_DOS_FRACTION,
         STRATIFIED_ATTACK_FREE_INSIDE_FUZZY_FRACTION,
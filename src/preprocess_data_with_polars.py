@@ -1,5 +1,13 @@
 import polars as pl
-from utils import load_data_paths, drop_columns, read_datasets, save_df_to_csv
+from payload import PAYLOAD_COLUMN, add_payload_column
+from utils import (
+    load_data_paths,
+    drop_columns,
+    read_datasets,
+    save_df_to_csv,
+    parse_execution_profile_argument,
+    select_execution_profile,
+)
 
 
 def validate_column_in_dataframe(df, column_name):
@@ -214,6 +222,9 @@ def merge_byte_columns(df, existing_column_name, new_column_name):
     """
     Combine byte0...byte7 columns that represent message parts to one column which directly name is message.
 
+    The message is a str per frame, add_multiple_dfs_payload_column() keeps the same
+    information as one UInt64 and is the faster choice for comparisons, dedup and joins.
+
     Parameters
     ----------
     df : pl.DataFrame
@@ -264,6 +275,23 @@ def merge_multiple_dfs_bytes_to_message_column(
     return [merge_byte_columns(df, existing_column_name, new_column_name) for df in dfs]
 
 
+def add_multiple_dfs_payload_column(dfs):
+    """
+    Add the packed UInt64 payload column (byte_0 most significant) to multiple DataFrames.
+
+    Parameters
+    ----------
+    dfs : list
+        List of DataFrame with byte columns, hex str or int.
+
+    Returns
+    -------
+    list
+        List of DataFrames with the payload column, see payload.add_payload_column().
+    """
+    return [add_payload_column(df) for df in dfs]
+
+
 def convert_data_types(dfs):
     """
     Convert some columns into another formats such as timestamp to datetime, string can_id in hex format into int can_id,
@@ -473,6 +501,7 @@ def encode_features(dfs):
 
 
 if __name__ == "__main__":
+    select_execution_profile(parse_execution_profile_argument())
 
     print("Loading dataset paths!")
 
@@ -491,6 +520,9 @@ if __name__ == "__main__":
 
     print("Adding new features!")
     dos_df, fuzzy_df, attack_free_df = add_features(converted_data_types_dfs)
+    dos_df, fuzzy_df, attack_free_df = add_multiple_dfs_payload_column(
+        [dos_df, fuzzy_df, attack_free_df]
+    )
 
     print("Dropping unused features!")
     dos_df, fuzzy_df, attack_free_df = drop_features([dos_df, fuzzy_df, attack_free_df])
@@ -498,7 +530,7 @@ if __name__ == "__main__":
     specific_order = (
         ["can_id", "timestamp", "datetime", "dlc"]
         + [f"byte_{i}" for i in range(max_dlc_number)]
-        + ["updated_flag"]
+        + [PAYLOAD_COLUMN, "updated_flag"]
     )
 
     print("Swapping feature orders.")
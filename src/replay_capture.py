@@ -0,0 +1,233 @@
+"""
+Workflow of capture replay
+1. a processed capture (dos_df, fuzzy_df or attack_free_df output) is read and sorted by timestamp
+2. frames are emitted into a detector on a schedule
+    1. speed 1: at their original timestamp spacing
+    2. speed N: N times faster than the original spacing
+    3. speed 0: as fast as possible
+3. when the detector falls behind by more than max_lag_ms, frames are dropped, like a bounded
+    receive buffer on a real node would
+4. for every frame the end-to-end latency (from its scheduled emit time to its prediction) is
+    recorded, including the time it waited in a micro-batch
+    1. in micro-batching mode detector.poll() runs around every wait, a partial batch is
+        predicted when its max_delay_ms is up rather than when the next frame arrives
+5. the report holds latency percentiles, a log-scale latency histogram, dropped frames and the
+    sustained frames/sec
+
+Usage
+    python src/replay_capture.py --model models/dos_model --input output/dos_df.csv --speed 10
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from online_detector import OnlineDetector
+from utils import (
+    add_execution_profile_argument,
+    read_processed_csv,
+    select_execution_profile,
+)
+
+# ──────────────────────────────────────────────────────────────
+# 🛠️ Configuration Constants
+# ──────────────────────────────────────────────────────────────
+DEFAULT_SPEED = 1.0
+DEFAULT_MAX_LAG_MS = 100.0
+SPIN_THRESHOLD_S = 0.001  # shorter waits are busy-waited instead of slept
+LATENCY_BINS_US = np.logspace(0, 7, 57)  # 1 µs ... 10 s
+LATENCY_PERCENTILES = (50, 90, 99, 99.9)
+# ──────────────────────────────────────────────────────────────
+
+
+def read_processed_capture(input_path):
+    """
+    Read a processed capture sorted by timestamp.
+
+    Frames stay in the columnar DataFrame, replay() builds one dict per frame while it
+    iterates, so a 9M row capture is not held as 9M dicts.
+
+    Parameters
+    ----------
+    input_path : str
+        Path to a processed CSV file.
+
+    Returns
+    -------
+    pl.DataFrame
+        Frames with the loader columns.
+    """
+    return read_processed_csv(input_path).sort("timestamp")
+
+
+def wait_until(due):
+    """
+    Wait until the perf_counter() clock reaches `due`.
+
+    Parameters
+    ----------
+    due : float
+        Target perf_counter() value in seconds.
+    """
+    remaining = due - time.perf_counter()
+    if remaining > SPIN_THRESHOLD_S:
+        time.sleep(remaining - SPIN_THRESHOLD_S)
+    while time.perf_counter() < due:
+        pass
+
+
+def summarize_latencies(latencies_us):
+    """
+    Summarize latencies into percentiles and a log-scale histogram.
+
+    Parameters
+    ----------
+    latencies_us : np.ndarray
+        End-to-end latency of each processed frame in microseconds.
+
+    Returns
+    -------
+    dict
+        Percentiles keyed as 'p50', 'p99' ... and the histogram bin edges and counts.
+    """
+    if len(latencies_us) == 0:
+        return {"percentiles_us": {}, "histogram": {"bin_edges_us": [], "counts": []}}
+    counts, bin_edges = np.histogram(latencies_us, bins=LATENCY_BINS_US)
+    return {
+        "percentiles_us": {
+            f"p{percentile:g}": float(np.percentile(latencies_us, percentile))
+            for percentile in LATENCY_PERCENTILES
+        },
+        "histogram": {"bin_edges_us": bin_edges.tolist(), "counts": counts.tolist()},
+    }
+
+
+def replay(
+    frames,
+    detector,
+    speed=DEFAULT_SPEED,
+    max_lag_ms=DEFAULT_MAX_LAG_MS,
+    micro_batch=False,
+):
+    """
+    Replay frames into a detector and measure latency, drops and throughput.
+
+    Parameters
+    ----------
+    frames : pl.DataFrame
+        Frames sorted by timestamp, as returned by read_processed_capture().
+    detector : OnlineDetector
+        Detector receiving the frames.
+    speed : float
+        Replay speed relative to the original spacing, 0 replays as fast as possible.
+    max_lag_ms : float
+        Frames whose emit time is already this late are dropped. Not used with speed 0.
+    micro_batch : bool
+        Use detector.push() instead of detector.classify().
+
+    Returns
+    -------
+    dict
+        Replay report.
+    """
+    latencies_us = np.empty(frames.height, dtype=np.float64)
+    processed = 0
+    dropped = 0
+    pending_due = []
+    max_lag_s = max_lag_ms / 1000
+    first_timestamp = frames["timestamp"][0] if frames.height else 0.0
+
+    def record(results):
+        nonlocal processed
+        if results:
+            done = time.perf_counter()
+            for result_due in pending_due[: len(results)]:
+                latencies_us[processed] = (done - result_due) * 1e6
+                processed += 1
+            del pending_due[: len(results)]
+
+    start = time.perf_counter()
+    for frame in frames.iter_rows(named=True):
+        if micro_batch:
+            record(detector.poll())
+        if speed > 0:
+            due = start + (frame["timestamp"] - first_timestamp) / speed
+            if time.perf_counter() - due > max_lag_s:
+                dropped += 1
+                continue
+            batch_due = detector.batch_due_at() if micro_batch else None
+            if batch_due is not None and batch_due < due:
+                wait_until(batch_due)
+                record(detector.poll())
+            wait_until(due)
+            if micro_batch:
+                record(detector.poll())
+        else:
+            due = time.perf_counter()
+
+        if not micro_batch:
+            detector.classify(frame)
+            latencies_us[processed] = (time.perf_counter() - due) * 1e6
+            processed += 1
+            continue
+
+        pending_due.append(due)
+        record(detector.push(frame))
+
+    if micro_batch:
+        record(detector.flush())
+    elapsed = time.perf_counter() - start
+
+    report = {
+        "frames": frames.height,
+        "processed": processed,
+        "dropped": dropped,
+        "speed": speed,
+        "micro_batch": micro_batch,
+        "elapsed_seconds": elapsed,
+        "sustained_frames_per_second": processed / elapsed if elapsed else None,
+    }
+    report.update(summarize_latencies(latencies_us[:processed]))
+    return report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Replay a processed CAN capture into the online detector."
+    )
+    parser.add_argument("--model", required=True, help="Folder of the model artifact.")
+    parser.add_argument("--input", required=True, help="Path to a processed capture.")
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=DEFAULT_SPEED,
+        help="Replay speed, 1 is real time and 0 is as fast as possible.",
+    )
+    parser.add_argument("--max-lag-ms", type=float, default=DEFAULT_MAX_LAG_MS)
+    parser.add_argument("--micro-batch", action="store_true")
+    parser.add_argument("--report", default=None, help="Path of the json report.")
+    add_execution_profile_argument(parser)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    profile = select_execution_profile(args.execution_profile)
+    print(f"Reading {args.input}...")
+    frames = read_processed_capture(args.input)
+    detector = OnlineDetector.from_artifact(
+        args.model, batch_size=profile["batch_size"]
+    )
+
+    print(f"Replaying {frames.height} frames at speed {args.speed}...")
+    report = replay(frames, detector, args.speed, args.max_lag_ms, args.micro_batch)
+    print(
+        f"Processed {report['processed']} frames, dropped {report['dropped']}, "
+        f"{report['sustained_frames_per_second']:.0f} frames/sec, "
+        f"latency {report['percentiles_us']}"
+    )
+    if args.report:
+        with open(args.report, "w") as file:
+            json.dump(report, file, indent=2)
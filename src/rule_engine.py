@@ -0,0 +1,195 @@
+"""
+Workflow of the rule engine
+1. rules are written in the 'rules' section of config.yaml and loaded with OmegaConf
+    1. deny_ids: IDs that are always injected
+    2. allow_ids: if not empty, IDs outside this list are flagged
+    3. expected_dlc: frames whose DLC differs from the expected DLC of their ID are flagged
+    4. rate_limits: a frame is flagged when more than max_frames frames of its ID arrived in
+        the sliding window_ms ending at the frame, so only the excess frames of a burst are
+        flagged, can_id "*" applies the limit to every ID separately
+2. compile_rules() turns each rule into one polars expression
+3. apply_rules() evaluates all expressions on a whole batch at once
+    1. rule_verdict is the attack label for flagged frames and null for the rest
+    2. rule_name is the first rule that flagged the frame
+4. only frames with a null rule_verdict need to go to the classifier
+"""
+
+import polars as pl
+from omegaconf import OmegaConf
+
+from timeline import timestamp_us_expr, window_count_expr
+from utils import load_config
+
+# ──────────────────────────────────────────────────────────────
+# 🛠️ Configuration Constants
+# ──────────────────────────────────────────────────────────────
+RULE_VERDICT_COLUMN = "rule_verdict"
+RULE_NAME_COLUMN = "rule_name"
+DEFAULT_ATTACK_LABEL = 1
+WILDCARD_ID = "*"
+# ──────────────────────────────────────────────────────────────
+
+
+def load_rules(config_path=None):
+    """
+    Load the 'rules' section of config.yaml.
+
+    Parameters
+    ----------
+    config_path : str, optional
+        Path to the config file, by default config.yaml in the working directory.
+
+    Returns
+    -------
+    dict
+        The rules as plain python containers.
+
+    Raises
+    ------
+    ValueError
+        If the config file has no 'rules' section.
+    """
+    config = load_config(config_path)
+    if "rules" not in config:
+        raise ValueError(f"No 'rules' section found in {config_path or 'config.yaml'}.")
+    return OmegaConf.to_container(config["rules"], resolve=True)
+
+
+def parse_can_ids(can_ids):
+    """
+    Convert hex CAN IDs written in the config into int.
+
+    Parameters
+    ----------
+    can_ids : list of str
+        Hex CAN IDs such as '0316'.
+
+    Returns
+    -------
+    list of int
+        CAN IDs as int.
+    """
+    return [int(str(can_id), 16) for can_id in can_ids]
+
+
+def compile_rate_limit(rate_limit, can_id_column, timestamp_column):
+    """
+    Compile a rate limit into an expression flagging frames above the limit.
+
+    The window slides with every frame, it holds the frames of the same ID in
+    (timestamp - window_ms, timestamp]. Frames must be sorted by timestamp. The window is
+    evaluated on integer microseconds, so frames exactly window_ms apart are never counted
+    in or out by float rounding.
+
+    Parameters
+    ----------
+    rate_limit : dict
+        Rate limit with can_id, window_ms and max_frames keys.
+    can_id_column : str
+        Name of the int CAN ID column.
+    timestamp_column : str
+        Name of the float timestamp column in seconds.
+
+    Returns
+    -------
+    pl.Expr
+        Boolean expression, True for frames above the limit.
+    """
+    timestamp_us = timestamp_us_expr(pl.Float64, timestamp_column)
+    window_us = round(rate_limit["window_ms"] * 1000)
+    frames_in_window = window_count_expr(window_us, can_id_column, timestamp_us)
+    above_limit = frames_in_window > rate_limit["max_frames"]
+    if str(rate_limit["can_id"]) == WILDCARD_ID:
+        return above_limit
+    can_id = parse_can_ids([rate_limit["can_id"]])[0]
+    return (pl.col(can_id_column) == can_id) & above_limit
+
+
+def compile_rules(rules, can_id_column="can_id", timestamp_column="timestamp"):
+    """
+    Compile rules into named polars expressions.
+
+    Parameters
+    ----------
+    rules : dict
+        Rules returned by load_rules().
+    can_id_column : str
+        Name of the int CAN ID column.
+    timestamp_column : str
+        Name of the float timestamp column in seconds.
+
+    Returns
+    -------
+    list of tuple
+        (rule_name, expression) pairs, each expression is True for flagged frames.
+    """
+    compiled_rules = []
+    can_id = pl.col(can_id_column)
+
+    deny_ids = parse_can_ids(rules.get("deny_ids") or [])
+    if deny_ids:
+        compiled_rules.append(("deny_id", can_id.is_in(deny_ids)))
+
+    allow_ids = parse_can_ids(rules.get("allow_ids") or [])
+    if allow_ids:
+        compiled_rules.append(("unknown_id", ~can_id.is_in(allow_ids)))
+
+    expected_dlc = {
+        parse_can_ids([key])[0]: int(value)
+        for key, value in (rules.get("expected_dlc") or {}).items()
+    }
+    if expected_dlc:
+        expected = can_id.replace_strict(
+            expected_dlc, default=None, return_dtype=pl.Int64
+        )
+        compiled_rules.append(
+            ("unexpected_dlc", expected.is_not_null() & (pl.col("dlc") != expected))
+        )
+
+    for rate_limit in rules.get("rate_limits") or []:
+        rule_name = f"rate_limit_{rate_limit['can_id']}_{rate_limit['window_ms']}ms"
+        compiled_rules.append(
+            (rule_name, compile_rate_limit(rate_limit, can_id_column, timestamp_column))
+        )
+    return compiled_rules
+
+
+def apply_rules(
+    df, compiled_rules, attack_label=DEFAULT_ATTACK_LABEL, can_id_column="can_id"
+):
+    """
+    Evaluate compiled rules on a whole batch.
+
+    Parameters
+    ----------
+    df : pl.DataFrame
+        Frames sorted by timestamp with can_id (hex str or int), dlc and timestamp columns.
+    compiled_rules : list of tuple
+        Rules returned by compile_rules().
+    attack_label : int
+        Verdict given to flagged frames.
+    can_id_column : str
+        Name of the CAN ID column.
+
+    Returns
+    -------
+    pl.DataFrame
+        DataFrame with newly added rule_verdict and rule_name columns.
+    """
+    if df.schema[can_id_column] == pl.String:
+        rule_df = df.with_columns(pl.col(can_id_column).str.to_integer(base=16))
+    else:
+        rule_df = df
+
+    rule_name = pl.lit(None, dtype=pl.String)
+    for name, expression in reversed(compiled_rules):
+        rule_name = pl.when(expression).then(pl.lit(name)).otherwise(rule_name)
+
+    verdicts = rule_df.select(rule_name.alias(RULE_NAME_COLUMN))
+    return df.with_columns(
+        verdicts[RULE_NAME_COLUMN],
+        pl.when(verdicts[RULE_NAME_COLUMN].is_not_null())
+        .then(attack_label)
+        .otherwise(None)
+        .alias(RULE_VERDICT_COLUMN),
+    )
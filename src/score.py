@@ -0,0 +1,353 @@
+"""
+Workflow of batch scoring
+1. a raw capture is read like process_csv() / process_txt() read it
+    1. every frame is validated (validate_capture()), frames failing a check are written to
+        the quarantine folder of the output folder with their reason codes
+    2. csv (DoS / Fuzzy): the dlc-flag issue is fixed (fix_dos_and_fuzzy_frames())
+    3. txt (attack free): the timestamp and DLC are cast to numbers
+2. the frames are sorted by timestamp and the features are built with prepare_feature_frame()
+    1. with a CAN ID profile (--profile, or the artifact's profile_path) the deviation columns
+        are added too, the model may use them and they are written to the predictions
+3. optionally the rules in config.yaml are applied to the whole capture first
+    (apply_rules()), frames they flag skip the model
+4. the remaining feature matrix is split into large chunks that are scored by a pool of worker
+    processes, each worker loads the model once
+5. per-frame predictions (csv or parquet, the execution profile's output_format) and an
+    alert summary (json) are written to the output folder
+
+Usage
+    python src/score.py --model models/dos_model --input input/dos_dataset.csv --output output/scores
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import polars as pl
+
+from frame_validation import save_quarantine, validate_capture
+from load_data_with_polars import (
+    ATTACK_FREE_COLUMN_NAMES,
+    DOS_AND_FUZZY_COLUMN_NAMES,
+    EXISTING_DLC_COLUMN_NAME,
+    EXISTING_FLAG_COLUMN_NAME,
+    NEW_FLAG_COLUMN_NAME,
+    fix_dos_and_fuzzy_frames,
+)
+from model_artifact import (
+    load_manifest,
+    load_model_artifact,
+    validate_feature_columns,
+)
+from can_id_profile import DEVIATION_COLUMNS, load_profile
+from online_detector import (
+    FEATURE_COLUMNS,
+    PROFILE_FEATURE_COLUMNS,
+    prepare_feature_frame,
+)
+from rule_engine import (
+    DEFAULT_ATTACK_LABEL,
+    RULE_NAME_COLUMN,
+    RULE_VERDICT_COLUMN,
+    apply_rules,
+    compile_rules,
+    load_rules,
+)
+from utils import add_execution_profile_argument, select_execution_profile
+
+# ──────────────────────────────────────────────────────────────
+# 🛠️ Configuration Constants
+# ──────────────────────────────────────────────────────────────
+PREDICTION_COLUMN = "prediction"
+NORMAL_LABEL = 0
+CHUNK_SIZE = 1_000_000
+TOP_ALERT_IDS = 10
+# ──────────────────────────────────────────────────────────────
+
+_worker_model = None
+
+
+def detect_capture_format(input_path):
+    """
+    Detect the capture format from the file extension.
+
+    Parameters
+    ----------
+    input_path : str
+        Path to the raw capture.
+
+    Returns
+    -------
+    str
+        'txt' for candump style text captures, 'csv' otherwise.
+    """
+    return "txt" if input_path.lower().endswith(".txt") else "csv"
+
+
+def read_capture(input_path, capture_format, output_dir):
+    """
+    Read a raw capture and apply the same cleaning steps as load_data_with_polars.
+
+    Parameters
+    ----------
+    input_path : str
+        Path to the raw capture.
+    capture_format : str
+        Either 'csv' (DoS / Fuzzy) or 'txt' (attack free).
+    output_dir : str
+        Output folder, quarantined frames are written to its quarantine folder as
+        <capture name>.csv.
+
+    Returns
+    -------
+    pl.DataFrame
+        Cleaned capture sorted by timestamp.
+
+    Raises
+    ------
+    ValueError
+        If the capture format is invalid.
+    """
+    column_names = (
+        DOS_AND_FUZZY_COLUMN_NAMES
+        if capture_format == "csv"
+        else ATTACK_FREE_COLUMN_NAMES
+    )
+    df, quarantine = validate_capture(input_path, capture_format, column_names)
+    capture_name = os.path.splitext(os.path.basename(input_path))[0]
+    save_quarantine(quarantine, os.path.join(output_dir, f"{capture_name}.csv"))
+    if capture_format == "csv":
+        df = fix_dos_and_fuzzy_frames(
+            df,
+            EXISTING_DLC_COLUMN_NAME,
+            EXISTING_FLAG_COLUMN_NAME,
+            NEW_FLAG_COLUMN_NAME,
+        )
+    else:
+        df = df.with_columns(
+            pl.col("timestamp").cast(pl.Float64), pl.col("dlc").cast(pl.Int64)
+        )
+    return df.sort("timestamp")
+
+
+def _init_worker(model_path):
+    global _worker_model
+    # Arrays are memory-mapped, so all workers share one copy of the model in page cache.
+    _worker_model, _ = load_model_artifact(model_path)
+
+
+def _score_chunk(features):
+    return _worker_model.predict(features)
+
+
+def score_features(features, model_path, n_workers, chunk_size=CHUNK_SIZE):
+    """
+    Score a feature matrix in chunks across a pool of worker processes.
+
+    Parameters
+    ----------
+    features : np.ndarray
+        Feature matrix in the artifact's feature column order.
+    model_path : str
+        Folder of the model artifact, loaded once by each worker.
+    n_workers : int
+        Number of worker processes. With 1 the chunks are scored in this process.
+    chunk_size : int
+        Number of frames per chunk.
+
+    Returns
+    -------
+    np.ndarray
+        Prediction of each frame.
+    """
+    chunks = [features[i : i + chunk_size] for i in range(0, len(features), chunk_size)]
+    if not chunks:
+        return np.empty(0)
+    if n_workers == 1:
+        _init_worker(model_path)
+        return np.concatenate([_score_chunk(chunk) for chunk in chunks])
+
+    with ProcessPoolExecutor(
+        max_workers=n_workers, initializer=_init_worker, initargs=(model_path,)
+    ) as executor:
+        return np.concatenate(list(executor.map(_score_chunk, chunks)))
+
+
+def summarize_alerts(df, elapsed_seconds):
+    """
+    Summarize the frames predicted as attacks.
+
+    Parameters
+    ----------
+    df : pl.DataFrame
+        Scored capture with timestamp, can_id and prediction columns.
+    elapsed_seconds : float
+        Wall-clock time of the scoring run.
+
+    Returns
+    -------
+    dict
+        Alert summary that can be written as json.
+    """
+    alerts = df.filter(pl.col(PREDICTION_COLUMN) != NORMAL_LABEL)
+    prediction_counts = df[PREDICTION_COLUMN].value_counts(sort=True)
+    top_ids = alerts["can_id"].value_counts(sort=True).head(TOP_ALERT_IDS)
+    return {
+        "frames": df.height,
+        "alerts": alerts.height,
+        "alert_ratio": alerts.height / df.height if df.height else 0.0,
+        "predictions": {
+            str(value): count for value, count in prediction_counts.iter_rows()
+        },
+        "top_alert_can_ids": {
+            str(can_id): count for can_id, count in top_ids.iter_rows()
+        },
+        "first_alert_timestamp": alerts["timestamp"].min() if alerts.height else None,
+        "last_alert_timestamp": alerts["timestamp"].max() if alerts.height else None,
+        "elapsed_seconds": elapsed_seconds,
+        "frames_per_second": df.height / elapsed_seconds if elapsed_seconds else None,
+    }
+
+
+def score_capture(
+    input_path,
+    model_path,
+    output_dir,
+    capture_format=None,
+    n_workers=None,
+    rules=None,
+    profile=None,
+    output_format="csv",
+):
+    """
+    Score a whole capture and write per-frame predictions and the alert summary.
+
+    Parameters
+    ----------
+    input_path : str
+        Path to the raw capture.
+    model_path : str
+        Folder of the model artifact saved with save_model_artifact().
+    output_dir : str
+        Folder where the predictions and alert_summary.json are saved.
+    capture_format : str, optional
+        Either 'csv' or 'txt', detected from the file extension by default.
+    n_workers : int, optional
+        Number of worker processes, by default the number of CPUs.
+    rules : dict, optional
+        Rules returned by load_rules(), applied before the model. By default every frame
+        goes to the model.
+    profile : CanIdProfile, optional
+        CAN ID profile, by default the one at the artifact's profile_path if it has one.
+    output_format : str
+        Format of the predictions file, 'csv' or 'parquet'.
+
+    Returns
+    -------
+    dict
+        The alert summary.
+    """
+    if output_format not in ("csv", "parquet"):
+        raise ValueError("Invalid output_format! Use 'csv' or 'parquet'.")
+    start = time.perf_counter()
+    capture_format = capture_format or detect_capture_format(input_path)
+    n_workers = n_workers or os.cpu_count()
+    manifest = load_manifest(model_path)
+    feature_columns = manifest["feature_columns"]
+    profile_path = manifest["preprocessing_params"].get("profile_path")
+    if profile is None and profile_path:
+        profile = load_profile(profile_path)
+    validate_feature_columns(
+        manifest, FEATURE_COLUMNS if profile is None else PROFILE_FEATURE_COLUMNS
+    )
+
+    print(f"Reading {input_path}...")
+    df = read_capture(input_path, capture_format, output_dir)
+    feature_df = prepare_feature_frame(df, profile=profile)
+    features = feature_df.select(feature_columns).to_numpy()
+    output_columns = ["timestamp", "can_id", RULE_NAME_COLUMN]
+    if profile is not None:
+        df = df.with_columns(feature_df.select(DEVIATION_COLUMNS).cast(pl.Int64))
+        output_columns += DEVIATION_COLUMNS
+
+    if rules is not None:
+        attack_label = rules.get("attack_label", DEFAULT_ATTACK_LABEL)
+        df = apply_rules(df, compile_rules(rules), attack_label)
+        verdicts = df[RULE_VERDICT_COLUMN].fill_null(NORMAL_LABEL).to_numpy()
+        ambiguous = df[RULE_VERDICT_COLUMN].is_null().to_numpy()
+        print(f"Rules flagged {int((~ambiguous).sum())} frames!")
+    else:
+        df = df.with_columns(pl.lit(None, dtype=pl.String).alias(RULE_NAME_COLUMN))
+        verdicts = np.full(len(features), NORMAL_LABEL)
+        ambiguous = np.ones(len(features), dtype=bool)
+
+    print(f"Scoring {int(ambiguous.sum())} frames with {n_workers} workers...")
+    if ambiguous.any():
+        model_predictions = score_features(features[ambiguous], model_path, n_workers)
+    else:
+        # An empty float array would turn the prediction column into Float64.
+        model_predictions = np.empty(0, dtype=verdicts.dtype)
+    predictions = verdicts.astype(np.result_type(verdicts, model_predictions))
+    predictions[ambiguous] = model_predictions
+    scored_df = df.select(output_columns).with_columns(
+        pl.Series(PREDICTION_COLUMN, predictions)
+    )
+
+    os.makedirs(output_dir, exist_ok=True)
+    predictions_path = os.path.join(output_dir, f"predictions.{output_format}")
+    if output_format == "parquet":
+        scored_df.write_parquet(predictions_path)
+    else:
+        scored_df.write_csv(predictions_path)
+    summary = summarize_alerts(scored_df, time.perf_counter() - start)
+    with open(os.path.join(output_dir, "alert_summary.json"), "w") as file:
+        json.dump(summary, file, indent=2)
+    print(
+        f"{summary['alerts']} alerts in {summary['frames']} frames are saved to {output_dir}!"
+    )
+    return summary
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Score a raw CAN capture with a saved model artifact."
+    )
+    parser.add_argument("--model", required=True, help="Folder of the model artifact.")
+    parser.add_argument("--input", required=True, help="Path to the raw capture.")
+    parser.add_argument("--output", required=True, help="Output folder.")
+    parser.add_argument("--format", choices=["csv", "txt"], default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--rules",
+        nargs="?",
+        const="config.yaml",
+        default=None,
+        help="Apply the rules of this config file before the model (config.yaml if empty).",
+    )
+    parser.add_argument(
+        "--profile",
+        default=None,
+        help="CAN ID profile (.npz), by default the artifact's profile_path if it has one.",
+    )
+    add_execution_profile_argument(parser)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    execution_profile = select_execution_profile(args.execution_profile)
+    rules = load_rules(args.rules) if args.rules else None
+    profile = load_profile(args.profile) if args.profile else None
+    score_capture(
+        args.input,
+        args.model,
+        args.output,
+        args.format,
+        args.workers or execution_profile["workers"],
+        rules,
+        profile,
+        execution_profile["output_format"],
+    )
@@ -0,0 +1,477 @@
+"""
+Workflow of sharded detection
+1. frames are hashed by can_id onto a pool of worker processes (shards)
+    1. each worker owns an OnlineDetector, so the per-ID state of its IDs lives in one process
+    2. batches of a shard are processed in the order they were submitted, so frame order
+        within an ID is preserved
+2. frames move between processes in shared memory
+    1. each shard has one SharedMemory block split into slots, a slot holds a batch of frames
+        (FRAME_DTYPE records) and the predictions of that batch
+    2. only (slot, number of frames) is sent through the task and result queues, frames are
+        never pickled one by one
+3. the dispatcher keeps the free slots of each shard, when a shard has no free slot the
+    dispatcher waits for results first (backpressure)
+4. queue_depths() reports the batches in flight per shard
+5. while waiting for results the dispatcher checks that every worker is alive, a dead worker
+    raises instead of blocking forever
+6. frames with an ID outside the 11-bit space are rejected like OnlineDetector rejects them,
+    submit() raises ValueError before any frame of the call is sent
+
+Usage
+    python src/sharded_detector.py --model models/dos_model --input output/dos_df.csv --shards 4
+"""
+
+import argparse
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import polars as pl
+
+from online_detector import BYTE_COLUMNS, CAN_ID_SPACE, OnlineDetector
+from utils import (
+    add_execution_profile_argument,
+    read_processed_csv,
+    select_execution_profile,
+)
+
+# ──────────────────────────────────────────────────────────────
+# 🛠️ Configuration Constants
+# ──────────────────────────────────────────────────────────────
+FRAME_DTYPE = np.dtype(
+    [("timestamp", np.float64), ("can_id", np.int32), ("dlc", np.uint8)]
+    + [(byte_column, np.uint8) for byte_column in BYTE_COLUMNS]
+)
+PREDICTION_DTYPE = np.dtype(np.int64)
+SLOTS_PER_SHARD = 8
+BATCH_CAPACITY = 4096
+RESULT_POLL_INTERVAL_S = 0.5  # how often a blocked dispatcher checks the workers
+RESET_TASK = "reset"
+# ──────────────────────────────────────────────────────────────
+
+
+def make_shard_table(n_shards):
+    """
+    Map every 11-bit CAN ID to a shard.
+
+    Parameters
+    ----------
+    n_shards : int
+        Number of shards.
+
+    Returns
+    -------
+    np.ndarray
+        Shard index of each CAN ID.
+    """
+    # Knuth's multiplicative hash spreads neighbouring IDs over the shards.
+    can_ids = np.arange(CAN_ID_SPACE, dtype=np.uint64)
+    return (
+        (can_ids * np.uint64(2654435761)) % np.uint64(2**32) % np.uint64(n_shards)
+    ).astype(np.int64)
+
+
+def frames_from_dataframe(df):
+    """
+    Convert a processed capture into FRAME_DTYPE records.
+
+    Parameters
+    ----------
+    df : pl.DataFrame
+        Capture with timestamp, can_id (hex str), dlc and byte columns (hex str).
+
+    Returns
+    -------
+    np.ndarray
+        Structured array of FRAME_DTYPE.
+    """
+    frames = np.zeros(df.height, dtype=FRAME_DTYPE)
+    frames["timestamp"] = df["timestamp"].to_numpy()
+    frames["dlc"] = df["dlc"].to_numpy()
+    for col in ["can_id"] + [col for col in BYTE_COLUMNS if col in df.columns]:
+        values = df[col]
+        if values.dtype == pl.String:
+            values = values.str.to_integer(base=16, strict=True)
+        frames[col] = values.fill_null(0).to_numpy()
+    return frames
+
+
+def records_to_frames(records):
+    """
+    Convert FRAME_DTYPE records into frame dicts for OnlineDetector.
+
+    Parameters
+    ----------
+    records : np.ndarray
+        Structured array of FRAME_DTYPE.
+
+    Returns
+    -------
+    list of dict
+        Frames with the loader columns as keys.
+    """
+    names = FRAME_DTYPE.names
+    return [dict(zip(names, row)) for row in records.tolist()]
+
+
+def _shard_views(buffer, slots, capacity):
+    frame_bytes = slots * capacity * FRAME_DTYPE.itemsize
+    frames = np.ndarray((slots, capacity), dtype=FRAME_DTYPE, buffer=buffer)
+    predictions = np.ndarray(
+        (slots, capacity), dtype=PREDICTION_DTYPE, buffer=buffer, offset=frame_bytes
+    )
+    return frames, predictions
+
+
+def _shard_worker(
+    shard, shm_name, slots, capacity, artifact_dir, task_queue, result_queue
+):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    frames, predictions = _shard_views(shm.buf, slots, capacity)
+    detector = OnlineDetector.from_artifact(artifact_dir)
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            if task == RESET_TASK:
+                detector.reset()
+                continue
+            slot, n_frames = task
+            batch = records_to_frames(frames[slot, :n_frames])
+            predictions[slot, :n_frames] = detector.classify_batch(batch)
+            result_queue.put((shard, slot, n_frames))
+    finally:
+        del frames, predictions
+        shm.close()
+
+
+class ShardedDetector:
+    """
+    Runs one OnlineDetector per worker process, with frames hashed onto shards by can_id.
+
+    Parameters
+    ----------
+    artifact_dir : str
+        Folder of the model artifact, loaded by every worker.
+    n_shards : int
+        Number of worker processes.
+    slots_per_shard : int
+        Number of batches that can be in flight per shard.
+    batch_capacity : int
+        Maximum number of frames per batch.
+    """
+
+    def __init__(
+        self,
+        artifact_dir,
+        n_shards,
+        slots_per_shard=SLOTS_PER_SHARD,
+        batch_capacity=BATCH_CAPACITY,
+    ):
+        self.n_shards = n_shards
+        self.slots_per_shard = slots_per_shard
+        self.batch_capacity = batch_capacity
+        self.shard_table = make_shard_table(n_shards)
+
+        context = mp.get_context("spawn")
+        self.result_queue = context.Queue()
+        self.task_queues = []
+        self.shms = []
+        self.views = []
+        self.processes = []
+        self.free_slots = []
+        shm_size = (
+            slots_per_shard
+            * batch_capacity
+            * (FRAME_DTYPE.itemsize + PREDICTION_DTYPE.itemsize)
+        )
+        for shard in range(n_shards):
+            shm = shared_memory.SharedMemory(create=True, size=shm_size)
+            task_queue = context.Queue()
+            process = context.Process(
+                target=_shard_worker,
+                args=(
+                    shard,
+                    shm.name,
+                    slots_per_shard,
+                    batch_capacity,
+                    artifact_dir,
+                    task_queue,
+                    self.result_queue,
+                ),
+                daemon=True,
+            )
+            process.start()
+            self.shms.append(shm)
+            self.views.append(_shard_views(shm.buf, slots_per_shard, batch_capacity))
+            self.task_queues.append(task_queue)
+            self.processes.append(process)
+            self.free_slots.append(list(range(slots_per_shard)))
+
+    def queue_depths(self):
+        """
+        Number of batches in flight per shard.
+
+        Returns
+        -------
+        dict
+            Shard index mapped to its queue depth.
+        """
+        return {
+            shard: self.slots_per_shard - len(free_slots)
+            for shard, free_slots in enumerate(self.free_slots)
+        }
+
+    def reset(self):
+        """
+        Forget the per-ID state of every worker.
+
+        Batches submitted before the call are processed with the old state.
+        """
+        for task_queue in self.task_queues:
+            task_queue.put(RESET_TASK)
+
+    def check_workers(self):
+        """Raise if a worker process has exited while batches are in flight."""
+        for shard, process in enumerate(self.processes):
+            if not process.is_alive():
+                raise RuntimeError(
+                    f"Worker of shard {shard} exited with code {process.exitcode}, "
+                    f"{self.queue_depths()[shard]} batches were in flight."
+                )
+
+    def submit(self, frames):
+        """
+        Hash frames onto shards and send them to the workers in shared-memory batches.
+
+        Waits for results when a shard has no free slot.
+
+        Parameters
+        ----------
+        frames : np.ndarray
+            Structured array of FRAME_DTYPE, in arrival order.
+
+        Returns
+        -------
+        list of tuple
+            Results collected while waiting for free slots, see collect().
+
+        Raises
+        ------
+        ValueError
+            If a frame's CAN ID is not an 11-bit identifier, no frame is sent then.
+        """
+        can_ids = frames["can_id"]
+        outside = (can_ids < 0) | (can_ids >= CAN_ID_SPACE)
+        if outside.any():
+            raise ValueError(
+                f"{int(outside.sum())} frames have CAN IDs that are not 11-bit "
+                f"identifiers, e.g. {int(can_ids[outside][0]):#x}."
+            )
+        results = []
+        shard_ids = self.shard_table[can_ids]
+        for shard in range(self.n_shards):
+            shard_frames = frames[shard_ids == shard]
+            for start in range(0, len(shard_frames), self.batch_capacity):
+                batch = shard_frames[start : start + self.batch_capacity]
+                while not self.free_slots[shard]:
+                    results.extend(self.collect(block=True))
+                slot = self.free_slots[shard].pop(0)
+                self.views[shard][0][slot, : len(batch)] = batch
+                self.task_queues[shard].put((slot, len(batch)))
+        return results
+
+    def collect(self, block=False):
+        """
+        Collect finished batches and free their slots.
+
+        Parameters
+        ----------
+        block : bool
+            Wait for at least one finished batch.
+
+        Returns
+        -------
+        list of tuple
+            (shard, frames, predictions) for each finished batch, the arrays are copies.
+
+        Raises
+        ------
+        RuntimeError
+            If a worker process died while waiting.
+        """
+        results = []
+        while True:
+            try:
+                if block and not results:
+                    result = self.result_queue.get(timeout=RESULT_POLL_INTERVAL_S)
+                else:
+                    result = self.result_queue.get_nowait()
+            except queue.Empty:
+                if block and not results:
+                    self.check_workers()
+                    continue
+                break
+            shard, slot, n_frames = result
+            frames, predictions = self.views[shard]
+            results.append(
+                (
+                    shard,
+                    frames[slot, :n_frames].copy(),
+                    predictions[slot, :n_frames].copy(),
+                )
+            )
+            self.free_slots[shard].append(slot)
+        return results
+
+    def drain(self):
+        """
+        Wait until every submitted batch is finished.
+
+        Returns
+        -------
+        list of tuple
+            (shard, frames, predictions) for each finished batch.
+        """
+        results = []
+        while any(self.queue_depths().values()):
+            results.extend(self.collect(block=True))
+        return results
+
+    def close(self):
+        """Stop the workers and release the shared memory."""
+        for task_queue in self.task_queues:
+            task_queue.put(None)
+        for process in self.processes:
+            process.join(timeout=RESULT_POLL_INTERVAL_S * 10)
+            if process.is_alive():
+                process.terminate()
+        self.views = []
+        for shm in self.shms:
+            shm.close()
+            shm.unlink()
+
+
+def slots_for_memory_budget(n_shards, memory_budget_mb, batch_capacity=BATCH_CAPACITY):
+    """
+    Number of slots per shard that fits the shared memory of all shards into a budget.
+
+    Parameters
+    ----------
+    n_shards : int
+        Number of shards.
+    memory_budget_mb : float
+        Shared memory of all shards together, in MB.
+    batch_capacity : int
+        Maximum number of frames per batch.
+
+    Returns
+    -------
+    int
+        Slots per shard, at least 1 and at most SLOTS_PER_SHARD.
+    """
+    slot_bytes = batch_capacity * (FRAME_DTYPE.itemsize + PREDICTION_DTYPE.itemsize)
+    slots = int(memory_budget_mb * 2**20 // (n_shards * slot_bytes))
+    return max(1, min(SLOTS_PER_SHARD, slots))
+
+
+def measure_throughput(
+    artifact_dir,
+    frames,
+    n_shards,
+    submit_size=BATCH_CAPACITY * 4,
+    slots_per_shard=SLOTS_PER_SHARD,
+):
+    """
+    Run frames through a ShardedDetector and measure frames/sec.
+
+    Parameters
+    ----------
+    artifact_dir : str
+        Folder of the model artifact.
+    frames : np.ndarray
+        Structured array of FRAME_DTYPE.
+    n_shards : int
+        Number of worker processes.
+    submit_size : int
+        Number of frames per submit() call.
+    slots_per_shard : int
+        Number of batches that can be in flight per shard.
+
+    Returns
+    -------
+    dict
+        frames, seconds, frames_per_second and the maximum queue depth seen per shard.
+    """
+    detector = ShardedDetector(artifact_dir, n_shards, slots_per_shard)
+    max_depths = {shard: 0 for shard in range(n_shards)}
+    try:
+        # Warm up so that process start and model loading are not measured.
+        detector.submit(frames[: n_shards * 16])
+        detector.drain()
+        # The measured run replays the warm-up frames, their timestamps must not be
+        # seen twice by the per-ID rings.
+        detector.reset()
+
+        processed = 0
+        start = time.perf_counter()
+        for i in range(0, len(frames), submit_size):
+            results = detector.submit(frames[i : i + submit_size])
+            results += detector.collect()
+            processed += sum(len(predictions) for _, _, predictions in results)
+            for shard, depth in detector.queue_depths().items():
+                max_depths[shard] = max(max_depths[shard], depth)
+        processed += sum(len(predictions) for _, _, predictions in detector.drain())
+        seconds = time.perf_counter() - start
+    finally:
+        detector.close()
+    return {
+        "shards": n_shards,
+        "frames": processed,
+        "seconds": seconds,
+        "frames_per_second": processed / seconds,
+        "max_queue_depths": max_depths,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Measure sharded detection throughput on a processed capture."
+    )
+    parser.add_argument("--model", required=True, help="Folder of the model artifact.")
+    parser.add_argument("--input", required=True, help="Path to a processed capture.")
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=None,
+        help="Maximum number of shards, by default the execution profile's workers.",
+    )
+    add_execution_profile_argument(parser)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    profile = select_execution_profile(args.execution_profile)
+    max_shards = args.shards or profile["workers"] or mp.cpu_count()
+    df = read_processed_csv(args.input).sort("timestamp")
+    frames = frames_from_dataframe(df)
+    in_space = (frames["can_id"] >= 0) & (frames["can_id"] < CAN_ID_SPACE)
+    if not in_space.all():
+        print(f"Skipping {int((~in_space).sum())} frames with extended CAN IDs.")
+        frames = frames[in_space]
+
+    n_shards = 1
+    while n_shards <= max_shards:
+        slots_per_shard = slots_for_memory_budget(n_shards, profile["memory_budget_mb"])
+        report = measure_throughput(
+            args.model, frames, n_shards, slots_per_shard=slots_per_shard
+        )
+        print(
+            f"{n_shards} shards: {report['frames_per_second']:.0f} frames/sec, "
+            f"max queue depths {report['max_queue_depths']}"
+        )
+        n_shards *= 2
@@ -0,0 +1,280 @@
+"""
+Workflow of the integer-microsecond timeline
+1. timestamps are converted to int64 microseconds when a capture is read, the processed CSV
+    files keep the timestamp in float seconds
+    1. timestamps read as str (read_timeline()) are parsed digit by digit, so no precision is
+        lost at all
+    2. float timestamps are rounded to the nearest microsecond, which is exact for the
+        captures' 6-digit fractions
+2. to_timeline() sorts the frames by timestamp_us and sets polars' sorted flag, so later
+    joins, group-bys and searches skip their sort / sortedness checks
+3. window() slices the frames of a time range with a binary search instead of a filter
+4. asof_join() attaches to every frame the latest frame of another capture (per CAN ID
+    optionally) at or before it, e.g. attack free context for an attack capture
+5. add_interval_us() and add_window_counts() compute time features per CAN ID in integer
+    arithmetic, the window count is the one the rule engine's rate limits use
+
+Usage
+    python src/timeline.py
+"""
+
+import polars as pl
+
+from utils import HEX_COLUMNS, load_data_paths
+
+# ──────────────────────────────────────────────────────────────
+# 🛠️ Configuration Constants
+# ──────────────────────────────────────────────────────────────
+TIMESTAMP_COLUMN = "timestamp"
+TIMESTAMP_US_COLUMN = "timestamp_us"
+US_PER_SECOND = 1_000_000
+US_DIGITS = 6
+# ──────────────────────────────────────────────────────────────
+
+
+def timestamp_us_expr(dtype, timestamp_column=TIMESTAMP_COLUMN):
+    """
+    Expression converting timestamps in seconds to int64 microseconds.
+
+    Parameters
+    ----------
+    dtype : pl.DataType
+        dtype of the timestamp column. str timestamps such as '1478198376.001181' are parsed
+        exactly, numeric ones are rounded to the nearest microsecond.
+    timestamp_column : str
+        Name of the timestamp column.
+
+    Returns
+    -------
+    pl.Expr
+        Int64 expression named TIMESTAMP_US_COLUMN.
+    """
+    timestamp = pl.col(timestamp_column)
+    if dtype == pl.String:
+        parts = timestamp.str.split_exact(".", 1)
+        seconds = parts.struct.field("field_0").str.to_integer(strict=True)
+        fraction = (
+            parts.struct.field("field_1")
+            .fill_null("")
+            .str.slice(0, US_DIGITS)
+            .str.pad_end(US_DIGITS, "0")
+            .str.to_integer(strict=True)
+        )
+        timestamp_us = seconds * US_PER_SECOND + fraction
+    else:
+        timestamp_us = (timestamp.cast(pl.Float64) * US_PER_SECOND).round()
+    return timestamp_us.cast(pl.Int64).alias(TIMESTAMP_US_COLUMN)
+
+
+def to_timeline(df, timestamp_column=TIMESTAMP_COLUMN):
+    """
+    Add timestamp_us, sort by it and mark the frame as sorted.
+
+    Parameters
+    ----------
+    df : pl.DataFrame or pl.LazyFrame
+        Frames with a timestamp column in seconds, str or float.
+    timestamp_column : str
+        Name of the timestamp column.
+
+    Returns
+    -------
+    pl.DataFrame or pl.LazyFrame
+        The frames sorted by TIMESTAMP_US_COLUMN with its sorted flag set.
+    """
+    dtype = df.collect_schema()[timestamp_column]
+    return (
+        df.with_columns(timestamp_us_expr(dtype, timestamp_column))
+        .sort(TIMESTAMP_US_COLUMN, maintain_order=True)
+        .with_columns(pl.col(TIMESTAMP_US_COLUMN).set_sorted())
+    )
+
+
+def read_timeline(df_path):
+    """
+    Read a processed CSV file as a timeline, timestamps are parsed exactly from the text.
+
+    Parameters
+    ----------
+    df_path : str
+        Path to a processed CSV file.
+
+    Returns
+    -------
+    pl.DataFrame
+        The frames with TIMESTAMP_US_COLUMN, sorted, the float timestamp column is kept.
+    """
+    schema = {col: pl.String for col in HEX_COLUMNS + [TIMESTAMP_COLUMN]}
+    return (
+        to_timeline(pl.scan_csv(df_path, schema_overrides=schema))
+        .with_columns(pl.col(TIMESTAMP_COLUMN).cast(pl.Float64))
+        .collect()
+    )
+
+
+def window(df, start_us, end_us):
+    """
+    Frames with start_us <= timestamp_us < end_us, found by binary search.
+
+    Parameters
+    ----------
+    df : pl.DataFrame
+        Timeline returned by to_timeline().
+    start_us : int
+        Start of the window in microseconds, inclusive.
+    end_us : int
+        End of the window in microseconds, exclusive.
+
+    Returns
+    -------
+    pl.DataFrame
+        Zero-copy slice of the frames in the window.
+    """
+    timestamps = df[TIMESTAMP_US_COLUMN]
+    start = timestamps.search_sorted(start_us, side="left")
+    end = timestamps.search_sorted(end_us, side="left")
+    return df.slice(start, max(0, end - start))
+
+
+def asof_join(
+    df,
+    other_df,
+    by=None,
+    strategy="backward",
+    tolerance_us=None,
+    suffix="_right",
+):
+    """
+    Attach to every frame the nearest frame of another timeline.
+
+    Parameters
+    ----------
+    df : pl.DataFrame or pl.LazyFrame
+        Timeline returned by to_timeline().
+    other_df : pl.DataFrame or pl.LazyFrame
+        Timeline the frames are looked up in.
+    by : str or list of str, optional
+        Columns that must match too, e.g. 'can_id' for the previous frame of the same ID.
+    strategy : str
+        'backward' (latest frame at or before), 'forward' or 'nearest'.
+    tolerance_us : int, optional
+        Frames further away than this many microseconds are not matched.
+    suffix : str
+        Suffix of the other timeline's columns that clash with `df`'s.
+
+    Returns
+    -------
+    pl.DataFrame or pl.LazyFrame
+        `df` with the matched frame's columns, null where nothing matched.
+    """
+    other_df = other_df.with_columns(
+        pl.col(TIMESTAMP_US_COLUMN).alias(f"{TIMESTAMP_US_COLUMN}{suffix}")
+    )
+    return df.join_asof(
+        other_df,
+        on=TIMESTAMP_US_COLUMN,
+        by=by,
+        strategy=strategy,
+        tolerance=tolerance_us,
+        suffix=suffix,
+        check_sortedness=False,
+    )
+
+
+def interval_us_expr(by="can_id"):
+    """
+    Expression of the microseconds since the previous frame of the same group.
+
+    Parameters
+    ----------
+    by : str or list of str
+        Group columns, e.g. 'can_id'.
+
+    Returns
+    -------
+    pl.Expr
+        Int64 expression, null for the first frame of a group.
+    """
+    return pl.col(TIMESTAMP_US_COLUMN).diff().over(by).alias("interval_us")
+
+
+def window_count_expr(window_us, by="can_id", timestamp_us=None):
+    """
+    Expression of the frames of the same group within the last window_us, the frame included.
+
+    Parameters
+    ----------
+    window_us : int
+        Window length in microseconds, frames exactly window_us earlier are outside.
+    by : str or list of str
+        Group columns, e.g. 'can_id'.
+    timestamp_us : pl.Expr, optional
+        Sorted int64 microsecond timestamps, by default the TIMESTAMP_US_COLUMN.
+
+    Returns
+    -------
+    pl.Expr
+        Number of frames in the window ending at each frame.
+    """
+    if timestamp_us is None:
+        timestamp_us = pl.col(TIMESTAMP_US_COLUMN)
+    window_start = timestamp_us.search_sorted(timestamp_us - window_us, side="right")
+    return (pl.int_range(pl.len()) - window_start + 1).over(by)
+
+
+def add_interval_us(df, by="can_id"):
+    """
+    Add interval_us, the microseconds since the previous frame of the same group.
+
+    Parameters
+    ----------
+    df : pl.DataFrame or pl.LazyFrame
+        Timeline returned by to_timeline().
+    by : str or list of str
+        Group columns.
+
+    Returns
+    -------
+    pl.DataFrame or pl.LazyFrame
+        The frames with the interval_us column.
+    """
+    return df.with_columns(interval_us_expr(by))
+
+
+def add_window_counts(df, window_us, by="can_id", column_name=None):
+    """
+    Add the number of frames of the same group within the last window_us.
+
+    Parameters
+    ----------
+    df : pl.DataFrame or pl.LazyFrame
+        Timeline returned by to_timeline().
+    window_us : int
+        Window length in microseconds.
+    by : str or list of str
+        Group columns.
+    column_name : str, optional
+        Name of the new column, by default 'frames_in_<window_us>us'.
+
+    Returns
+    -------
+    pl.DataFrame or pl.LazyFrame
+        The frames with the window count column.
+    """
+    column_name = column_name or f"frames_in_{window_us}us"
+    return df.with_columns(window_count_expr(window_us, by).alias(column_name))
+
+
+if __name__ == "__main__":
+    output_data_paths = load_data_paths("out_paths")
+    dos_df = read_timeline(output_data_paths["dos_df"])
+    attack_free_df = read_timeline(output_data_paths["attack_free_df"])
+    dos_df = add_window_counts(add_interval_us(dos_df), 10_000)
+    joined = asof_join(
+        dos_df, attack_free_df.select("timestamp_us", "can_id", "dlc"), by="can_id"
+    )
+    print(joined.head())
+    start_us = dos_df[TIMESTAMP_US_COLUMN][0]
+    print(
+        f"First second: {window(dos_df, start_us, start_us + US_PER_SECOND).height} frames"
+    )
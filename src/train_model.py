@@ -4,6 +4,8 @@ from utils import (
     return_non_attack_df,
     return_only_attack_df,
     add_and_fill_column,
+    parse_execution_profile_argument,
+    select_execution_profile,
 )
 import polars as pl
 from sklearn.model_selection import StratifiedKFold
@@ -44,6 +46,7 @@ def prepare_data_for_modelling(updated_flag_column):
 
 
 if __name__ == "__main__":
+    select_execution_profile(parse_execution_profile_argument())
     dos_df, fuzzy_df, attack_free_df = load_datasets("out_paths")
 
     updated_flag_column = "updatedFlag"
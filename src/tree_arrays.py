@@ -0,0 +1,432 @@
+"""
+Workflow of the array-based tree models
+1. export_tree_model() flattens a fitted sklearn DecisionTreeClassifier or
+    RandomForestClassifier into one set of node arrays, the trees one after the other
+    1. feature (int16) and threshold (float32) of every split node
+    2. children_left / children_right (int32), a leaf points to itself
+    3. leaf_class (uint8), the predicted class of every leaf of a single tree, or leaf_proba
+        (float64), the class probabilities of every leaf of a forest
+    4. roots, the first node of every tree
+2. sklearn compares float32 features against float64 thresholds. The thresholds are stored
+    as the largest float32 at or below them, which gives the same comparison for every
+    float32 feature value, so the predictions are identical to sklearn's
+3. TreeArrays.predict() evaluates a batch with numpy only: every (tree, frame) pair moves
+    one level down per step with a few gathers, pairs that reached a leaf are dropped from
+    the active set once they are a quarter of it. Forest probabilities are summed tree after
+    tree in float64 and divided by the number of trees, as sklearn does
+4. TreeArrays.predict_one() walks the trees of a single frame with python lists, without
+    any numpy call per node
+5. the module imports numpy only, a TreeArrays saved with save_model_artifact() is loaded
+    (memory-mapped) and scored without importing sklearn
+
+Usage
+    python src/tree_arrays.py models/best_search_model models/best_search_model_arrays
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+# ──────────────────────────────────────────────────────────────
+# 🛠️ Configuration Constants
+# ──────────────────────────────────────────────────────────────
+FEATURE_DTYPE = np.int16
+THRESHOLD_DTYPE = np.float32
+NODE_DTYPE = np.int32
+LEAF_CLASS_DTYPE = np.uint8
+LEAF_PROBA_DTYPE = np.float64  # sklearn sums forest probabilities in float64
+COMPACT_FRACTION = 0.25  # share of finished entries that triggers a compaction
+BENCHMARK_ROWS = 10000
+BENCHMARK_SINGLE_FRAMES = 1000
+# ──────────────────────────────────────────────────────────────
+
+
+def _float32_at_or_below(threshold):
+    # float32 x <= t holds exactly when x <= the largest float32 at or below t.
+    rounded = threshold.astype(THRESHOLD_DTYPE)
+    too_high = rounded.astype(np.float64) > threshold
+    rounded[too_high] = np.nextafter(rounded[too_high], THRESHOLD_DTYPE(-np.inf))
+    return rounded
+
+
+class TreeArrays:
+    """
+    Decision tree or random forest classifier flattened into node arrays.
+
+    Parameters
+    ----------
+    feature : np.ndarray
+        Feature index of every node, 0 for leaves.
+    threshold : np.ndarray
+        float32 threshold of every node, see _float32_at_or_below().
+    children_left : np.ndarray
+        Left child of every node, the node itself for leaves.
+    children_right : np.ndarray
+        Right child of every node, the node itself for leaves.
+    roots : np.ndarray
+        First node of every tree.
+    max_depth : int
+        Depth of the deepest tree.
+    classes : np.ndarray
+        Class labels, as the estimator's classes_.
+    n_features : int
+        Number of features the estimator was fitted on.
+    leaf_class : np.ndarray, optional
+        Index into classes of every leaf, for a single tree.
+    leaf_proba : np.ndarray, optional
+        Class probabilities of every leaf (n_nodes, n_classes), for a forest.
+    """
+
+    def __init__(
+        self,
+        feature,
+        threshold,
+        children_left,
+        children_right,
+        roots,
+        max_depth,
+        classes,
+        n_features,
+        leaf_class=None,
+        leaf_proba=None,
+    ):
+        if (leaf_class is None) == (leaf_proba is None):
+            raise ValueError(
+                "Give either leaf_class (a tree) or leaf_proba (a forest)."
+            )
+        self.feature = feature
+        self.threshold = threshold
+        self.children_left = children_left
+        self.children_right = children_right
+        self.roots = roots
+        self.max_depth = max_depth
+        self.classes_ = classes
+        self.n_features_in_ = n_features
+        self.leaf_class = leaf_class
+        self.leaf_proba = leaf_proba
+        self._lists = None
+
+    def __getstate__(self):
+        # The python lists of predict_one() are rebuilt after loading, not pickled.
+        state = self.__dict__.copy()
+        state["_lists"] = None
+        return state
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def apply(self, X):
+        """
+        Find the leaf every frame reaches in every tree.
+
+        Parameters
+        ----------
+        X : np.ndarray
+            Feature matrix (n_frames, n_features).
+
+        Returns
+        -------
+        np.ndarray
+            Leaf node of every (tree, frame), shape (n_trees, n_frames).
+
+        Raises
+        ------
+        ValueError
+            If X does not have n_features columns.
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"X has shape {X.shape}, expected (n_frames, {self.n_features_in_})."
+            )
+        # One entry per (tree, frame), tree after tree. cur holds the node of every active
+        # entry, base the offset of its frame's row in the flattened X.
+        values = X.ravel()
+        offsets = np.tile(np.arange(len(X), dtype=np.int64) * X.shape[1], self.n_trees)
+        nodes = np.repeat(np.asarray(self.roots), len(X))
+        active = np.arange(len(nodes))
+        cur, base = nodes.copy(), offsets
+        while len(active):
+            go_left = values[base + self.feature[cur]] <= self.threshold[cur]
+            following = np.where(
+                go_left, self.children_left[cur], self.children_right[cur]
+            )
+            done = following == cur
+            n_done = np.count_nonzero(done)
+            if n_done == len(active):
+                nodes[active] = following
+                break
+            # Entries at a leaf are dropped once they are a good share of the active ones,
+            # compacting after every step costs more than it saves on shallow trees.
+            if n_done > COMPACT_FRACTION * len(active):
+                nodes[active] = following
+                active, cur = active[~done], following[~done]
+                base = offsets[active]
+            else:
+                cur = following
+        return nodes.reshape(self.n_trees, len(X))
+
+    def predict_proba(self, X):
+        """
+        Class probabilities of every frame, a forest's mean over its trees.
+
+        Parameters
+        ----------
+        X : np.ndarray
+            Feature matrix (n_frames, n_features).
+
+        Returns
+        -------
+        np.ndarray
+            Probabilities (n_frames, n_classes). A single tree gives 1 for its leaf's class.
+        """
+        leaves = self.apply(X)
+        if self.leaf_proba is None:
+            proba = np.zeros((leaves.shape[1], len(self.classes_)))
+            proba[np.arange(leaves.shape[1]), self.leaf_class[leaves[0]]] = 1.0
+            return proba
+        proba = np.zeros((leaves.shape[1], len(self.classes_)), dtype=LEAF_PROBA_DTYPE)
+        for tree_leaves in leaves:
+            proba += self.leaf_proba[tree_leaves]
+        proba /= self.n_trees
+        return proba
+
+    def predict(self, X):
+        """
+        Predict a batch of frames, identical to the exported estimator's predict().
+
+        Parameters
+        ----------
+        X : np.ndarray
+            Feature matrix (n_frames, n_features).
+
+        Returns
+        -------
+        np.ndarray
+            Predicted labels.
+        """
+        if self.leaf_proba is None:
+            return self.classes_[self.leaf_class[self.apply(X)[0]]]
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    def _build_lists(self):
+        self._lists = (
+            np.asarray(self.feature).tolist(),
+            np.asarray(self.threshold, dtype=np.float64).tolist(),
+            np.asarray(self.children_left).tolist(),
+            np.asarray(self.children_right).tolist(),
+            np.asarray(self.roots).tolist(),
+            (
+                np.asarray(self.leaf_class).tolist()
+                if self.leaf_proba is None
+                else np.asarray(self.leaf_proba).tolist()
+            ),
+            self.classes_.tolist(),
+        )
+
+    def predict_one(self, row):
+        """
+        Predict a single frame by walking the trees with python lists.
+
+        Parameters
+        ----------
+        row : np.ndarray or list of float
+            Features of the frame, in the fitted order.
+
+        Returns
+        -------
+        object
+            Predicted label.
+        """
+        if self._lists is None:
+            self._build_lists()
+        feature, threshold, left, right, roots, leaf_values, classes = self._lists
+        values = np.asarray(row, dtype=np.float32).tolist()
+        leaves = []
+        for node in roots:
+            while left[node] != node:
+                if values[feature[node]] <= threshold[node]:
+                    node = left[node]
+                else:
+                    node = right[node]
+            leaves.append(node)
+        if self.leaf_proba is None:
+            return classes[leaf_values[leaves[0]]]
+
+        proba = [0.0] * len(classes)
+        for node in leaves:
+            for i, value in enumerate(leaf_values[node]):
+                proba[i] += value
+        proba = [value / len(roots) for value in proba]
+        return classes[proba.index(max(proba))]
+
+
+def export_tree_model(model):
+    """
+    Flatten a fitted decision tree or random forest classifier into a TreeArrays.
+
+    Parameters
+    ----------
+    model : object
+        Fitted sklearn DecisionTreeClassifier or RandomForestClassifier (anything with
+        classes_ and a tree_, or estimators_ with a tree_ each).
+
+    Returns
+    -------
+    TreeArrays
+        The same model as node arrays.
+
+    Raises
+    ------
+    ValueError
+        If the model is not a fitted single-output tree classifier or forest of them.
+    """
+    is_forest = hasattr(model, "estimators_")
+    estimators = list(model.estimators_) if is_forest else [model]
+    if not hasattr(model, "classes_") or not all(
+        hasattr(estimator, "tree_") for estimator in estimators
+    ):
+        raise ValueError(
+            f"{type(model).__name__} is not a fitted tree classifier or forest."
+        )
+    if np.ndim(model.classes_) != 1:
+        raise ValueError("Multi-output tree models are not supported.")
+    n_classes = len(model.classes_)
+
+    features, thresholds, lefts, rights, roots, leaf_values = [], [], [], [], [], []
+    offset = 0
+    for estimator in estimators:
+        tree = estimator.tree_
+        node_index = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(_float32_at_or_below(np.asarray(tree.threshold)))
+        lefts.append(np.where(is_leaf, node_index, tree.children_left) + offset)
+        rights.append(np.where(is_leaf, node_index, tree.children_right) + offset)
+        roots.append(offset)
+        value = np.asarray(tree.value[:, 0, :n_classes], dtype=np.float64)
+        if is_forest:
+            # A tree's predict_proba() normalises its leaf values, empty ones stay 0.
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            leaf_values.append(value / normalizer)
+        else:
+            leaf_values.append(value.argmax(axis=1))
+        offset += tree.node_count
+    if n_classes > np.iinfo(LEAF_CLASS_DTYPE).max + 1:
+        raise ValueError(
+            f"{n_classes} classes do not fit in {LEAF_CLASS_DTYPE.__name__}."
+        )
+    if model.n_features_in_ > np.iinfo(FEATURE_DTYPE).max:
+        raise ValueError(
+            f"{model.n_features_in_} features do not fit in {FEATURE_DTYPE.__name__}."
+        )
+
+    leaves = np.concatenate(leaf_values)
+    return TreeArrays(
+        feature=np.concatenate(features).astype(FEATURE_DTYPE),
+        threshold=np.concatenate(thresholds),
+        children_left=np.concatenate(lefts).astype(NODE_DTYPE),
+        children_right=np.concatenate(rights).astype(NODE_DTYPE),
+        roots=np.array(roots, dtype=NODE_DTYPE),
+        max_depth=max(estimator.tree_.max_depth for estimator in estimators),
+        classes=np.asarray(model.classes_),
+        n_features=model.n_features_in_,
+        leaf_class=None if is_forest else leaves.astype(LEAF_CLASS_DTYPE),
+        leaf_proba=leaves.astype(LEAF_PROBA_DTYPE) if is_forest else None,
+    )
+
+
+def compare_with_estimator(model, tree_arrays, X, n_single=BENCHMARK_SINGLE_FRAMES):
+    """
+    Check that a TreeArrays predicts like its estimator and time both.
+
+    Parameters
+    ----------
+    model : object
+        The exported estimator.
+    tree_arrays : TreeArrays
+        The export of model.
+    X : np.ndarray
+        Feature matrix.
+    n_single : int
+        Number of frames predicted one at a time.
+
+    Returns
+    -------
+    dict
+        identical (bool), mismatches, and the batch frames per second and single-frame
+        microseconds of both.
+    """
+    start = time.perf_counter()
+    expected = model.predict(X)
+    estimator_batch_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    predictions = tree_arrays.predict(X)
+    arrays_batch_seconds = time.perf_counter() - start
+
+    rows = X[:n_single]
+    start = time.perf_counter()
+    for row in rows:
+        model.predict(row.reshape(1, -1))
+    estimator_single_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    single = [tree_arrays.predict_one(row) for row in rows]
+    arrays_single_seconds = time.perf_counter() - start
+
+    mismatches = int(np.sum(predictions != expected)) + int(
+        np.sum(np.asarray(single) != expected[: len(rows)])
+    )
+    return {
+        "identical": mismatches == 0,
+        "mismatches": mismatches,
+        "estimator_batch_frames_per_second": len(X) / estimator_batch_seconds,
+        "arrays_batch_frames_per_second": len(X) / arrays_batch_seconds,
+        "estimator_single_us": estimator_single_seconds / max(len(rows), 1) * 1e6,
+        "arrays_single_us": arrays_single_seconds / max(len(rows), 1) * 1e6,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Export a tree model artifact to node arrays, scored without sklearn."
+    )
+    parser.add_argument("model", help="Artifact of a decision tree or random forest.")
+    parser.add_argument("output", help="Folder of the exported artifact.")
+    parser.add_argument(
+        "--data",
+        default=None,
+        help="Processed CSV file to check the predictions on, by default dos_df.",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    from model_artifact import load_model_artifact, save_model_artifact
+    from online_detector import prepare_feature_frame
+    from utils import load_data_paths, read_processed_csv
+
+    # Pickled through the module, not __main__, so the artifact loads in any process.
+    from tree_arrays import export_tree_model as export
+
+    args = parse_args()
+    model, manifest = load_model_artifact(args.model, mmap=False)
+    tree_arrays = export(model)
+    save_model_artifact(
+        tree_arrays,
+        args.output,
+        manifest["feature_columns"],
+        manifest["feature_dtypes"],
+        manifest["preprocessing_params"],
+    )
+    print(
+        f"Exported {tree_arrays.n_trees} trees, {len(tree_arrays.feature)} nodes, "
+        f"depth {tree_arrays.max_depth} to {args.output}"
+    )
+
+    data_path = args.data or load_data_paths("out_paths")["dos_df"]
+    features = prepare_feature_frame(read_processed_csv(data_path))
+    X = features.select(manifest["feature_columns"]).head(BENCHMARK_ROWS).to_numpy()
+    print(compare_with_estimator(model, tree_arrays, X))
@@ -1,6 +1,52 @@
 from omegaconf import OmegaConf
+import argparse
+import functools
 import os
+import pandas as pd
 import polars as pl
+import pyarrow as pa
+
+# CAN IDs and payload bytes are hex strings, digit-only values such as '0316' must not be
+# inferred as decimal ints.
+HEX_COLUMNS = ["can_id"] + [f"byte_{i}" for i in range(8)]
+BACKENDS = ["polars", "pandas"]
+EXECUTION_PROFILE_ENV = "CAN_EXECUTION_PROFILE"
+# Settings of a run without execution profiles, a profile overrides the keys it sets.
+DEFAULT_EXECUTION_PROFILE = {
+    "threads": None,  # polars threads, None uses every core
+    "chunk_size": None,  # rows per polars streaming chunk, None lets polars choose
+    "batch_size": 512,  # frames per detector micro-batch / ingestion batch
+    "workers": None,  # worker processes (scoring, shards, search, ingestion), None uses every core
+    "memory_budget_mb": 256,  # shared memory of the sharded detector
+    "output_format": "csv",  # format of the scoring output, 'csv' or 'parquet'
+    "random_sample_size": 40000,  # rows sampled per attack by the preprocessors
+    "train_sample_size": 200000,  # rows the KNN benchmark is trained on
+    "query_sample_size": 5000,  # rows the KNN benchmark queries
+    "query_batch_size": 10000,  # rows per KNN query batch
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _load_config_file(config_path):
+    return OmegaConf.load(config_path)
+
+
+def load_config(config_path=None):
+    """
+    Load config.yaml once, later calls return the cached config.
+
+    Parameters
+    ----------
+    config_path : str, optional
+        Path to the config file, by default config.yaml in the working directory.
+
+    Returns
+    -------
+    omegaconf.DictConfig
+        The config.
+    """
+    config_path = config_path or os.path.join(os.getcwd(), "config.yaml")
+    return _load_config_file(os.path.abspath(config_path))
 
 
 def load_data_paths(path_type):
@@ -21,8 +67,7 @@ def load_data_paths(path_type):
         If 'path_type' is not found in the config file.
     """
     dir = os.getcwd()
-    config_path = os.path.join(dir, "config.yaml")
-    config = OmegaConf.load(config_path)
+    config = load_config()
     if path_type not in config:
         raise ValueError(
             f"Invalid path_type '{path_type}'. Choose 'in_paths' or 'out_paths'."
@@ -36,6 +81,249 @@ def load_data_paths(path_type):
     return data_paths_dict
 
 
+def load_execution_profile(name=None, config_path=None):
+    """
+    Load an execution profile from the 'execution_profiles' section of config.yaml.
+
+    The profile is chosen by `name`, else by the CAN_EXECUTION_PROFILE environment variable,
+    else by the 'execution_profile' key of the config. Keys a profile leaves out keep their
+    DEFAULT_EXECUTION_PROFILE value.
+
+    Parameters
+    ----------
+    name : str, optional
+        Name of the profile, e.g. 'laptop', 'ingest-node' or 'training-node'.
+    config_path : str, optional
+        Path to the config file, by default config.yaml in the working directory.
+
+    Returns
+    -------
+    dict
+        The profile settings and its 'name'.
+
+    Raises
+    ------
+    ValueError
+        If the profile is not found in the config file.
+    """
+    config_path = config_path or os.path.join(os.getcwd(), "config.yaml")
+    config = load_config(config_path) if os.path.isfile(config_path) else {}
+    name = (
+        name or os.environ.get(EXECUTION_PROFILE_ENV) or config.get("execution_profile")
+    )
+    if name is None:
+        return {**DEFAULT_EXECUTION_PROFILE, "name": None}
+
+    profiles = config.get("execution_profiles") or {}
+    if name not in profiles:
+        raise ValueError(
+            f"Execution profile '{name}' not found, choose one of {list(profiles)}."
+        )
+    profile = OmegaConf.to_container(profiles[name], resolve=True)
+    unknown_keys = [key for key in profile if key not in DEFAULT_EXECUTION_PROFILE]
+    if unknown_keys:
+        raise ValueError(f"Unknown keys in execution profile '{name}': {unknown_keys}")
+    return {**DEFAULT_EXECUTION_PROFILE, **profile, "name": name}
+
+
+def select_execution_profile(name=None):
+    """
+    Load an execution profile and apply its process-wide settings.
+
+    The profile name and POLARS_MAX_THREADS are exported to the environment, so worker
+    processes started afterwards use the same profile. polars reads POLARS_MAX_THREADS when
+    it is imported, if this process already runs another number of threads a message tells
+    how to start it with the profile's, the script goes on with the running thread pool.
+
+    Parameters
+    ----------
+    name : str, optional
+        Name of the profile, see load_execution_profile().
+
+    Returns
+    -------
+    dict
+        The profile settings, see load_execution_profile().
+    """
+    profile = load_execution_profile(name)
+    if profile["name"] is not None:
+        os.environ[EXECUTION_PROFILE_ENV] = profile["name"]
+    if profile["chunk_size"]:
+        pl.Config.set_streaming_chunk_size(profile["chunk_size"])
+
+    threads = profile["threads"]
+    if threads:
+        os.environ["POLARS_MAX_THREADS"] = str(threads)
+        if pl.thread_pool_size() != threads:
+            print(
+                f"polars runs {pl.thread_pool_size()} threads in this process, set "
+                f"POLARS_MAX_THREADS={threads} before starting it to use the profile's "
+                f"{threads}."
+            )
+    return profile
+
+
+def add_execution_profile_argument(parser):
+    """
+    Add the --execution-profile option to a script's argument parser.
+
+    Parameters
+    ----------
+    parser : argparse.ArgumentParser
+        The parser of the script.
+    """
+    parser.add_argument(
+        "--execution-profile",
+        default=None,
+        help=f"Execution profile of config.yaml, by default ${EXECUTION_PROFILE_ENV} "
+        "or the config's execution_profile.",
+    )
+
+
+def parse_execution_profile_argument():
+    """
+    Read --execution-profile from the command line of a script without other options.
+
+    Returns
+    -------
+    str or None
+        The profile name, None if the option is not given.
+    """
+    parser = argparse.ArgumentParser()
+    add_execution_profile_argument(parser)
+    return parser.parse_args().execution_profile
+
+
+def validate_backend(backend):
+    """
+    Check that a backend name is supported.
+
+    Parameters
+    ----------
+    backend : str
+        'polars' or 'pandas'.
+
+    Raises
+    ------
+    ValueError
+        If the specified backend is invalid.
+    """
+    if backend not in BACKENDS:
+        raise ValueError("Invalid backend! Use 'polars' or 'pandas'.")
+
+
+def get_backend(df):
+    """
+    Name of the library a DataFrame belongs to.
+
+    Parameters
+    ----------
+    df : pl.DataFrame or pd.DataFrame
+        The DataFrame.
+
+    Returns
+    -------
+    str
+        'polars' or 'pandas'.
+
+    Raises
+    ------
+    TypeError
+        If the DataFrame belongs to neither library.
+    """
+    if isinstance(df, (pl.DataFrame, pl.LazyFrame)):
+        return "polars"
+    if isinstance(df, pd.DataFrame):
+        return "pandas"
+    raise TypeError(f"Unsupported DataFrame type {type(df).__name__}.")
+
+
+def to_arrow(df):
+    """
+    Convert a DataFrame into an Arrow table.
+
+    Polars columns and Arrow-backed pandas columns are shared, not copied. NumPy-backed
+    pandas columns are shared when they are numeric without nulls.
+
+    Parameters
+    ----------
+    df : pl.DataFrame or pd.DataFrame
+        The DataFrame.
+
+    Returns
+    -------
+    pa.Table
+        Table over the DataFrame's column buffers.
+    """
+    if isinstance(df, pl.LazyFrame):
+        df = df.collect()
+    if get_backend(df) == "polars":
+        return df.to_arrow()
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def to_backend(df, backend):
+    """
+    Convert a DataFrame to a backend through Arrow, without copying the column buffers.
+
+    pandas DataFrames created here are Arrow-backed (ArrowDtype columns), so converting them
+    back to polars is zero-copy too and a pipeline can switch engines at every step.
+
+    Parameters
+    ----------
+    df : pl.DataFrame or pd.DataFrame
+        The DataFrame.
+    backend : str
+        'polars' or 'pandas'.
+
+    Returns
+    -------
+    pl.DataFrame or pd.DataFrame
+        The DataFrame in the backend, `df` itself if it already belongs to it.
+
+    Raises
+    ------
+    ValueError
+        If the specified backend is invalid.
+    """
+    validate_backend(backend)
+    if get_backend(df) == backend:
+        return df
+    if isinstance(df, pl.LazyFrame):
+        df = df.collect()
+    if backend == "pandas":
+        return df.to_pandas(use_pyarrow_extension_array=True)
+    return pl.from_arrow(to_arrow(df), rechunk=False)
+
+
+def rows_to_dataframe(rows, column_names, backend="polars"):
+    """
+    Build a DataFrame of str columns from parsed rows, shorter rows are padded with nulls.
+
+    Parameters
+    ----------
+    rows : list of list of str
+        Parsed rows.
+    column_names : list of str
+        Column names.
+    backend : str, optional
+        The library of the returned DataFrame ('pandas' or 'polars'), by default 'polars'.
+
+    Returns
+    -------
+    pl.DataFrame or pd.DataFrame
+        The DataFrame.
+    """
+    n_columns = len(column_names)
+    padded_rows = [row[:n_columns] + [None] * (n_columns - len(row)) for row in rows]
+    df = pl.DataFrame(
+        padded_rows,
+        schema={name: pl.String for name in column_names},
+        orient="row",
+    )
+    return to_backend(df, backend)
+
+
 def check_file_exists(file_path):
     """
     Check if a file exists at the given path.
@@ -53,9 +341,27 @@ def check_file_exists(file_path):
     return os.path.isfile(file_path)
 
 
-def set_column_names(column_names, df_path):
+def file_fingerprint(file_path):
     """
-    Set column names for a DataFrame read from a CSV file.
+    Size and modification time of a file, used to invalidate caches built from it.
+
+    Parameters
+    ----------
+    file_path : str
+        Path to the file.
+
+    Returns
+    -------
+    dict
+        size in bytes and mtime_ns.
+    """
+    stat = os.stat(file_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def set_column_names(column_names, df_path, backend="polars"):
+    """
+    Set column names for a DataFrame read from a CSV file, hex columns are read as str.
 
     Parameters
     ----------
@@ -63,15 +369,116 @@ def set_column_names(column_names, df_path):
         List of column names.
     df_path : str
         Path to csv file.
+    backend : str, optional
+        The library of the returned DataFrame ('pandas' or 'polars'), by default 'polars'.
+        The file is always parsed by polars, see to_backend().
 
     Returns
     -------
-    pl.DataFrame
+    pl.DataFrame or pd.DataFrame
         DataFrame with updated column names.
+
+    Raises
+    ------
+    ValueError
+        If the specified backend is invalid.
+    """
+    validate_backend(backend)
+    hex_columns = [col for col in column_names if col in HEX_COLUMNS]
+    df = pl.read_csv(
+        df_path,
+        new_columns=column_names,
+        schema_overrides={col: pl.String for col in hex_columns},
+    )
+    return to_backend(df, backend)
+
+
+def read_processed_csv(df_path, backend="polars"):
+    """
+    Read a processed CSV file from the output folder, hex columns are read as str.
+
+    Parameters
+    ----------
+    df_path : str
+        Path to csv file.
+    backend : str, optional
+        The library of the returned DataFrame ('pandas' or 'polars'), by default 'polars'.
+
+    Returns
+    -------
+    pl.DataFrame or pd.DataFrame
+        The processed DataFrame.
+
+    Raises
+    ------
+    ValueError
+        If the specified backend is invalid.
     """
-    df = pl.read_csv(df_path)
-    df.columns = column_names
-    return df
+    validate_backend(backend)
+    df = pl.read_csv(df_path, schema_overrides={col: pl.String for col in HEX_COLUMNS})
+    return to_backend(df, backend)
+
+
+def read_datasets(df_paths, backend="polars"):
+    """
+    Read several processed CSV files.
+
+    Parameters
+    ----------
+    df_paths : list of str
+        Paths to csv files.
+    backend : str, optional
+        The library of the returned DataFrames ('pandas' or 'polars'), by default 'polars'.
+
+    Returns
+    -------
+    list of pl.DataFrame or pd.DataFrame
+        The DataFrames in the order of `df_paths`.
+    """
+    return [read_processed_csv(df_path, backend) for df_path in df_paths]
+
+
+def load_data(path_type, backend="polars"):
+    """
+    Read every dataset of a path type of config.yaml.
+
+    Parameters
+    ----------
+    path_type : str
+        Either 'in_paths' or 'out_paths', see load_data_paths().
+    backend : str, optional
+        The library of the returned DataFrames ('pandas' or 'polars'), by default 'polars'.
+
+    Returns
+    -------
+    dict
+        DataFrames keyed by dataset name, e.g. 'dos_df', 'fuzzy_df' and 'attack_free_df'.
+    """
+    data_paths = load_data_paths(path_type)
+    return {key: read_processed_csv(path, backend) for key, path in data_paths.items()}
+
+
+def load_datasets(path_type, backend="polars"):
+    """
+    Read the DoS, Fuzzy and attack free datasets of a path type of config.yaml.
+
+    Parameters
+    ----------
+    path_type : str
+        Either 'in_paths' or 'out_paths', see load_data_paths().
+    backend : str, optional
+        The library of the returned DataFrames ('pandas' or 'polars'), by default 'polars'.
+
+    Returns
+    -------
+    tuple
+        (dos_df, fuzzy_df, attack_free_df).
+    """
+    data_paths = load_data_paths(path_type)
+    return tuple(
+        read_processed_csv(data_paths[key], backend)
+        for key in ["dos_df", "fuzzy_df", "attack_free_df"]
+    )
 
 
 def save_pl_df_to_csv(df: pl.DataFrame, df_path: str):
@@ -110,38 +517,152 @@ def save_pd_df_to_csv(df, df_path):
         print(f"Failed to save DataFrame to {df_path}: {e}")
 
 
-# def load_datasets(path_name):
-#     dos_df_path, fuzzy_df_path, attack_free_df_path = load_data_paths(path_name)
-#     dos_df = pl.read_csv(dos_df_path)
-#     fuzzy_df = pl.read_csv(fuzzy_df_path)
-#     attack_free_df = pl.read_csv(attack_free_df_path)
-#     return dos_df, fuzzy_df, attack_free_df
+def save_df_to_csv(df, df_path, backend=None):
+    """
+    Save a DataFrame to a CSV file with the given backend.
+
+    Parameters
+    ----------
+    df : pl.DataFrame or pd.DataFrame
+        DataFrame to be saved.
+    df_path : str
+        The file path where the DataFrame will be saved.
+    backend : str, optional
+        The library that writes the file ('pandas' or 'polars'), by default the library the
+        DataFrame belongs to. Pandas writes the index too.
+
+    Raises
+    ------
+    ValueError
+        If the specified backend is invalid.
+    """
+    df = to_backend(df, backend or get_backend(df))
+    if get_backend(df) == "polars":
+        save_pl_df_to_csv(df, df_path)
+    else:
+        save_pd_df_to_csv(df, df_path)
+
+
+def drop_columns(df, columns, backend=None):
+    """
+    Drop multiple columns from a DataFrame.
+
+    Parameters
+    ----------
+    df : pl.DataFrame or pd.DataFrame
+        The input DataFrame.
+    columns : str or list of str
+        Columns to drop.
+    backend : str, optional
+        The library of the returned DataFrame ('pandas' or 'polars'), by default the library
+        the DataFrame belongs to.
+
+    Returns
+    -------
+    pl.DataFrame or pd.DataFrame
+        DataFrame without the columns.
+    """
+    df = to_backend(df, backend or get_backend(df))
+    if get_backend(df) == "polars":
+        return df.drop(columns)
+    return df.drop(columns=columns)
+
+
+def add_and_fill_column(df, column_to_add, fill_value, backend=None):
+    """
+    Add a column holding the same value in every row.
+
+    Parameters
+    ----------
+    df : pl.DataFrame or pd.DataFrame
+        The input DataFrame.
+    column_to_add : str
+        Name of the new column.
+    fill_value : object
+        Value of every row.
+    backend : str, optional
+        The library of the returned DataFrame ('pandas' or 'polars'), by default the library
+        the DataFrame belongs to.
+
+    Returns
+    -------
+    pl.DataFrame or pd.DataFrame
+        DataFrame with the new column.
+    """
+    df = to_backend(df, backend or get_backend(df))
+    if get_backend(df) == "polars":
+        return df.with_columns(pl.lit(fill_value).alias(column_to_add))
+    return df.assign(**{column_to_add: fill_value})
+
 
+def filter_by_value(df, column_name, value, backend=None):
+    """
+    Keep the rows whose column equals a value.
 
-# def drop_columns(df, columns_to_delete):
-#     """
-#     Drop multiple columns from DataFrame
+    Parameters
+    ----------
+    df : pl.DataFrame, pl.LazyFrame or pd.DataFrame
+        The input DataFrame. A LazyFrame is filtered before it is collected, so a scan of the
+        partitioned store only reads the partitions matching the value.
+    column_name : str
+        Column to compare.
+    value : object
+        Value of the kept rows.
+    backend : str, optional
+        The library of the returned DataFrame ('pandas' or 'polars'), by default the library
+        the DataFrame belongs to.
+
+    Returns
+    -------
+    pl.DataFrame or pd.DataFrame
+        The filtered DataFrame.
+    """
+    if isinstance(df, pl.LazyFrame):
+        df = df.filter(pl.col(column_name) == value).collect()
+        return to_backend(df, backend or "polars")
+    df = to_backend(df, backend or get_backend(df))
+    if get_backend(df) == "polars":
+        return df.filter(pl.col(column_name) == value)
+    return df[df[column_name] == value]
 
-#     Parameters
-#     ----------
-#     df : pl.DataFrame
-#         The input DataFrame to which the columns_to_delete will be deleted.
 
-#     Returns
-#     -------
-#     pl.DataFrame
-#         DataFrame with newly deleted columns.
-#     """
-#     return df.drop(columns_to_delete)
+def return_non_attack_df(df, column_name, backend=None):
+    """
+    Keep the normal frames of a DataFrame whose flag column is encoded as 0 / 1.
 
+    Parameters
+    ----------
+    df : pl.DataFrame, pl.LazyFrame or pd.DataFrame
+        The input DataFrame, see filter_by_value().
+    column_name : str
+        The encoded flag column.
+    backend : str, optional
+        The library of the returned DataFrame, by default the library the DataFrame belongs to.
 
-# def add_and_fill_column(df, column_to_add, fill_value):
-#     return df.with_columns(pl.lit(fill_value).alias(column_to_add))
+    Returns
+    -------
+    pl.DataFrame or pd.DataFrame
+        Rows with flag 0.
+    """
+    return filter_by_value(df, column_name, 0, backend)
 
 
-# def return_non_attack_df(df, column_name):
-#     return df.filter(pl.col(column_name) == 0)
+def return_only_attack_df(df, column_name, backend=None):
+    """
+    Keep the injected frames of a DataFrame whose flag column is encoded as 0 / 1.
 
+    Parameters
+    ----------
+    df : pl.DataFrame, pl.LazyFrame or pd.DataFrame
+        The input DataFrame, see filter_by_value().
+    column_name : str
+        The encoded flag column.
+    backend : str, optional
+        The library of the returned DataFrame, by default the library the DataFrame belongs to.
 
-# def return_only_attack_df(df, column_name):
-#     return df.filter(pl.col(column_name) == 1)
+    Returns
+    -------
+    pl.DataFrame or pd.DataFrame
+        Rows with flag 1.
+    """
+    return filter_by_value(df, column_name, 1, backend)
@@ -0,0 +1,319 @@
+"""
+Workflow of visual summaries
+1. a processed dataset (process_csv() / process_txt() output) is scanned lazily once
+2. build_time_buckets() groups frames into time buckets with a dynamic group-by over datetime
+    1. every bucket holds the frame count and min / max / mean of every byte
+    2. buckets are split by the `by` columns, e.g. updated_flag, or can_id and updated_flag
+3. load_summary() caches each summary as parquet in SUMMARY_DIR next to a json key holding
+    the dataset's size and mtime and the bucket parameters, a changed dataset rebuilds it
+4. lttb() downsamples a long series to a fixed number of points while keeping its peaks
+    (Largest-Triangle-Three-Buckets)
+5. the plot helpers draw from the summaries, so a chart of a 9M row dataset draws a few
+    thousand points instead of every frame
+
+Usage
+    python src/visual_summaries.py
+"""
+
+import json
+import os
+
+import numpy as np
+import polars as pl
+
+from utils import (
+    file_fingerprint,
+    load_data_paths,
+    parse_execution_profile_argument,
+    select_execution_profile,
+)
+
+# ──────────────────────────────────────────────────────────────
+# 🛠️ Configuration Constants
+# ──────────────────────────────────────────────────────────────
+SUMMARY_DIR = "output/summaries"
+SUMMARY_VERSION = 1  # bump when the summary columns change
+DEFAULT_EVERY = "1s"
+DEFAULT_BY = ["updated_flag"]
+LTTB_POINTS = 2000
+MAX_DLC = 8
+BYTE_COLUMNS = [f"byte_{i}" for i in range(MAX_DLC)]
+HEX_SCHEMA = {col: pl.String for col in ["can_id"] + BYTE_COLUMNS}
+# ──────────────────────────────────────────────────────────────
+
+
+def build_time_buckets(df, every=DEFAULT_EVERY, by=DEFAULT_BY):
+    """
+    Aggregate frames into time buckets with counts and per-byte min / max / mean.
+
+    Parameters
+    ----------
+    df : pl.DataFrame or pl.LazyFrame
+        Processed frames with a float timestamp column and hex byte columns.
+    every : str
+        Bucket width as a polars duration string such as '100ms', '1s' or '1m'.
+    by : list of str
+        Columns the buckets are split by, e.g. ['updated_flag'] or ['can_id', 'updated_flag'].
+
+    Returns
+    -------
+    pl.DataFrame
+        One row per bucket and group with bucket, the `by` columns, frames and
+        byte_i_min / byte_i_max / byte_i_mean columns.
+    """
+    lazy_df = df.lazy()
+    schema = lazy_df.collect_schema()
+    byte_columns = [col for col in BYTE_COLUMNS if col in schema.names()]
+    by = [col for col in by if col in schema.names()]
+    lazy_df = lazy_df.with_columns(
+        pl.from_epoch(pl.col("timestamp"), time_unit="s").alias("bucket"),
+        *[
+            (
+                pl.col(col).str.to_integer(base=16, strict=False)
+                if schema[col] == pl.String
+                else pl.col(col)
+            )
+            for col in byte_columns
+        ],
+    )
+    return (
+        lazy_df.sort("bucket")
+        .group_by_dynamic("bucket", every=every, group_by=by or None)
+        .agg(
+            pl.len().alias("frames"),
+            *[pl.col(col).min().alias(f"{col}_min") for col in byte_columns],
+            *[pl.col(col).max().alias(f"{col}_max") for col in byte_columns],
+            *[pl.col(col).mean().alias(f"{col}_mean") for col in byte_columns],
+        )
+        .sort("bucket")
+        .collect()
+    )
+
+
+def load_summary(df_path, every=DEFAULT_EVERY, by=DEFAULT_BY, summary_dir=SUMMARY_DIR):
+    """
+    Load the cached time-bucket summary of a dataset, building it when the dataset changed.
+
+    Parameters
+    ----------
+    df_path : str
+        Path to a processed CSV file.
+    every : str
+        Bucket width as a polars duration string.
+    by : list of str
+        Columns the buckets are split by.
+    summary_dir : str
+        Folder of the cached summaries.
+
+    Returns
+    -------
+    pl.DataFrame
+        The summary returned by build_time_buckets().
+    """
+    name = os.path.splitext(os.path.basename(df_path))[0]
+    summary_name = f"{name}_{every}_{'_'.join(by) or 'all'}"
+    summary_path = os.path.join(summary_dir, f"{summary_name}.parquet")
+    key_path = os.path.join(summary_dir, f"{summary_name}.json")
+    key = {
+        "source": file_fingerprint(df_path),
+        "every": every,
+        "by": list(by),
+        "version": SUMMARY_VERSION,
+    }
+
+    if os.path.isfile(summary_path) and os.path.isfile(key_path):
+        with open(key_path, "r") as file:
+            if json.load(file) == key:
+                return pl.read_parquet(summary_path)
+
+    summary = build_time_buckets(
+        pl.scan_csv(df_path, schema_overrides=HEX_SCHEMA), every, by
+    )
+    os.makedirs(summary_dir, exist_ok=True)
+    summary.write_parquet(summary_path)
+    # The key is written last, an interrupted run leaves a stale key and is redone.
+    with open(key_path, "w") as file:
+        json.dump(key, file, indent=2)
+    return summary
+
+
+def lttb(x, y, n_out=LTTB_POINTS):
+    """
+    Downsample a series with the Largest-Triangle-Three-Buckets algorithm.
+
+    The first and last points are kept, every bucket in between keeps the point forming the
+    largest triangle with the previous kept point and the mean of the next bucket.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        Sorted x values.
+    y : np.ndarray
+        y values.
+    n_out : int
+        Number of points to keep.
+
+    Returns
+    -------
+    np.ndarray
+        Indices of the kept points.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Bucket edges of the n - 2 points between the first and the last one.
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0] = 0
+    kept[-1] = n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(areas.argmax())
+        kept[i + 1] = previous
+    return kept
+
+
+def downsample_series(df, x, y, n_out=LTTB_POINTS):
+    """
+    Downsample a DataFrame for a line plot of y over x with lttb().
+
+    Parameters
+    ----------
+    df : pl.DataFrame
+        DataFrame sorted by x.
+    x : str
+        Column on the x axis, numeric or datetime.
+    y : str
+        Column on the y axis.
+    n_out : int
+        Number of points to keep.
+
+    Returns
+    -------
+    pl.DataFrame
+        The kept rows.
+    """
+    x_values = df[x].to_physical().to_numpy()
+    y_values = df[y].fill_null(0).to_numpy()
+    return df[lttb(x_values, y_values, n_out)]
+
+
+def _pyplot():
+    # matplotlib is only needed for drawing, summaries are built without it.
+    import matplotlib.pyplot as plt
+
+    return plt
+
+
+def plot_line_graph(df, x, y, n_out=LTTB_POINTS, figsize=(12, 7)):
+    """
+    Draw y over x after downsampling to n_out points.
+
+    Parameters
+    ----------
+    df : pl.DataFrame
+        DataFrame sorted by x, a summary or a full dataset.
+    x : str
+        Column on the x axis.
+    y : str
+        Column on the y axis.
+    n_out : int
+        Number of points drawn.
+    figsize : tuple
+        Figure size.
+    """
+    plt = _pyplot()
+    points = downsample_series(df, x, y, n_out)
+    plt.figure(figsize=figsize)
+    plt.plot(points[x].to_numpy(), points[y].to_numpy())
+    plt.xlabel(x)
+    plt.ylabel(y)
+    plt.title(f"{x}--{y}")
+    plt.show()
+
+
+def plot_frame_counts(summary, group_column="updated_flag", figsize=(12, 7)):
+    """
+    Draw frames per bucket, one line per group.
+
+    Parameters
+    ----------
+    summary : pl.DataFrame
+        Summary returned by load_summary().
+    group_column : str
+        Column separating the lines.
+    figsize : tuple
+        Figure size.
+    """
+    plt = _pyplot()
+    plt.figure(figsize=figsize)
+    for (group,), group_df in summary.group_by(group_column, maintain_order=True):
+        points = downsample_series(group_df, "bucket", "frames")
+        plt.plot(points["bucket"].to_numpy(), points["frames"].to_numpy(), label=group)
+    plt.xlabel("bucket")
+    plt.ylabel("frames")
+    plt.legend(title=group_column)
+    plt.show()
+
+
+def plot_byte_range_grid(
+    summary, group_column="updated_flag", byte_columns=BYTE_COLUMNS, figsize=(24, 8)
+):
+    """
+    Draw the mean and the min-max band of every byte per bucket, the summary version of
+    a scatter plot of every frame.
+
+    Parameters
+    ----------
+    summary : pl.DataFrame
+        Summary returned by load_summary().
+    group_column : str
+        Column separating the lines.
+    byte_columns : list of str
+        Byte columns to draw, at most 8.
+    figsize : tuple
+        Figure size.
+    """
+    plt = _pyplot()
+    fig, axes = plt.subplots(2, 4, figsize=figsize)
+    axes = axes.flatten()
+    for (group,), group_df in summary.group_by(group_column, maintain_order=True):
+        for i, byte_col in enumerate(byte_columns):
+            points = downsample_series(group_df, "bucket", f"{byte_col}_mean")
+            axes[i].fill_between(
+                points["bucket"].to_numpy(),
+                points[f"{byte_col}_min"].to_numpy(),
+                points[f"{byte_col}_max"].to_numpy(),
+                alpha=0.2,
+            )
+            axes[i].plot(
+                points["bucket"].to_numpy(),
+                points[f"{byte_col}_mean"].to_numpy(),
+                label=group,
+            )
+            axes[i].set_title(f"bucket vs {byte_col}")
+    for j in range(len(byte_columns), len(axes)):
+        fig.delaxes(axes[j])
+    axes[0].legend(title=group_column)
+    plt.tight_layout()
+    plt.show()
+
+
+if __name__ == "__main__":
+    select_execution_profile(parse_execution_profile_argument())
+    output_data_paths = load_data_paths("out_paths")
+    for key, path in output_data_paths.items():
+        for by in [DEFAULT_BY, ["can_id"] + DEFAULT_BY]:
+            summary = load_summary(path, by=by)
+            print(f"{key} summary by {by}: {summary.height} buckets!")